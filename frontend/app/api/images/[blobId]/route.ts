@@ -0,0 +1,46 @@
+// Proxies stored transformed images, passing Range and revalidation headers
+// through so the browser can cache them and load them progressively.
+const FORWARDED_REQUEST_HEADERS = ["range", "if-range", "if-none-match"]
+const FORWARDED_RESPONSE_HEADERS = [
+  "content-type",
+  "content-length",
+  "content-range",
+  "accept-ranges",
+  "cache-control",
+  "etag",
+  "last-modified",
+]
+
+async function proxyImage(req: Request, blobId: string) {
+  // Use BACKEND_URL for server-side requests (Docker network), fallback to NEXT_PUBLIC_API_URL for local dev
+  const backendUrl = process.env.BACKEND_URL || process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000"
+
+  const headers: Record<string, string> = {}
+  for (const name of FORWARDED_REQUEST_HEADERS) {
+    const value = req.headers.get(name)
+    if (value) headers[name] = value
+  }
+
+  const backendRes = await fetch(`${backendUrl}/images/${encodeURIComponent(blobId)}`, {
+    method: req.method,
+    headers,
+  })
+
+  const responseHeaders = new Headers()
+  for (const name of FORWARDED_RESPONSE_HEADERS) {
+    const value = backendRes.headers.get(name)
+    if (value) responseHeaders.set(name, value)
+  }
+  return new Response(req.method === "HEAD" ? null : backendRes.body, {
+    status: backendRes.status,
+    headers: responseHeaders,
+  })
+}
+
+export async function GET(req: Request, { params }: { params: Promise<{ blobId: string }> }) {
+  return proxyImage(req, (await params).blobId)
+}
+
+export async function HEAD(req: Request, { params }: { params: Promise<{ blobId: string }> }) {
+  return proxyImage(req, (await params).blobId)
+}
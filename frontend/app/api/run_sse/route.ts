@@ -21,7 +21,12 @@ export async function POST(req: Request) {
   if (!backendRes.ok || !backendRes.body) {
     const text = await backendRes.text()
     console.error(`[SSE Proxy] Error response:`, text)
-    return new Response(text, { status: backendRes.status })
+    // Keep Retry-After so the page can tell users when the run queue frees up
+    const retryAfter = backendRes.headers.get("Retry-After")
+    return new Response(text, {
+      status: backendRes.status,
+      headers: retryAfter ? { "Retry-After": retryAfter } : undefined,
+    })
   }
 
   console.log(`[SSE Proxy] Starting to stream SSE events...`)
@@ -407,6 +407,12 @@ export default function EsteeLauderTrendAnalyzer() {
 
       if (!response.ok) {
         console.error(`❌ SSE request failed with status: ${response.status}`)
+        if (response.status === 503) {
+          const retryAfter = response.headers.get("Retry-After")
+          throw new Error(
+            `The trend agent is busy with other analyses. Please try again${retryAfter ? ` in ${retryAfter}s` : " shortly"}.`
+          )
+        }
         throw new Error(`SSE request failed: ${response.status}`)
       }
 
@@ -446,6 +452,18 @@ export default function EsteeLauderTrendAnalyzer() {
               console.log("📨 Processing SSE data line...")
               try {
                 const data: SSEResponseData = JSON.parse(line.slice(6))
+
+                // Queue position while the run waits for a free slot (0 = started)
+                const runQueue = data.customMetadata?.run_queue
+                if (runQueue) {
+                  if (runQueue.position > 0) {
+                    setAnalysisProgress({
+                      ...stages[2],
+                      message: `Waiting for a free analysis slot (position ${runQueue.position} in queue)...`,
+                    })
+                  }
+                  continue
+                }
                 console.log("=== SSE Event Received ===")
                 console.log("Author:", data.author)
                 console.log("Has actions.stateDelta:", !!data.actions?.stateDelta)
@@ -156,10 +156,12 @@ export function AITrendApplication() {
             const result = await response.json()
             setProcessingProgress(90)
 
-            if (result.success && result.transformed_image) {
-                // Convert the base64 response to a data URL
-                // The backend returns the base64 string directly, so we create a data URL
-                const transformedImageUrl = `data:image/png;base64,${result.transformed_image}`
+            if (result.success && (result.image_url || result.transformed_image)) {
+                // The backend stores the image and returns its URL (served through
+                // the /api/images proxy); older backends inline it as base64.
+                const transformedImageUrl = result.image_url
+                    ? `/api${result.image_url}`
+                    : `data:image/png;base64,${result.transformed_image}`
 
                 // Update the transformed image display
                 setTransformedImage(transformedImageUrl)
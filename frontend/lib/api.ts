@@ -71,6 +71,13 @@ export interface StructuredTrendsData {
 
 // Interface for SSE response data
 export interface SSEResponseData {
+  customMetadata?: {
+    run_queue?: {
+      position: number
+      queued: number
+      running: number
+    }
+  }
   content?: {
     parts: Array<{
       text: string
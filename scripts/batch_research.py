@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Batch Trend Research
+Runs root_agent for many markets, categories or queries concurrently and
+writes each run's EsteeLauderTrendsReport and cited research findings to disk
+as soon as it finishes. Progress is kept in <out>/batch.json, so rerunning the
+same command skips finished runs and resumes the failed or unfinished ones.
+Grounded research responses are cached in <out>/search_cache and shared by
+all runs (and reruns) of the batch.
+
+Layout of the output directory:
+    batch.json                     status, attempts, error and usage per run
+    <run id>/report.json           EsteeLauderTrendsReport
+    <run id>/findings.md           research findings with citation links
+    <run id>/sources.json          cited sources by short id
+
+Examples:
+    python scripts/batch_research.py --markets US,UK,France,Japan --out reports/2026-w42
+    python scripts/batch_research.py --markets US,UK --categories skincare,makeup,hair \\
+        --concurrency 6 --profile balanced --out reports/2026-w42
+    python scripts/batch_research.py --queries-file queries.txt --out reports/adhoc --retries 2
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPTS_DIR)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "src"))
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+APP_NAME = "estee_lauder_trend_agent"
+USER_ID = "batch"
+PENDING, DONE, FAILED = "pending", "done", "failed"
+
+MARKET_TEMPLATE = "Research emerging luxury beauty trends in {market}."
+CATEGORY_TEMPLATE = "Research emerging luxury {category} trends in {market}."
+
+
+# =============================================================================
+# BATCH STATE
+# =============================================================================
+
+
+@dataclass
+class BatchRun:
+    """One query of the batch and what happened to it so far."""
+
+    run_id: str
+    query: str
+    status: str = PENDING
+    attempts: int = 0
+    error: Optional[str] = None
+    seconds: Optional[float] = None
+    usage: Dict[str, int] = field(default_factory=dict)
+    finished_at: Optional[str] = None
+
+
+def slugify(text: str, max_length: int = 60) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")[:max_length].strip("-") or "run"
+
+
+def write_atomic(path: str, text: str):
+    """Replace ``path`` with ``text`` without ever leaving a partial file."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class BatchState:
+    """The runs of a batch, persisted to ``<out>/batch.json`` after every change."""
+
+    def __init__(self, out_dir: str):
+        self.out_dir = out_dir
+        self.path = os.path.join(out_dir, "batch.json")
+        self.runs: Dict[str, BatchRun] = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                for run in json.load(f)["runs"]:
+                    self.runs[run["run_id"]] = BatchRun(**run)
+
+    def add(self, run_id: str, query: str) -> BatchRun:
+        run = self.runs.get(run_id)
+        if run is None or run.query != query:
+            run = self.runs[run_id] = BatchRun(run_id, query)
+        elif run.status == DONE and not os.path.exists(self.report_path(run_id)):
+            # Its output was deleted since: run it again.
+            run.status = PENDING
+        return run
+
+    def report_path(self, run_id: str) -> str:
+        return os.path.join(self.out_dir, run_id, "report.json")
+
+    def save(self):
+        document = {"runs": [asdict(run) for run in self.runs.values()]}
+        write_atomic(self.path, json.dumps(document, indent=2))
+
+
+def batch_queries(args) -> Dict[str, str]:
+    """Run id -> query for the markets, categories and queries given."""
+    queries: Dict[str, str] = {}
+    markets = [m.strip() for m in (args.markets or "").split(",") if m.strip()]
+    categories = [c.strip() for c in (args.categories or "").split(",") if c.strip()]
+    for market in markets:
+        for category in categories or [None]:
+            if category:
+                query = args.category_template.format(market=market, category=category)
+                queries[slugify(f"{market}-{category}")] = query
+            else:
+                queries[slugify(market)] = args.market_template.format(market=market)
+    texts = list(args.query)
+    if args.queries_file:
+        with open(args.queries_file, encoding="utf-8") as f:
+            texts += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    for text in texts:
+        run_id = slugify(text)
+        while run_id in queries and queries[run_id] != text:
+            run_id = f"{run_id}-x"
+        queries[run_id] = text
+    return queries
+
+
+# =============================================================================
+# RUNS
+# =============================================================================
+
+
+async def research(runner, session_service, run: BatchRun, profile: Optional[str]) -> Dict:
+    """One agent run of ``run.query``; returns the final session state."""
+    from google.genai import types
+
+    from estee_lauder_trend_agent.latency_profiles import PROFILE_STATE_KEY
+
+    session = await session_service.create_session(
+        app_name=APP_NAME,
+        user_id=USER_ID,
+        state={PROFILE_STATE_KEY: profile} if profile else None,
+    )
+    message = types.Content(role="user", parts=[types.Part(text=run.query)])
+    try:
+        async for _ in runner.run_async(user_id=USER_ID, session_id=session.id, new_message=message):
+            pass
+        session = await session_service.get_session(
+            app_name=APP_NAME, user_id=USER_ID, session_id=session.id
+        )
+        return session.state
+    finally:
+        # The state is all that is kept; failed runs are retried in a new session.
+        await session_service.delete_session(
+            app_name=APP_NAME, user_id=USER_ID, session_id=session.id
+        )
+
+
+def write_outputs(out_dir: str, run: BatchRun, state: Dict):
+    """Validate the run's report and write it with the cited findings."""
+    from estee_lauder_trend_agent.agent import EsteeLauderTrendsReport
+    from estee_lauder_trend_agent.usage import USAGE_STATE_KEY
+
+    run_usage = state.get(USAGE_STATE_KEY) or {}
+    run.usage = run_usage.get("total") or {}
+    report = state.get("estee_lauder_trends_report")
+    if report is None:
+        reason = run_usage.get("budget_exceeded")
+        raise ValueError(f"no report ({reason})" if reason else "no report")
+    report = EsteeLauderTrendsReport.model_validate(report)
+
+    run_dir = os.path.join(out_dir, run.run_id)
+    os.makedirs(run_dir, exist_ok=True)
+    findings = state.get("estee_lauder_trend_research_findings_with_citations") or ""
+    write_atomic(os.path.join(run_dir, "findings.md"), findings)
+    write_atomic(
+        os.path.join(run_dir, "sources.json"),
+        json.dumps(state.get("sources") or {}, indent=2, ensure_ascii=False),
+    )
+    # Written last: its presence marks the run as finished.
+    write_atomic(os.path.join(run_dir, "report.json"), report.model_dump_json(indent=2))
+
+
+async def run_batch(args, state: BatchState, runs: List[BatchRun]) -> None:
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+
+    from estee_lauder_trend_agent.agent import root_agent
+    from estee_lauder_trend_agent.run_scheduler import run_scheduler
+    from estee_lauder_trend_agent.search_cache import SearchCache, cached_search
+
+    # The batch bounds its own parallelism; let the run queue admit all of it.
+    run_scheduler.max_running = max(run_scheduler.max_running, args.concurrency)
+    session_service = InMemorySessionService()
+    runner = Runner(agent=root_agent, session_service=session_service, app_name=APP_NAME)
+    slots = asyncio.Semaphore(args.concurrency)
+    search_cache = None
+    if args.search_cache_hours > 0:
+        search_cache = SearchCache(
+            os.path.join(args.out, "search_cache"), max_age=args.search_cache_hours * 3600
+        )
+
+    async def attempt(run: BatchRun):
+        for retry in range(args.retries + 1):
+            if retry:
+                await asyncio.sleep(args.retry_delay * 2 ** (retry - 1))
+            try:
+                async with slots:
+                    run.attempts += 1
+                    start = time.perf_counter()
+                    session_state = await research(runner, session_service, run, args.profile)
+                write_outputs(args.out, run, session_state)
+            except Exception as e:
+                run.status, run.error = FAILED, f"{type(e).__name__}: {e}"
+                logger.warning(f"{run.run_id}: attempt {run.attempts} failed: {run.error}")
+                state.save()
+                continue
+            run.status, run.error = DONE, None
+            run.seconds = round(time.perf_counter() - start, 1)
+            run.finished_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+            state.save()
+            logger.info(
+                f"{run.run_id}: done in {run.seconds}s "
+                f"({run.usage.get('total_tokens', 0)} tokens) -> {state.report_path(run.run_id)}"
+            )
+            return
+
+    with cached_search(root_agent, search_cache) if search_cache else contextlib.nullcontext():
+        await asyncio.gather(*(attempt(run) for run in runs))
+    if search_cache:
+        logger.info(f"Search cache: {search_cache.hits} hits, {search_cache.misses} misses")
+
+
+def format_summary(state: BatchState) -> str:
+    runs = list(state.runs.values())
+    lines = ["=" * 96, f"{'run':<40} {'status':<8} {'tries':>5} {'secs':>7} {'tokens':>9}  error", "-" * 96]
+    for run in runs:
+        lines.append(
+            f"{run.run_id[:40]:<40} {run.status:<8} {run.attempts:>5} "
+            f"{run.seconds if run.seconds is not None else '-':>7} "
+            f"{run.usage.get('total_tokens', '-'):>9}  {(run.error or '')[:60]}"
+        )
+    done = sum(run.status == DONE for run in runs)
+    lines += ["-" * 96, f"{done} of {len(runs)} runs done; results in {state.out_dir}", "=" * 96]
+    return "\n".join(lines)
+
+
+def main(argv: List[str] = None):
+    """Main function to run a research batch."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--markets", help="Comma-separated markets, e.g. US,UK,Japan")
+    parser.add_argument("--categories", help="Comma-separated categories to research per market")
+    parser.add_argument("--query", action="append", default=[], help="Extra query (repeatable)")
+    parser.add_argument("--queries-file", help="File with one query per line")
+    parser.add_argument("--market-template", default=MARKET_TEMPLATE)
+    parser.add_argument("--category-template", default=CATEGORY_TEMPLATE)
+    parser.add_argument("--out", required=True, help="Output directory (reused to resume)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Runs in progress at once")
+    parser.add_argument("--profile", default=None, help="Latency profile (default: LATENCY_PROFILE)")
+    parser.add_argument("--retries", type=int, default=1, help="Retries of a failed run within this batch")
+    parser.add_argument("--retry-delay", type=float, default=30.0, help="Seconds before the first retry")
+    parser.add_argument("--search-cache-hours", type=float, default=24.0,
+                        help="Reuse grounded research responses this recent (0 disables the cache)")
+    parser.add_argument("--rerun", action="store_true", help="Run finished queries again too")
+    parser.add_argument("--verbose", action="store_true", help="Keep the agent's debug logging")
+    args = parser.parse_args(argv)
+
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    queries = batch_queries(args)
+    if not queries:
+        parser.error("Give --markets, --query or --queries-file")
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+        logger.setLevel(logging.INFO)
+    from estee_lauder_trend_agent.latency_profiles import LATENCY_PROFILES
+
+    if args.profile and args.profile not in LATENCY_PROFILES:
+        parser.error(f"Unknown profile {args.profile}; choose from {', '.join(LATENCY_PROFILES)}")
+
+    os.makedirs(args.out, exist_ok=True)
+    state = BatchState(args.out)
+    runs = [state.add(run_id, query) for run_id, query in queries.items()]
+    todo = [run for run in runs if args.rerun or run.status != DONE]
+    state.save()
+    logger.info(
+        f"{len(runs)} runs in batch, {len(runs) - len(todo)} already done, "
+        f"{len(todo)} to run with concurrency {args.concurrency}"
+    )
+
+    if todo:
+        asyncio.run(run_batch(args, state, todo))
+    print(format_summary(state))
+    sys.exit(0 if all(run.status == DONE for run in runs) else 1)
+
+
+if __name__ == "__main__":
+    main()
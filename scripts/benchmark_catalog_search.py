@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Product Catalog Search Benchmark
+Builds the app's in-memory ProductCatalog from a synthetic catalog of the
+fixture server's products and times keyword and prefix queries against a
+linear substring scan over the same rows. Checks both find the same
+products and that the indexed p99 stays under the latency budget.
+
+Example:
+    python scripts/benchmark_catalog_search.py --products 100000
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPTS_DIR)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "src"))
+
+from estee_lauder_trend_agent.catalog import ProductCatalog, tokenize
+from sephora_fixture_server import make_catalog
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+QUERIES = [
+    ("keyword", "serum", False),
+    ("keyword", "la mer moisturizer", False),
+    ("keyword", "retinol eye cream", False),
+    ("keyword", "glass skin lipstick 99999", False),
+    ("keyword", "no such product", False),
+    ("prefix", "lip", True),
+    ("prefix", "estee lau", True),
+    ("prefix", "hydrating ser", True),
+    ("prefix", "char", True),
+    ("prefix", "s", True),
+]
+
+
+def synthetic_products(count: int) -> List[Dict]:
+    """Catalog rows shaped like the scraper's typed output."""
+    return [
+        {
+            "url": f"https://www.sephora.com{p['path']}",
+            "name": p["name"],
+            "brand": p["brand"],
+            "price": p["price"],
+            "rating": p["rating"],
+            "review_count": p["review_count"],
+            "category": p["category"].replace("-", " ").title(),
+            "description": p["description"],
+            "ingredients": p["ingredients"],
+            "size": p["size"],
+        }
+        for p in make_catalog(count)
+    ]
+
+
+def linear_search(catalog: ProductCatalog, query: str, limit: int, prefix: bool) -> List[Dict]:
+    """Scan every product, in the catalog's order, for all query words."""
+    terms = tokenize(query)
+    last = terms.pop() if prefix and terms else None
+    found = []
+    for product in catalog:
+        tokens = {
+            t
+            for field in ("name", "brand", "description", "ingredients")
+            for t in tokenize(product.get(field))
+        }
+        if all(t in tokens for t in terms) and (
+            last is None or any(t.startswith(last) for t in tokens)
+        ):
+            found.append(product)
+    return found
+
+
+def time_query(search, repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        search()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main(argv: List[str] = None):
+    """Main function to run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--max-p99-ms", type=float, default=1.0,
+                        help="Fail if any indexed query's p99 exceeds this")
+    parser.add_argument("--skip-linear", action="store_true",
+                        help="Skip the slow linear-scan baseline")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    catalog = ProductCatalog(synthetic_products(args.products))
+    logger.info(f"Indexed {len(catalog)} products in {time.perf_counter() - start:.1f}s")
+
+    failures = 0
+    print("\n" + "=" * 86)
+    print(f"{'query':<28} {'mode':<8} {'hits':>5} | {'p50 ms':>8} {'p99 ms':>8} | {'linear ms':>10} {'speedup':>9}")
+    for mode, query, prefix in QUERIES:
+        results = catalog.search(query, args.limit, prefix=prefix)
+        timings = sorted(time_query(lambda: catalog.search(query, args.limit, prefix=prefix), args.repeat))
+        p50 = statistics.median(timings)
+        p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+        linear_cols = f"{'-':>10} {'-':>9}"
+        if not args.skip_linear:
+            linear_start = time.perf_counter()
+            expected = linear_search(catalog, query, args.limit, prefix)
+            linear_ms = (time.perf_counter() - linear_start) * 1000
+            linear_cols = f"{linear_ms:>10.1f} {linear_ms / p50:>8.0f}x"
+            expected_urls = {p["url"] for p in expected}
+            if len(results) != min(args.limit, len(expected)) or any(
+                p["url"] not in expected_urls for p in results
+            ):
+                logger.error(f"{query!r}: index and linear scan disagree")
+                failures += 1
+        print(f"{query:<28} {mode:<8} {len(results):>5} | {p50:>8.3f} {p99:>8.3f} | {linear_cols}")
+        if p99 > args.max_p99_ms:
+            logger.error(f"{query!r}: p99 {p99:.3f} ms exceeds {args.max_p99_ms} ms")
+            failures += 1
+    print("=" * 86)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
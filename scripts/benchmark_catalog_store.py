@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Product Catalog Store Benchmark
+Starts several worker processes that each load a synthetic catalog the way
+the app does, once from JSONL and once from a memory-mapped catalog store,
+and compares startup time and memory: per-worker private memory and the
+proportional share (PSS) summed over all workers. Also checks that search
+and trend matching return the same results from both formats.
+
+Example:
+    python scripts/benchmark_catalog_store.py --products 100000 --workers 4
+"""
+
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPTS_DIR)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "src"))
+
+from benchmark_catalog_search import QUERIES, synthetic_products
+from build_catalog import build_catalog
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+TRENDS = [
+    "hydrating serum with hyaluronic acid",
+    "matte red lipstick",
+    "retinol night cream",
+    "glass skin glow",
+]
+
+
+def memory_kb(pid: int) -> Dict[str, int]:
+    """Rss, Pss and private memory of a process from /proc/<pid>/smaps_rollup."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": values.get("Rss", 0),
+        "pss": values.get("Pss", 0),
+        "private": values.get("Private_Clean", 0) + values.get("Private_Dirty", 0),
+    }
+
+
+def worker(path: str):
+    """Load the catalog like the app's lifespan, use it, report, then wait."""
+    from estee_lauder_trend_agent.catalog import load_catalog
+    from estee_lauder_trend_agent.matching import get_trend_matcher
+
+    logging.disable(logging.INFO)
+    start = time.perf_counter()
+    catalog = load_catalog(path)
+    matcher = get_trend_matcher(catalog)
+    load_ms = (time.perf_counter() - start) * 1000
+    searches = {
+        query: [p["url"] for p in catalog.search(query, 20, prefix=prefix)]
+        for _, query, prefix in QUERIES
+    }
+    matches = [[p["url"] for p in products] for products in matcher.match(TRENDS, 5)]
+    print(json.dumps({"load_ms": load_ms, "searches": searches, "matches": matches}), flush=True)
+    sys.stdin.read()
+
+
+def run_workers(path: str, count: int) -> List[Dict]:
+    """Start ``count`` workers on ``path``; measure them once all have loaded."""
+    procs = [
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--worker", path],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for _ in range(count)
+    ]
+    results = []
+    for proc in procs:
+        result = json.loads(proc.stdout.readline())
+        results.append(result)
+    for proc, result in zip(procs, results):
+        result.update(memory_kb(proc.pid))
+    for proc in procs:
+        proc.stdin.close()
+        proc.wait()
+    return results
+
+
+def main(argv: List[str] = None):
+    """Main function to run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--workdir", help="Keep the generated files here")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        worker(args.worker)
+        return
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="catalog_store_")
+    os.makedirs(workdir, exist_ok=True)
+    jsonl_path = os.path.join(workdir, "products.jsonl")
+    store_path = os.path.join(workdir, "products.catalog")
+    with open(jsonl_path, "w", encoding="utf-8") as f:
+        for product in synthetic_products(args.products):
+            f.write(json.dumps(product) + "\n")
+    build_catalog(jsonl_path, store_path)
+
+    failures = 0
+    reference = None
+    print("\n" + "=" * 86)
+    print(f"{'format':<8} {'workers':>7} | {'load ms':>9} | {'RSS MB':>8} {'private MB':>10} | {'total PSS MB':>12}")
+    for name, path in (("jsonl", jsonl_path), ("mmap", store_path)):
+        results = run_workers(path, args.workers)
+        load_ms = max(r["load_ms"] for r in results)
+        rss = max(r["rss"] for r in results) / 1024
+        private = max(r["private"] for r in results) / 1024
+        total_pss = sum(r["pss"] for r in results) / 1024
+        print(f"{name:<8} {args.workers:>7} | {load_ms:>9.1f} | {rss:>8.1f} {private:>10.1f} | {total_pss:>12.1f}")
+        for result in results:
+            outputs = (result["searches"], result["matches"])
+            if reference is None:
+                reference = outputs
+            elif outputs != reference:
+                logger.error(f"{name}: search or match results differ from JSONL")
+                failures += 1
+                break
+    print("=" * 86)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Product Extraction Benchmark
+Compares the per-selector `select_one` extraction the scraper used to do with
+the single-pass extraction plan on both parser backends and with the
+structured-data fast path, over saved product page HTML. Checks that the plan
+extracts the same fields as the per-selector lookups, and reports pages parsed
+per second.
+
+Examples:
+    python scripts/benchmark_extraction.py --pages 200
+    python scripts/benchmark_extraction.py --save-fixtures fixtures/products --pages 50
+    python scripts/benchmark_extraction.py --fixtures fixtures/products
+"""
+
+import argparse
+import glob
+import logging
+import os
+import sys
+import time
+from typing import Callable, Dict, List
+
+from sephora_extraction import (
+    HAS_LXML,
+    PRODUCT_PLAN,
+    extract_product,
+    extract_structured_fields,
+)
+from sephora_fixture_server import make_catalog, render_product
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def load_fixtures(directory: str) -> List[bytes]:
+    """Read every saved .html page from a directory."""
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.html"))):
+        with open(path, "rb") as f:
+            pages.append(f.read())
+    return pages
+
+
+def generate_fixtures(count: int, padding_kb: int) -> List[bytes]:
+    """Render product pages the way the fixture server serves them."""
+    return [
+        render_product(product, padding_kb).encode("utf-8")
+        for product in make_catalog(count)
+    ]
+
+
+def time_extractor(extract: Callable[[bytes], Dict], pages: List[bytes], repeat: int) -> float:
+    """Best-of-``repeat`` pages per second for an extractor."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for page in pages:
+            extract(page)
+        best = min(best, time.perf_counter() - start)
+    return len(pages) / best
+
+
+def main(argv: List[str] = None):
+    """Main function to run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--fixtures", help="Directory of saved product page .html files")
+    parser.add_argument("--save-fixtures", help="Write the generated pages to this directory")
+    parser.add_argument("--pages", type=int, default=100, help="Pages to generate")
+    parser.add_argument("--padding-kb", type=int, default=150, help="Filler markup per generated page")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    if args.fixtures:
+        pages = load_fixtures(args.fixtures)
+    else:
+        pages = generate_fixtures(args.pages, args.padding_kb)
+    if not pages:
+        logger.error("No pages to benchmark")
+        sys.exit(1)
+
+    if args.save_fixtures:
+        os.makedirs(args.save_fixtures, exist_ok=True)
+        for i, page in enumerate(pages):
+            with open(os.path.join(args.save_fixtures, f"product_{i:05d}.html"), "wb") as f:
+                f.write(page)
+        logger.info(f"Saved {len(pages)} pages to {args.save_fixtures}")
+
+    extractors = {
+        "per-selector select_one (html.parser)": PRODUCT_PLAN.extract_per_selector,
+        "single-pass plan (html.parser)": lambda page: PRODUCT_PLAN.extract(page, "html.parser"),
+    }
+    if HAS_LXML:
+        extractors["single-pass plan (lxml)"] = lambda page: PRODUCT_PLAN.extract(page, "lxml")
+
+    # The plan must extract exactly what the per-selector lookups did.
+    mismatches = 0
+    for i, page in enumerate(pages):
+        expected = PRODUCT_PLAN.extract_per_selector(page)
+        for name, extract in extractors.items():
+            actual = extract(page)
+            if actual != expected:
+                mismatches += 1
+                diff = {k: (expected[k], actual[k]) for k in expected if expected[k] != actual[k]}
+                logger.error(f"Page {i}: {name} differs: {diff}")
+
+    # Structured-data fast path: JSON blobs first, DOM only for missing fields.
+    fallbacks = sum(
+        1
+        for page in pages
+        if any(
+            not extract_structured_fields(page).get(rule.name)
+            for rule in PRODUCT_PLAN.rules
+        )
+    )
+    extractors["structured fast path + DOM fallback"] = extract_product
+
+    avg_kb = sum(len(p) for p in pages) / len(pages) / 1024
+    print("\n" + "=" * 60)
+    print(f"Pages: {len(pages)} (avg {avg_kb:.0f} KB)")
+    baseline = None
+    for name, extract in extractors.items():
+        rate = time_extractor(extract, pages, args.repeat)
+        baseline = baseline or rate
+        print(f"{name:<40} {rate:8.1f} pages/s  ({rate / baseline:.1f}x)")
+    print(f"Structured data covered all fields on {len(pages) - fallbacks}/{len(pages)} pages")
+    print("=" * 60)
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
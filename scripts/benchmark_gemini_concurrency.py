@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Gemini Adaptive Concurrency Benchmark
+Starts the stub Gemini backend with a fixed capacity (calls beyond it are
+answered with 429), fires a burst of concurrent calls through the shared
+Gemini client, once with an effectively unlimited limiter (every caller
+retries on its own, like uncoordinated clients) and once with the AIMD
+limiter, and compares 429s, failed calls, latency and throughput.
+
+Example:
+    python scripts/benchmark_gemini_concurrency.py --calls 300 --callers 60 --capacity 12
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPTS_DIR)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "src"))
+
+from load_test import _wait_for_health, percentile
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+async def burst(client, calls: int, callers: int) -> Dict:
+    """``calls`` generate_content calls from ``callers`` concurrent callers."""
+    from google.genai import errors as genai_errors
+
+    latencies: List[float] = []
+    failures = 0
+    limits = []
+    remaining = iter(range(calls))
+
+    async def caller():
+        nonlocal failures
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                await client.generate_content(model="gemini-2.5-flash", contents="Name a trend.")
+                latencies.append(time.perf_counter() - start)
+            except genai_errors.APIError:
+                failures += 1
+
+    async def sample_limit():
+        while True:
+            limits.append(client.limiter.limit)
+            await asyncio.sleep(0.1)
+
+    sampler = asyncio.create_task(sample_limit())
+    start = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(callers)))
+    wall = time.perf_counter() - start
+    sampler.cancel()
+    return {
+        "wall": wall,
+        "latencies": sorted(latencies),
+        "failures": failures,
+        "overloads": client.limiter.overloads,
+        "limits": limits,
+    }
+
+
+def main(argv: List[str] = None):
+    """Main function to run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--callers", type=int, default=60, help="Concurrent callers")
+    parser.add_argument("--capacity", type=int, default=12, help="Concurrent calls the stub serves")
+    parser.add_argument("--latency", default="lognormal:1.0,0.2", help="Stub call latency")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--stub-port", type=int, default=8907)
+    args = parser.parse_args(argv)
+
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    stub = subprocess.Popen(
+        [
+            sys.executable, os.path.join(SCRIPTS_DIR, "stub_backends.py"),
+            "--port", str(args.stub_port),
+            "--gemini-capacity", str(args.capacity),
+            "--gemini-latency", args.latency,
+            "--composer-latency", args.latency,
+        ]
+    )
+    os.environ.update(
+        GOOGLE_GENAI_USE_VERTEXAI="False",
+        GOOGLE_API_KEY="stub-key",
+        GOOGLE_GEMINI_BASE_URL=f"{stub_url}/",
+    )
+    from estee_lauder_trend_agent.gemini_client import AimdLimiter, GeminiClient
+
+    try:
+        _wait_for_health(stub_url)
+        logging.getLogger("estee_lauder_trend_agent").setLevel(logging.ERROR)
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        modes = {
+            "unlimited": lambda: AimdLimiter(initial=10**6, max_limit=10**6, backoff=1.0, latency_factor=0),
+            "aimd": lambda: AimdLimiter(),
+        }
+        results = {}
+        for name, make_limiter in modes.items():
+            client = GeminiClient(make_limiter(), max_retries=args.retries, retry_delay=0.5)
+            results[name] = asyncio.run(burst(client, args.calls, args.callers))
+    finally:
+        stub.terminate()
+        stub.wait(timeout=10)
+
+    print("\n" + "=" * 96)
+    print(
+        f"{args.calls} calls from {args.callers} callers, stub capacity {args.capacity}, "
+        f"{args.retries} retries per call"
+    )
+    print(
+        f"{'mode':<10} | {'wall s':>7} {'calls/s':>8} | {'429s':>6} {'failed':>6} | "
+        f"{'p50 s':>6} {'p95 s':>6} {'p99 s':>6} | {'limit avg':>9} {'limit end':>9}"
+    )
+    for name, result in results.items():
+        latencies = result["latencies"]
+        limits = [limit for limit in result["limits"] if limit < 10**6] or [float("nan")]
+        print(
+            f"{name:<10} | {result['wall']:>7.1f} {len(latencies) / result['wall']:>8.1f} | "
+            f"{result['overloads']:>6} {result['failures']:>6} | "
+            f"{percentile(latencies, 50):>6.2f} {percentile(latencies, 95):>6.2f} "
+            f"{percentile(latencies, 99):>6.2f} | "
+            f"{sum(limits) / len(limits):>9.1f} {limits[-1]:>9.1f}"
+        )
+    print("=" * 96)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Latency Profile Benchmark
+Runs the queries of recorded agent runs (cassettes) through root_agent once
+per latency profile and reports end-to-end latency, time to the first
+research text, token usage and estimated cost per profile. Runs go to Gemini
+unless --stub starts the stub backend, where latencies only reflect the
+stub's settings (see --model-latency-scale in stub_backends.py).
+
+Examples:
+    python scripts/benchmark_latency_profiles.py cassettes/*.json.gz --iterations 3
+    python scripts/benchmark_latency_profiles.py --query begin --profiles fast,deep --record /tmp/profile-runs
+    python scripts/benchmark_latency_profiles.py --stub --iterations 5 \\
+        --stub-args="--gemini-latency lognormal:6,0.2 --composer-latency lognormal:3,0.2 \\
+                     --model-latency-scale gemini-2.5-flash=0.35"
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import shlex
+import subprocess
+import sys
+import time
+from statistics import median
+from typing import Dict, List, Optional
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPTS_DIR)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "src"))
+
+from load_test import _wait_for_health, percentile
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+APP_NAME = "estee_lauder_trend_agent"
+USER_ID = "benchmark"
+
+# USD per million tokens: (input, output). Thinking tokens are billed as
+# output and cached input at a quarter of the input price. List prices for
+# prompts up to 200k tokens; update them when Google's pricing changes.
+MODEL_PRICES = {
+    "gemini-2.5-pro": (1.25, 10.00),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+}
+
+
+def stage_cost(model: str, usage: Dict[str, int]) -> Optional[float]:
+    """Estimated USD cost of a stage's usage, or None for a model without a price."""
+    if model not in MODEL_PRICES:
+        return None
+    input_price, output_price = MODEL_PRICES[model]
+    cached = usage["cached_input_tokens"]
+    return (
+        (usage["input_tokens"] - cached) * input_price
+        + cached * input_price / 4
+        + (usage["output_tokens"] + usage["thinking_tokens"]) * output_price
+    ) / 1e6
+
+
+async def run_once(runner, session_service, query: str, profile) -> Dict:
+    """One streamed run of ``query`` under ``profile``; returns its timings and usage."""
+    from google.adk.agents.run_config import RunConfig, StreamingMode
+    from google.genai import types
+
+    from estee_lauder_trend_agent.agent import output_composer_agent, trend_research_agent
+    from estee_lauder_trend_agent.latency_profiles import PROFILE_STATE_KEY
+    from estee_lauder_trend_agent.usage import USAGE_STATE_KEY
+
+    session = await session_service.create_session(
+        app_name=APP_NAME, user_id=USER_ID, state={PROFILE_STATE_KEY: profile.name}
+    )
+    message = types.Content(role="user", parts=[types.Part(text=query)])
+    start = time.perf_counter()
+    first_text = None
+    async for event in runner.run_async(
+        user_id=USER_ID,
+        session_id=session.id,
+        new_message=message,
+        run_config=RunConfig(streaming_mode=StreamingMode.SSE),
+    ):
+        if (
+            first_text is None
+            and event.author == trend_research_agent.name
+            and event.content
+            and any(part.text for part in event.content.parts or [])
+        ):
+            first_text = time.perf_counter() - start
+    latency = time.perf_counter() - start
+
+    session = await session_service.get_session(
+        app_name=APP_NAME, user_id=USER_ID, session_id=session.id
+    )
+    run_usage = session.state.get(USAGE_STATE_KEY) or {}
+    models = {
+        trend_research_agent.name: profile.research.model,
+        output_composer_agent.name: profile.composer.model,
+    }
+    costs = [
+        stage_cost(models.get(stage, ""), usage)
+        for stage, usage in run_usage.get("stages", {}).items()
+    ]
+    return {
+        "latency": latency,
+        "first_text": first_text,
+        "usage": run_usage.get("total") or {},
+        "cost": None if None in costs else sum(costs),
+        "budget_exceeded": run_usage.get("budget_exceeded"),
+        "report": "estee_lauder_trends_report" in session.state,
+    }
+
+
+async def benchmark(queries: List[str], profiles, iterations: int) -> Dict[str, List[Dict]]:
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+
+    from estee_lauder_trend_agent.agent import root_agent
+
+    session_service = InMemorySessionService()
+    runner = Runner(agent=root_agent, session_service=session_service, app_name=APP_NAME)
+    results: Dict[str, List[Dict]] = {profile.name: [] for profile in profiles}
+    # Interleave profiles so drifting backend latency affects them alike.
+    for iteration in range(iterations):
+        for query in queries:
+            for profile in profiles:
+                try:
+                    result = await run_once(runner, session_service, query, profile)
+                except Exception as e:
+                    logger.error(f"{profile.name} run failed: {e}")
+                    result = {"error": str(e)}
+                results[profile.name].append(result)
+                if "error" not in result:
+                    logger.info(
+                        f"[{iteration + 1}/{iterations}] {profile.name}: {result['latency']:.1f}s, "
+                        f"{result['usage'].get('total_tokens', 0)} tokens"
+                    )
+    return results
+
+
+def format_report(results: Dict[str, List[Dict]], profiles) -> str:
+    width = 118
+    lines = [
+        "=" * width,
+        f"{'profile':<9} | {'runs':>4} {'failed':>6} | {'p50 s':>6} {'p95 s':>6} {'1st text s':>10} | "
+        f"{'input':>7} {'output':>7} {'thinking':>8} {'searches':>8} | {'$ / run':>8} | models",
+        "-" * width,
+    ]
+    for profile in profiles:
+        runs = results[profile.name]
+        done = [run for run in runs if "error" not in run]
+        latencies = sorted(run["latency"] for run in done)
+        first_texts = [run["first_text"] for run in done if run["first_text"] is not None]
+        costs = [run["cost"] for run in done if run["cost"] is not None]
+
+        def mean(key: str) -> float:
+            return sum(run["usage"].get(key, 0) for run in done) / max(1, len(done))
+
+        first_text = f"{median(first_texts):>10.2f}" if first_texts else f"{'-':>10}"
+        cost = f"{sum(costs) / len(costs):>8.4f}" if costs else f"{'-':>8}"
+        lines.append(
+            f"{profile.name:<9} | {len(runs):>4} {len(runs) - len(done):>6} | "
+            f"{percentile(latencies, 50):>6.1f} {percentile(latencies, 95):>6.1f} {first_text} | "
+            f"{mean('input_tokens'):>7.0f} {mean('output_tokens'):>7.0f} "
+            f"{mean('thinking_tokens'):>8.0f} {mean('search_queries'):>8.1f} | {cost} | "
+            f"{profile.research.model} / {profile.composer.model}"
+        )
+        stopped = sum(1 for run in done if run["budget_exceeded"])
+        missing = sum(1 for run in done if not run["report"])
+        if stopped or missing:
+            lines.append(f"{'':<9} | {stopped} stopped by a budget, {missing} without a report")
+    lines.append("=" * width)
+    return "\n".join(lines)
+
+
+def main(argv: List[str] = None):
+    """Main function to run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("cassettes", nargs="*", help="Recorded runs whose queries are benchmarked")
+    parser.add_argument("--query", action="append", default=[], help="Query to run (repeatable)")
+    parser.add_argument("--profiles", default=None, help="Comma-separated profiles (default: all)")
+    parser.add_argument("--iterations", type=int, default=3, help="Runs per query and profile")
+    parser.add_argument("--record", default=None, help="Record every run as a cassette in this directory")
+    parser.add_argument("--stub", action="store_true", help="Run against a locally started stub Gemini backend")
+    parser.add_argument("--stub-args", default="", help="Extra arguments for stub_backends.py")
+    parser.add_argument("--stub-port", type=int, default=8908)
+    parser.add_argument("--verbose", action="store_true", help="Keep the agent's debug logging")
+    args = parser.parse_args(argv)
+
+    stub = None
+    if args.stub:
+        stub_url = f"http://127.0.0.1:{args.stub_port}"
+        stub = subprocess.Popen(
+            [sys.executable, os.path.join(SCRIPTS_DIR, "stub_backends.py"),
+             "--port", str(args.stub_port), *shlex.split(args.stub_args)]
+        )
+        os.environ.update(
+            GOOGLE_GENAI_USE_VERTEXAI="False",
+            GOOGLE_API_KEY="stub-key",
+            GOOGLE_GEMINI_BASE_URL=f"{stub_url}/",
+        )
+    # Set before the agent's config is imported.
+    os.environ["AGENT_CASSETTE_DIR"] = args.record or ""
+
+    from estee_lauder_trend_agent.cassette import load_cassette
+    from estee_lauder_trend_agent.latency_profiles import LATENCY_PROFILES
+
+    names = args.profiles.split(",") if args.profiles else list(LATENCY_PROFILES)
+    unknown = [name for name in names if name not in LATENCY_PROFILES]
+    if unknown:
+        parser.error(f"Unknown profiles {', '.join(unknown)}; choose from {', '.join(LATENCY_PROFILES)}")
+    profiles = [LATENCY_PROFILES[name] for name in names]
+    queries = [load_cassette(path).user_message for path in args.cassettes] + args.query
+    if not queries:
+        queries = ["begin"]
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+        logger.setLevel(logging.INFO)
+    try:
+        if stub:
+            _wait_for_health(stub_url)
+        results = asyncio.run(benchmark(queries, profiles, args.iterations))
+    finally:
+        if stub:
+            stub.terminate()
+            stub.wait(timeout=10)
+
+    print(f"\n{len(queries)} queries x {args.iterations} iterations per profile"
+          f"{' (stub backend)' if stub else ''}")
+    print(format_report(results, profiles))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Link Discovery Benchmark
+Compares the scraper's old list-based link dedupe with the canonicalizing
+UrlFrontier on synthetic listing links where every product shows up several
+times with different skuId and tracking params. Checks that the frontier
+yields one fetch per product and that its discovery time grows linearly.
+
+Example:
+    python scripts/benchmark_link_discovery.py --sizes 1000 4000 16000
+"""
+
+import argparse
+import logging
+import random
+import sys
+import time
+from typing import List
+from urllib.parse import urljoin
+
+from sephora_frontier import UrlFrontier
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+BASE_URL = "https://www.sephora.com"
+
+
+def make_links(num_products: int, links_per_product: int, seed: int = 7) -> List[str]:
+    """Product links as listing pages render them: variants and tracking params."""
+    rng = random.Random(seed)
+    links = []
+    for i in range(num_products):
+        path = f"/product/luminous-serum-{i}-P{400000 + i}"
+        for _ in range(links_per_product):
+            style = rng.randrange(4)
+            if style == 0:
+                links.append(path)
+            elif style == 1:
+                links.append(f"{path}?skuId={2000000 + rng.randrange(3)}")
+            elif style == 2:
+                links.append(
+                    f"{path}?skuId={2000000 + rng.randrange(3)}&icid2=bestsellers_carousel_{rng.randrange(9)}"
+                )
+            else:
+                links.append(f"{BASE_URL}{path}?icid2=homepage_{rng.randrange(9)}#reviews")
+    rng.shuffle(links)
+    return links
+
+
+def legacy_discovery(links: List[str]) -> List[str]:
+    """The scraper's previous dedupe: full URLs, `not in` on a list."""
+    product_links = []
+    for href in links:
+        full_url = urljoin(BASE_URL, href)
+        if full_url not in product_links:
+            product_links.append(full_url)
+    return product_links
+
+
+def frontier_discovery(links: List[str]) -> List[str]:
+    frontier = UrlFrontier(BASE_URL)
+    frontier.update(links)
+    return list(frontier)
+
+
+def timed(function, links: List[str]):
+    start = time.perf_counter()
+    result = function(links)
+    return result, time.perf_counter() - start
+
+
+def main(argv: List[str] = None):
+    """Main function to run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 2000, 4000, 8000],
+                        help="Numbers of distinct products")
+    parser.add_argument("--links-per-product", type=int, default=4)
+    parser.add_argument("--skip-legacy-above", type=int, default=8000,
+                        help="Skip the quadratic baseline for larger sizes")
+    args = parser.parse_args(argv)
+
+    failures = 0
+    frontier_rates = []
+    print("\n" + "=" * 78)
+    print(f"{'products':>8} {'links':>8} | {'legacy fetches':>14} {'legacy s':>9} | "
+          f"{'frontier fetches':>16} {'frontier s':>10}")
+    for size in args.sizes:
+        links = make_links(size, args.links_per_product)
+        unique, frontier_seconds = timed(frontier_discovery, links)
+        frontier_rates.append(len(links) / frontier_seconds)
+        if size <= args.skip_legacy_above:
+            legacy, legacy_seconds = timed(legacy_discovery, links)
+            legacy_cols = f"{len(legacy):>14} {legacy_seconds:>9.3f}"
+        else:
+            legacy_cols = f"{'-':>14} {'-':>9}"
+        print(f"{size:>8} {len(links):>8} | {legacy_cols} | {len(unique):>16} {frontier_seconds:>10.3f}")
+        if len(unique) != size:
+            logger.error(f"Frontier found {len(unique)} products, expected {size}")
+            failures += 1
+    print("=" * 78)
+
+    # Linear time: links per second should not collapse as the input grows.
+    if len(frontier_rates) > 1 and min(frontier_rates) < max(frontier_rates) / 3:
+        logger.error(f"Frontier throughput is not linear: {frontier_rates}")
+        failures += 1
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Trend Identity Benchmark
+Generates synthetic report snapshots in which every trend reappears under
+reworded names, descriptions and techniques, assigns trend ids with the
+app's MinHash LSH index, and compares lookup latency and clustering
+quality with an exhaustive pairwise comparison over the same signatures.
+
+Example:
+    python scripts/benchmark_trend_identity.py --trends 5000 --snapshots 10
+"""
+
+import argparse
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPTS_DIR)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "src"))
+
+from estee_lauder_trend_agent.trend_identity import (
+    SIMILARITY_THRESHOLD,
+    MinHasher,
+    TrendIdentityIndex,
+    trend_shingles,
+)
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+WORDS = (
+    "glass skin glow dewy matte latte bronze blush lip liner gloss serum essence "
+    "toner retinol peptide ceramide barrier repair hydration luminous poreless "
+    "contour sculpt highlight lash brow lamination soap clean girl no makeup "
+    "glazed donut strawberry cherry cola espresso vanilla cloud skin velvet "
+    "butter balm oil cleanse double layer slug cycling exfoliate acid niacinamide "
+    "vitamin sunscreen spf tinted primer setting spray powder bake blur soft focus "
+    "siren eyes fox cat wing graphic liner smoke halo ombre gradient stain tint "
+    "scalp care bond repair curl gloss blowout bouncy volume sleek bun braid "
+    "fragrance layering musk amber floral gourmand"
+).split()
+SUFFIXES = ["2.0", "Glow", "Look", "Era", "Trend", "Method", "Revival"]
+# Made-up ingredient and product words, so unrelated trends share about as
+# little vocabulary as real ones do.
+SYLLABLES = "ka lo mi ra ve su na ti po le xa ze bo ri mu da fe go hy qu".split()
+
+
+def vocabulary(size: int, rng: random.Random) -> List[str]:
+    words = set(WORDS)
+    while len(words) < size:
+        words.add("".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    return sorted(words)
+
+
+def base_trend(words: List[str], rng: random.Random) -> Dict:
+    return {
+        "name": " ".join(rng.sample(WORDS, 1) + rng.sample(words, 1)).title(),
+        "description": " ".join(rng.sample(WORDS, 6) + rng.sample(words, 16)),
+        "techniques": [" ".join(rng.sample(words, 2)) for _ in range(4)],
+    }
+
+
+def reworded(trend: Dict, words: List[str], rng: random.Random) -> Dict:
+    """A later snapshot of ``trend``: renamed a little, description and techniques rewritten in part."""
+    name = trend["name"].replace(" ", rng.choice([" ", "-", " "]))
+    if rng.random() < 0.6:
+        name = f"{name} {rng.choice(SUFFIXES)}"
+    original = trend["description"].split()
+    kept = [w for w in original if rng.random() < 0.7]
+    description = " ".join(kept + rng.sample(words, len(original) - len(kept)))
+    techniques = rng.sample(trend["techniques"], 2) + [" ".join(rng.sample(words, 2))]
+    return {"name": name, "description": description, "techniques": techniques}
+
+
+def snapshots(trends: int, count: int, seed: int = 7) -> List[Tuple[int, Dict]]:
+    """(true trend, item) pairs: ``count`` snapshots of ``trends`` trends each."""
+    rng = random.Random(seed)
+    words = vocabulary(20000, rng)
+    bases = [base_trend(words, rng) for _ in range(trends)]
+    items = []
+    for snapshot in range(count):
+        for truth, trend in enumerate(bases):
+            items.append((truth, trend if snapshot == 0 else reworded(trend, words, rng)))
+    return items
+
+
+def pairwise_nearest(signatures: np.ndarray, signature: np.ndarray) -> Tuple[int, float]:
+    """Most similar earlier item by comparing against every stored signature."""
+    similarities = (signatures == signature).mean(axis=1)
+    best = int(similarities.argmax())
+    return best, float(similarities[best])
+
+
+def percentiles(timings: List[float]) -> Tuple[float, float]:
+    timings = sorted(timings)
+    return statistics.median(timings), timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+
+
+def main(argv: List[str] = None):
+    """Main function to run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--trends", type=int, default=5000)
+    parser.add_argument("--snapshots", type=int, default=10)
+    parser.add_argument("--pairwise-sample", type=int, default=200,
+                        help="Lookups timed with the exhaustive comparison")
+    args = parser.parse_args(argv)
+
+    items = snapshots(args.trends, args.snapshots)
+    index = TrendIdentityIndex()
+    assigned = []
+    timings_by_size: Dict[int, List[float]] = {}
+    start = time.perf_counter()
+    for position, (_, trend) in enumerate(items):
+        t0 = time.perf_counter()
+        assigned.append(index.assign([trend])[0]["trend_id"])
+        bucket = 10 ** len(str(position + 1)) // 10
+        timings_by_size.setdefault(bucket, []).append((time.perf_counter() - t0) * 1e6)
+    logger.info(
+        f"Assigned {len(items)} items to {index.trend_count} trends "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+
+    # Clustering quality against the generated ground truth
+    truth = [t for t, _ in items]
+    clusters: Dict[str, set] = {}
+    for trend_id, t in zip(assigned, truth):
+        clusters.setdefault(trend_id, set()).add(t)
+    merged = sum(1 for members in clusters.values() if len(members) > 1)
+    first_id = {}
+    split = set()
+    for trend_id, t in zip(assigned, truth):
+        if first_id.setdefault(t, trend_id) != trend_id:
+            split.add(t)
+
+    print("\n" + "=" * 72)
+    print(f"{'stored items':>14} | {'LSH assign p50 us':>18} {'p99 us':>10}")
+    for size, timings in sorted(timings_by_size.items()):
+        p50, p99 = percentiles(timings)
+        print(f"{'>= ' + str(size):>14} | {p50:>18.1f} {p99:>10.1f}")
+
+    hasher = MinHasher()
+    signatures = np.stack([hasher.signature(trend_shingles(trend)) for _, trend in items])
+    sample = range(len(items) - args.pairwise_sample, len(items))
+    pairwise = []
+    for position in sample:
+        t0 = time.perf_counter()
+        pairwise_nearest(signatures[:position], signatures[position])
+        pairwise.append((time.perf_counter() - t0) * 1e6)
+    p50, p99 = percentiles(pairwise)
+    print(f"{'pairwise @ ' + str(len(items)):>14} | {p50:>18.1f} {p99:>10.1f}")
+    print("-" * 72)
+    print(f"true trends {args.trends}, assigned trends {index.trend_count}")
+    print(f"trends split across ids: {len(split)} ({len(split) / args.trends:.1%})")
+    print(f"ids merging different trends: {merged} ({merged / max(1, len(clusters)):.1%})")
+    print(f"similarity threshold: {SIMILARITY_THRESHOLD}")
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main()
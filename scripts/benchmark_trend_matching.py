@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Trend-to-Product Matching Benchmark
+Times the vectorized TrendProductMatcher, which scores every trend of a
+report against the catalog in one batched NumPy sparse product, against
+scoring each trend with a Python loop over the same product vectors, on a
+synthetic catalog of the fixture server's products. Checks both return the
+same top-k products.
+
+Example:
+    python scripts/benchmark_trend_matching.py --products 100000
+"""
+
+import argparse
+import heapq
+import logging
+import os
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPTS_DIR)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "src"))
+
+from estee_lauder_trend_agent.catalog import ProductCatalog
+from estee_lauder_trend_agent.matching import TrendProductMatcher
+from benchmark_catalog_search import synthetic_products
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# A report's worth of trends, shaped like TrendItem.
+TRENDS = [
+    {"name": "Glass Skin", "description": "Ultra-hydrated, luminous skin with a reflective finish.",
+     "techniques": ["Layered hydration", "Essence patting"], "key_products": ["Hydrating Serum", "Hyaluronic Acid"]},
+    {"name": "Skin Barrier Repair", "description": "Routines built around ceramides and gentle cleansing.",
+     "techniques": ["Minimal routine", "Slugging"], "key_products": ["Barrier Repair Moisturizer", "Ceramides"]},
+    {"name": "Retinol Night Routine", "description": "Overnight retinol paired with rich creams.",
+     "techniques": ["Sandwich method"], "key_products": ["Overnight Eye Cream", "Retinol"]},
+    {"name": "Peptide Lips", "description": "Plumping peptide lip treatments worn alone or under gloss.",
+     "techniques": ["Lip masking"], "key_products": ["Peptide Lipstick", "Peptides"]},
+    {"name": "Soft Focus Complexion", "description": "Blurred, velvet matte skin that still looks natural.",
+     "techniques": ["Sheer layering", "Targeted powder"], "key_products": ["Soft Focus Foundation", "Velvet Blush"]},
+    {"name": "Long-Wear Base", "description": "Transfer-proof foundation that lasts all day.",
+     "techniques": ["Thin layers", "Setting spray"], "key_products": ["Double Wear Foundation"]},
+    {"name": "Scalp Care", "description": "Skincare ingredients migrate to the scalp and hair.",
+     "techniques": ["Pre-wash oiling"], "key_products": ["Hair Oil", "Niacinamide"]},
+    {"name": "Signature Scent Layering", "description": "Combining eau de parfum for a personal scent.",
+     "techniques": ["Scent layering"], "key_products": ["Eau de Parfum"]},
+    {"name": "Vitamin C Glow", "description": "Brightening serums for radiance.",
+     "techniques": ["Morning antioxidant"], "key_products": ["Luminous Serum", "Vitamin C"]},
+    {"name": "Lash Lift Look", "description": "Lifted, defined lashes with tubing mascara.",
+     "techniques": ["Lash curling"], "key_products": ["Mascara"]},
+    {"name": "Double Cleansing", "description": "Oil cleanser followed by a gentle foam cleanser.",
+     "techniques": ["Oil cleanse", "Second cleanse"], "key_products": ["Hydrating Cleanser", "Squalane"]},
+    {"name": "Cloud Blush", "description": "Diffused, airy blush placed high on the cheeks.",
+     "techniques": ["Stippling"], "key_products": ["Velvet Blush"]},
+]
+
+
+def product_vectors(matcher: TrendProductMatcher) -> List[Dict[int, float]]:
+    """Each product's sparse vector as a dict, for the loop baseline."""
+    n_products = len(matcher.catalog)
+    features = np.repeat(np.arange(len(matcher.indptr) - 1), np.diff(matcher.indptr))
+    order = np.argsort(matcher.rows, kind="stable")
+    bounds = np.searchsorted(matcher.rows[order], np.arange(n_products + 1))
+    vectors = []
+    for product_id in range(n_products):
+        idx = order[bounds[product_id] : bounds[product_id + 1]]
+        vectors.append(dict(zip(features[idx].tolist(), matcher.values[idx].tolist())))
+    return vectors
+
+
+def loop_top_k(matcher: TrendProductMatcher, vectors: List[Dict[int, float]], k: int):
+    """Score trends one at a time with a Python loop over every product."""
+    results = []
+    for trend in TRENDS:
+        trend_ids, features, weights = matcher._query_matrix([trend])
+        query = dict(zip(features.tolist(), weights.tolist()))
+        scored = (
+            (sum(w * vector.get(f, 0.0) for f, w in query.items()), product_id)
+            for product_id, vector in enumerate(vectors)
+        )
+        results.append([(p, s) for s, p in heapq.nlargest(k, scored) if s > 0])
+    return results
+
+
+def main(argv: List[str] = None):
+    """Main function to run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    catalog = ProductCatalog(synthetic_products(args.products))
+    start = time.perf_counter()
+    matcher = TrendProductMatcher.build(catalog)
+    build_seconds = time.perf_counter() - start
+
+    batched_times = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        batched = matcher.top_k(TRENDS, args.k)
+        batched_times.append(time.perf_counter() - start)
+    batched_seconds = min(batched_times)
+
+    vectors = product_vectors(matcher)
+    start = time.perf_counter()
+    looped = loop_top_k(matcher, vectors, args.k)
+    loop_seconds = time.perf_counter() - start
+
+    failures = 0
+    for trend, fast, slow in zip(TRENDS, batched, looped):
+        fast_scores = [round(s, 4) for _, s in fast]
+        slow_scores = [round(s, 4) for _, s in slow]
+        if fast_scores != slow_scores:
+            logger.error(f"{trend['name']}: batched {fast_scores} != loop {slow_scores}")
+            failures += 1
+
+    print("\n" + "=" * 70)
+    print(f"Products: {len(catalog)}, trends: {len(TRENDS)}, k={args.k}")
+    print(f"Catalog vectorization (once per catalog version): {build_seconds:.1f}s")
+    print(f"Batched NumPy matching:   {batched_seconds * 1000:8.1f} ms per report")
+    print(f"Per-trend Python loops:   {loop_seconds * 1000:8.1f} ms per report")
+    print(f"Speedup: {loop_seconds / batched_seconds:.0f}x")
+    print("-" * 70)
+    for trend, matches in zip(TRENDS[:3], batched[:3]):
+        names = ", ".join(catalog.products[p]["name"] for p, _ in matches[:3])
+        print(f"{trend['name']:<22} -> {names}")
+    print("=" * 70)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Product Catalog Store Builder
+Converts the scraper's JSONL or CSV output into a columnar catalog store
+(string arenas with offsets, NumPy numeric columns, prebuilt search indexes
+and trend-matcher arrays) that the app memory-maps read-only at startup.
+Point PRODUCT_CATALOG_PATH at the resulting .catalog file.
+
+Example:
+    python scripts/build_catalog.py sephora_products.jsonl
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from typing import List
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPTS_DIR)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "src"))
+
+from estee_lauder_trend_agent.catalog import ProductCatalog
+from estee_lauder_trend_agent.catalog_store import write_catalog_store
+from estee_lauder_trend_agent.matching import TrendProductMatcher
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def build_catalog(input_path: str, output_path: str, with_matcher: bool = True):
+    """Load ``input_path`` and write it as a catalog store to ``output_path``."""
+    start = time.perf_counter()
+    catalog = ProductCatalog.load(input_path)
+    matcher = TrendProductMatcher.build(catalog) if with_matcher else None
+    write_catalog_store(catalog, output_path, matcher)
+    logger.info(
+        f"Wrote {len(catalog)} products to {output_path} "
+        f"({os.path.getsize(output_path) / 1e6:.1f} MB, catalog {catalog.version}) "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+
+
+def main(argv: List[str] = None):
+    """Main function to run the builder."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("input", help="Scraper output (.jsonl or .csv)")
+    parser.add_argument("--output", help="Catalog store path (default: <input>.catalog)")
+    parser.add_argument("--no-matcher", action="store_true",
+                        help="Leave out the trend-matcher arrays (built at startup instead)")
+    args = parser.parse_args(argv)
+
+    output = args.output or os.path.splitext(args.input)[0] + ".catalog"
+    build_catalog(args.input, output, with_matcher=not args.no_matcher)
+
+
+if __name__ == "__main__":
+    main()
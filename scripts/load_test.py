@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Backend Load Test
+Drives /ai_transform_image and the ADK /run and /run_sse endpoints at a
+configurable concurrency and reports throughput, latency percentiles and
+server RSS. With --launch it starts the stub Gemini/FLUX backends and the
+FastAPI app locally, so no quota is spent.
+
+Examples:
+    python scripts/load_test.py --launch --scenario transform --concurrency 20 --requests 200
+    python scripts/load_test.py --launch --scenario run_sse --concurrency 10 --requests 50 \\
+        --stub-args="--gemini-latency lognormal:2,0.3 --composer-latency fixed:1"
+    python scripts/load_test.py --target http://localhost:8000 --server-pid 1234 --scenario run
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import os
+import shlex
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import httpx
+
+from stub_backends import make_png
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPTS_DIR)
+APP_NAME = "estee_lauder_trend_agent"
+SCENARIOS = ["transform", "run", "run_sse"]
+
+# Small input photo for image transforms (the stub ignores its content).
+SAMPLE_IMAGE_B64 = base64.b64encode(make_png(16 * 1024)).decode()
+
+
+# =============================================================================
+# METRICS
+# =============================================================================
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return float("nan")
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+@dataclass
+class ScenarioStats:
+    latencies: List[float] = field(default_factory=list)
+    first_event_latencies: List[float] = field(default_factory=list)
+    errors: Dict[str, int] = field(default_factory=dict)
+    response_bytes: int = 0
+
+    def record_error(self, reason: str):
+        self.errors[reason] = self.errors.get(reason, 0) + 1
+
+
+def read_rss_kb(pid: int) -> Optional[int]:
+    """Resident set size of ``pid`` (and its children) in KiB, or None."""
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            pids += [int(p) for p in f.read().split()]
+    except OSError:
+        pass
+    total = 0
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+                        break
+        except OSError:
+            # macOS / no procfs: fall back to ps.
+            try:
+                output = subprocess.run(
+                    ["ps", "-o", "rss=", "-p", str(p)], capture_output=True, text=True
+                ).stdout.strip()
+                total += int(output) if output else 0
+            except (OSError, ValueError):
+                return None
+    return total or None
+
+
+class RssSampler:
+    """Samples server RSS in the background while the load runs."""
+
+    def __init__(self, pid: Optional[int], interval: float = 0.5):
+        self.pid = pid
+        self.interval = interval
+        self.samples: List[int] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            if (rss := read_rss_kb(self.pid)) is not None:
+                self.samples.append(rss)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self.pid:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+# =============================================================================
+# SCENARIOS
+# =============================================================================
+
+
+async def _create_session(client: httpx.AsyncClient, user_id: str) -> str:
+    session_id = str(uuid.uuid4())
+    response = await client.post(
+        f"/apps/{APP_NAME}/users/{user_id}/sessions/{session_id}", json={}
+    )
+    response.raise_for_status()
+    return session_id
+
+
+def _run_payload(user_id: str, session_id: str, streaming: bool) -> dict:
+    return {
+        "appName": APP_NAME,
+        "userId": user_id,
+        "sessionId": session_id,
+        "newMessage": {"role": "user", "parts": [{"text": "start"}]},
+        "streaming": streaming,
+    }
+
+
+async def transform_once(client: httpx.AsyncClient, stats: ScenarioStats):
+    payload = {
+        "trend_info": {
+            "name": "Glass Skin",
+            "description": "Luminous, poreless skin with a reflective finish.",
+            "techniques": ["Pat gently", "Apply in layers"],
+            "category": "skincare",
+        },
+        "image_data": SAMPLE_IMAGE_B64,
+    }
+    start = time.perf_counter()
+    response = await client.post("/ai_transform_image", json=payload)
+    elapsed = time.perf_counter() - start
+    stats.response_bytes += len(response.content)
+    if response.status_code != 200:
+        stats.record_error(f"HTTP {response.status_code}")
+    elif not response.json().get("success"):
+        stats.record_error(response.json().get("error", "unknown")[:60])
+    else:
+        stats.latencies.append(elapsed)
+        # Fetch the stored image like the browser does (not part of the latency)
+        if image_url := response.json().get("image_url"):
+            image = await client.get(image_url)
+            stats.response_bytes += len(image.content)
+            if image.status_code != 200:
+                stats.record_error(f"image HTTP {image.status_code}")
+
+
+async def run_once(client: httpx.AsyncClient, stats: ScenarioStats):
+    user_id = f"load-{uuid.uuid4().hex[:8]}"
+    session_id = await _create_session(client, user_id)
+    start = time.perf_counter()
+    response = await client.post("/run", json=_run_payload(user_id, session_id, False))
+    elapsed = time.perf_counter() - start
+    stats.response_bytes += len(response.content)
+    if response.status_code != 200:
+        stats.record_error(f"HTTP {response.status_code}")
+    else:
+        stats.latencies.append(elapsed)
+
+
+async def run_sse_once(client: httpx.AsyncClient, stats: ScenarioStats):
+    user_id = f"load-{uuid.uuid4().hex[:8]}"
+    session_id = await _create_session(client, user_id)
+    start = time.perf_counter()
+    first_event = None
+    async with client.stream(
+        "POST",
+        "/run_sse",
+        json=_run_payload(user_id, session_id, True),
+        headers={"Accept": "text/event-stream"},
+    ) as response:
+        if response.status_code != 200:
+            stats.record_error(f"HTTP {response.status_code}")
+            return
+        async for line in response.aiter_lines():
+            stats.response_bytes += len(line) + 1
+            if not line.startswith("data: "):
+                continue
+            if first_event is None:
+                first_event = time.perf_counter() - start
+            if '"error"' in line:
+                error = json.loads(line[6:]).get("error")
+                if error:
+                    stats.record_error(str(error)[:60])
+                    return
+    stats.latencies.append(time.perf_counter() - start)
+    if first_event is not None:
+        stats.first_event_latencies.append(first_event)
+
+
+SCENARIO_FUNCS = {"transform": transform_once, "run": run_once, "run_sse": run_sse_once}
+
+
+async def drive(
+    target: str, scenario: str, concurrency: int, total: int, timeout: float
+) -> tuple:
+    """Run ``total`` requests of ``scenario`` with ``concurrency`` workers."""
+    stats = ScenarioStats()
+    queue: asyncio.Queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=target, timeout=timeout, limits=limits) as client:
+
+        async def worker():
+            while True:
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    await SCENARIO_FUNCS[scenario](client, stats)
+                except httpx.HTTPError as e:
+                    stats.record_error(type(e).__name__)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - start
+    return stats, wall
+
+
+def format_report(scenario: str, concurrency: int, stats: ScenarioStats, wall: float, rss: List[int]) -> str:
+    latencies = sorted(stats.latencies)
+    ok = len(latencies)
+    failed = sum(stats.errors.values())
+    lines = [
+        f"Scenario: {scenario}  (concurrency {concurrency})",
+        "=" * 60,
+        f"Requests:      {ok + failed} ({ok} ok, {failed} failed) in {wall:.2f}s",
+        f"Throughput:    {ok / wall if wall else 0:.2f} req/s",
+        f"Latency p50:   {percentile(latencies, 50):.3f}s",
+        f"Latency p95:   {percentile(latencies, 95):.3f}s",
+        f"Latency p99:   {percentile(latencies, 99):.3f}s",
+        f"Latency max:   {latencies[-1] if latencies else float('nan'):.3f}s",
+        f"Response data: {stats.response_bytes / 1024 / 1024:.1f} MiB",
+    ]
+    if stats.first_event_latencies:
+        first = sorted(stats.first_event_latencies)
+        lines.append(
+            f"First event:   p50 {percentile(first, 50):.3f}s  p95 {percentile(first, 95):.3f}s"
+        )
+    if rss:
+        lines.append(
+            f"Server RSS:    start {rss[0] / 1024:.0f} MiB, peak {max(rss) / 1024:.0f} MiB, "
+            f"end {rss[-1] / 1024:.0f} MiB"
+        )
+    for reason, count in stats.errors.items():
+        lines.append(f"  error x{count}: {reason}")
+    return "\n".join(lines)
+
+
+# =============================================================================
+# LOCAL STACK
+# =============================================================================
+
+
+def _wait_for_health(url: str, timeout: float = 60.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{url}/health", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{url} did not become healthy within {timeout}s")
+
+
+def launch_stack(
+    app_port: int, stub_port: int, stub_args: str, app_log: str
+) -> List[subprocess.Popen]:
+    """Start the stub backends and the FastAPI app wired to them.
+
+    The app's (very verbose) logs are written to ``app_log``.
+    """
+    stub_url = f"http://127.0.0.1:{stub_port}"
+    stubs = subprocess.Popen(
+        [sys.executable, os.path.join(SCRIPTS_DIR, "stub_backends.py"), "--port", str(stub_port)]
+        + shlex.split(stub_args)
+    )
+    _wait_for_health(stub_url)
+
+    env = dict(
+        os.environ,
+        GOOGLE_GENAI_USE_VERTEXAI="False",
+        GOOGLE_API_KEY="stub-key",
+        GOOGLE_GEMINI_BASE_URL=f"{stub_url}/",
+        AZURE_OPENAI_API_KEY="stub-key",
+        AZURE_FLUX_EDIT_URL=f"{stub_url}/openai/deployments/FLUX.1-Kontext-pro/images/edits?api-version=2025-04-01-preview",
+    )
+    log_file = open(app_log, "w", encoding="utf-8")
+    app = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "src.app:app",
+            "--host", "127.0.0.1", "--port", str(app_port), "--log-level", "warning",
+        ],
+        cwd=PROJECT_ROOT,
+        env=env,
+        stdout=log_file,
+        stderr=subprocess.STDOUT,
+    )
+    try:
+        _wait_for_health(f"http://127.0.0.1:{app_port}")
+    except RuntimeError:
+        stubs.terminate()
+        app.terminate()
+        raise
+    return [stubs, app]
+
+
+async def run_load(args) -> None:
+    processes = []
+    target = args.target
+    server_pid = args.server_pid
+    if args.launch:
+        processes = launch_stack(
+            args.app_port, args.stub_port, args.stub_args, args.app_log
+        )
+        logger.info(f"Backend logs are written to {args.app_log}")
+        target = f"http://127.0.0.1:{args.app_port}"
+        server_pid = processes[-1].pid
+
+    try:
+        for scenario in args.scenario:
+            sampler = RssSampler(server_pid)
+            sampler.start()
+            stats, wall = await drive(
+                target, scenario, args.concurrency, args.requests, args.timeout
+            )
+            await sampler.stop()
+            print()
+            print(format_report(scenario, args.concurrency, stats, wall, sampler.samples))
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait(timeout=10)
+
+
+def main(argv: List[str] = None):
+    """Main function to run the load test."""
+    parser = argparse.ArgumentParser(
+        description="Load test the trend intelligence backend.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument("--scenario", choices=SCENARIOS, action="append",
+                        help="Scenario to run (repeatable, default: all)")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=100, help="Requests per scenario")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-request timeout (s)")
+    parser.add_argument("--target", default="http://127.0.0.1:8000", help="Backend URL")
+    parser.add_argument("--server-pid", type=int, help="Backend PID for RSS sampling")
+    parser.add_argument("--launch", action="store_true",
+                        help="Start stub backends and the app locally")
+    parser.add_argument("--app-port", type=int, default=8800)
+    parser.add_argument("--stub-port", type=int, default=8900)
+    parser.add_argument("--stub-args", default="", help="Extra arguments for stub_backends.py")
+    parser.add_argument("--app-log", default="load_test_app.log",
+                        help="Log file for the launched backend")
+    args = parser.parse_args(argv)
+    args.scenario = args.scenario or SCENARIOS
+
+    asyncio.run(run_load(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Agent Run Replay
+Replays a recorded root_agent run (see AGENT_CASSETTE_DIR) through the real
+SequentialAgent, callbacks and composer parsing with no network access, and
+reports how long the orchestration and post-processing took. Use it as a
+performance regression check for everything except the model calls.
+
+Examples:
+    AGENT_CASSETTE_DIR=cassettes make run-backend        # record real runs
+    python scripts/replay_agent_run.py cassettes/e-1234.json.gz --iterations 20
+    python scripts/replay_agent_run.py cassettes/e-1234.json.gz --streaming --max-ms 250
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from typing import List
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPTS_DIR)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "src"))
+
+# Replays never reach Gemini, but the agent config still requires credentials.
+os.environ.setdefault("GOOGLE_GENAI_USE_VERTEXAI", "False")
+os.environ.setdefault("GOOGLE_API_KEY", "replay")
+
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from estee_lauder_trend_agent.agent import EsteeLauderTrendsReport, root_agent
+from estee_lauder_trend_agent.cassette import load_cassette, replay_cassette
+from estee_lauder_trend_agent.config import config
+from estee_lauder_trend_agent.latency_profiles import PROFILE_STATE_KEY
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+APP_NAME = "estee_lauder_trend_agent"
+USER_ID = "replay"
+
+
+async def replay_once(cassette, streaming: bool) -> dict:
+    """Replays the cassette once and returns the final session state."""
+    session_service = InMemorySessionService()
+    runner = Runner(agent=root_agent, session_service=session_service, app_name=APP_NAME)
+    # Replay under the recorded profile, whose search budget the run obeyed.
+    state = {PROFILE_STATE_KEY: cassette.latency_profile} if cassette.latency_profile else None
+    session = await session_service.create_session(app_name=APP_NAME, user_id=USER_ID, state=state)
+    run_config = RunConfig(
+        streaming_mode=StreamingMode.SSE if streaming else StreamingMode.NONE
+    )
+    message = types.Content(role="user", parts=[types.Part(text=cassette.user_message)])
+
+    with replay_cassette(root_agent, cassette):
+        async for _ in runner.run_async(
+            user_id=USER_ID,
+            session_id=session.id,
+            new_message=message,
+            run_config=run_config,
+        ):
+            pass
+
+    session = await session_service.get_session(
+        app_name=APP_NAME, user_id=USER_ID, session_id=session.id
+    )
+    return session.state
+
+
+def check_state(state: dict) -> List[str]:
+    """Returns the problems found in a replayed run's final state."""
+    problems = []
+    if not state.get("estee_lauder_trend_research_findings_with_citations"):
+        problems.append("research findings with citations are missing")
+    report = state.get("estee_lauder_trends_report")
+    if report is None:
+        problems.append("estee_lauder_trends_report is missing")
+    else:
+        try:
+            EsteeLauderTrendsReport.model_validate(report)
+        except ValueError as e:
+            problems.append(f"estee_lauder_trends_report is invalid: {e}")
+    return problems
+
+
+async def replay(args) -> int:
+    cassette = load_cassette(args.cassette)
+    # Never record the replays themselves.
+    config.cassette_dir = None
+
+    durations = []
+    first_state = None
+    for i in range(args.iterations):
+        start = time.perf_counter()
+        state = await replay_once(cassette, args.streaming)
+        durations.append((time.perf_counter() - start) * 1000)
+
+        problems = check_state(state)
+        if first_state is None:
+            first_state = state
+        elif state.get("estee_lauder_trends_report") != first_state.get(
+            "estee_lauder_trends_report"
+        ):
+            problems.append(f"iteration {i + 1} produced a different report")
+        if problems:
+            for problem in problems:
+                logger.error(problem)
+            return 1
+
+    durations.sort()
+    median = durations[len(durations) // 2]
+    print("\n" + "=" * 60)
+    print(f"Cassette:        {args.cassette}")
+    print(f"Model calls:     {len(cassette.interactions)} recorded responses")
+    print(f"Latency profile: {cassette.latency_profile or 'not recorded'}")
+    print(f"Iterations:      {args.iterations} ({'SSE' if args.streaming else 'non-streaming'})")
+    print(f"Replay time:     min {durations[0]:.1f}ms  median {median:.1f}ms  max {durations[-1]:.1f}ms")
+    print("=" * 60)
+
+    if args.max_ms and median > args.max_ms:
+        logger.error(f"Median replay time {median:.1f}ms exceeds --max-ms {args.max_ms}")
+        return 1
+    return 0
+
+
+def main(argv: List[str] = None):
+    """Main function to replay a recorded agent run."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("cassette", help="Path to a recorded .json.gz cassette")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--streaming", action="store_true", help="Replay with SSE streaming")
+    parser.add_argument("--max-ms", type=float, default=None,
+                        help="Fail if the median replay takes longer than this")
+    parser.add_argument("--verbose", action="store_true", help="Keep the agent's debug logging")
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+        logger.setLevel(logging.INFO)
+    sys.exit(asyncio.run(replay(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Sephora Crawl State
+Persistent, resumable crawl state in an embedded SQLite database: the
+discovered frontier in discovery order, each product's fetch status, and the
+rows extracted so far. Updates are committed in batches, so a crash loses at
+most one batch and a rerun picks up the pending products where it stopped.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+from typing import Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PENDING, DONE = "pending", "done"
+
+
+class CrawlState:
+    """Frontier, fetch status and extracted rows of one crawl.
+
+    Only the event loop thread may use an instance. Call ``commit`` (or
+    ``close``) at checkpoints; updates in between are flushed every
+    ``batch_size`` writes.
+    """
+
+    def __init__(self, path: str, batch_size: int = 100):
+        self.path = path
+        self.batch_size = batch_size
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS frontier (
+                position INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT UNIQUE NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                row TEXT
+            );
+            CREATE INDEX IF NOT EXISTS frontier_status ON frontier (status, position);
+            """
+        )
+        self._db.commit()
+        self._pending_writes = 0
+
+    # -------------------------------------------------------------------------
+    # Run metadata
+    # -------------------------------------------------------------------------
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+        self._written()
+
+    @property
+    def discovery_complete(self) -> bool:
+        return self.get_meta("discovery_complete") == "1"
+
+    @property
+    def finished(self) -> bool:
+        return self.get_meta("finished") == "1"
+
+    def reset(self):
+        """Forget the previous crawl and start from an empty state."""
+        self._db.execute("DELETE FROM frontier")
+        self._db.execute("DELETE FROM meta")
+        self.commit()
+
+    # -------------------------------------------------------------------------
+    # Frontier
+    # -------------------------------------------------------------------------
+
+    def add_urls(self, urls: Iterable[str]) -> int:
+        """Append canonical product URLs not already in the frontier."""
+        before = self._db.total_changes
+        self._db.executemany(
+            "INSERT OR IGNORE INTO frontier (url) VALUES (?)", ((url,) for url in urls)
+        )
+        self._written()
+        return self._db.total_changes - before
+
+    def urls(self) -> List[str]:
+        """Every frontier URL in discovery order."""
+        return [url for (url,) in self._db.execute("SELECT url FROM frontier ORDER BY position")]
+
+    def pending_urls(self, limit: Optional[int] = None) -> List[str]:
+        """URLs still to fetch (including ones whose fetch failed), in discovery order."""
+        rows = self._db.execute(
+            "SELECT url FROM frontier WHERE status = ? ORDER BY position LIMIT ?",
+            (PENDING, -1 if limit is None else limit),
+        )
+        return [url for (url,) in rows]
+
+    # -------------------------------------------------------------------------
+    # Fetch status and rows
+    # -------------------------------------------------------------------------
+
+    def mark_done(self, url: str, row: Optional[Dict]):
+        """Record a fetched and parsed page (``row`` is None if it had no product)."""
+        self._db.execute(
+            "UPDATE frontier SET status = ?, row = ? WHERE url = ?",
+            (DONE, json.dumps(row) if row else None, url),
+        )
+        self._written()
+
+    def rows(self) -> Iterator[Dict]:
+        """Extracted rows in discovery order."""
+        for (row,) in self._db.execute(
+            "SELECT row FROM frontier WHERE status = ? AND row IS NOT NULL ORDER BY position",
+            (DONE,),
+        ):
+            yield json.loads(row)
+
+    def counts(self) -> Dict[str, int]:
+        counts = {PENDING: 0, DONE: 0}
+        counts.update(self._db.execute("SELECT status, COUNT(*) FROM frontier GROUP BY status"))
+        counts["rows"] = self._db.execute(
+            "SELECT COUNT(*) FROM frontier WHERE row IS NOT NULL"
+        ).fetchone()[0]
+        return counts
+
+    # -------------------------------------------------------------------------
+    # Checkpoints
+    # -------------------------------------------------------------------------
+
+    def _written(self):
+        self._pending_writes += 1
+        if self._pending_writes >= self.batch_size:
+            self.commit()
+
+    def commit(self):
+        self._db.commit()
+        self._pending_writes = 0
+
+    def close(self):
+        self.commit()
+        self._db.close()
+
+
+def open_crawl_state(path: str, base_url: str, fresh: bool = False) -> CrawlState:
+    """Open the state at ``path``, resuming it unless it is finished or ``fresh``.
+
+    Raises:
+        ValueError: If the state belongs to a crawl of a different site.
+    """
+    state = CrawlState(path)
+    if fresh or state.finished:
+        state.reset()
+    stored_base_url = state.get_meta("base_url")
+    if stored_base_url and stored_base_url != base_url:
+        state.close()
+        raise ValueError(
+            f"Crawl state {path} belongs to {stored_base_url}, not {base_url}; "
+            "pass --fresh or another --state-db"
+        )
+    if stored_base_url:
+        counts = state.counts()
+        logger.info(
+            f"Resuming crawl from {os.path.abspath(path)}: {counts[DONE]} pages done "
+            f"({counts['rows']} rows), {counts[PENDING]} pending"
+        )
+    else:
+        state.set_meta("base_url", base_url)
+        state.commit()
+    return state
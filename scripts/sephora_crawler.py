@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Sephora Async Crawl Engine
+Concurrent page fetching for the Sephora scraper: one connection-pooled
+httpx.AsyncClient, a per-host token-bucket rate limiter in place of fixed
+random sleeps, bounded concurrency, and retries that honour Retry-After.
+With an HttpCache, requests are conditional and unchanged pages are flagged.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Iterable, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from sephora_http_cache import HttpCache
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+# =============================================================================
+# RATE LIMITING
+# =============================================================================
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` tokens per second, up to ``burst`` saved."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a token is available and take it (FIFO among waiters)."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def block_for(self, seconds: float):
+        """Pause the bucket, e.g. when the host answers with Retry-After."""
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+
+class HostRateLimiter:
+    """One token bucket per host, created on first use."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def bucket(self, url: str) -> TokenBucket:
+        host = urlparse(url).netloc
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(self.rate, self.burst)
+        return self._buckets[host]
+
+    async def acquire(self, url: str):
+        await self.bucket(url).acquire()
+
+
+# =============================================================================
+# CRAWLER
+# =============================================================================
+
+
+@dataclass
+class FetchResult:
+    url: str
+    status_code: int
+    content: bytes
+    headers: Dict[str, str]
+    elapsed: float
+    # True when the body is byte-identical to the cached copy (304 or same hash)
+    unchanged: bool = False
+
+
+@dataclass
+class CrawlStats:
+    requests: int = 0
+    retries: int = 0
+    errors: int = 0
+    bytes: int = 0
+    unchanged: int = 0
+    statuses: Counter = field(default_factory=Counter)
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def summary(self) -> str:
+        rate = self.requests / self.elapsed if self.elapsed else 0.0
+        return (
+            f"{self.requests} requests ({self.retries} retries, {self.errors} failed, "
+            f"{self.unchanged} unchanged) in {self.elapsed:.1f}s, {rate:.1f} req/s, "
+            f"{self.bytes / 1e6:.1f} MB transferred, "
+            f"statuses {dict(self.statuses)}"
+        )
+
+
+class AsyncCrawler:
+    """Fetches pages concurrently while keeping per-host politeness limits.
+
+    Use as an async context manager::
+
+        async with AsyncCrawler(headers, concurrency=8, rate_per_host=2.0) as crawler:
+            async for result in crawler.fetch_many(urls):
+                ...
+    """
+
+    def __init__(
+        self,
+        headers: Optional[Dict[str, str]] = None,
+        concurrency: int = 8,
+        rate_per_host: float = 2.0,
+        burst: int = 2,
+        timeout: float = 10.0,
+        max_retries: int = 2,
+        cache: Optional[HttpCache] = None,
+    ):
+        self.headers = headers or {}
+        self.concurrency = concurrency
+        self.limiter = HostRateLimiter(rate_per_host, burst)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.cache = cache
+        self.stats = CrawlStats()
+        self.client: Optional[httpx.AsyncClient] = None
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def __aenter__(self) -> "AsyncCrawler":
+        self.client = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=self.timeout,
+            follow_redirects=True,
+            max_redirects=3,
+            limits=httpx.Limits(
+                max_connections=self.concurrency,
+                max_keepalive_connections=self.concurrency,
+            ),
+        )
+        self.stats = CrawlStats()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.client.aclose()
+        self.client = None
+
+    async def fetch(self, url: str) -> Optional[FetchResult]:
+        """Fetch one URL, retrying throttled and transient failures.
+
+        Returns None when the page could not be fetched successfully.
+        """
+        async with self._semaphore:
+            attempt = 0
+            conditional = self.cache is not None
+            while attempt <= self.max_retries:
+                await self.limiter.acquire(url)
+                start = time.perf_counter()
+                entry = self.cache.lookup(url) if conditional else None
+                headers = self.cache.conditional_headers(entry) if entry else None
+                try:
+                    response = await self.client.get(url, headers=headers)
+                except httpx.HTTPError as e:
+                    self.stats.requests += 1
+                    if attempt < self.max_retries:
+                        self.stats.retries += 1
+                        await asyncio.sleep(2**attempt + random.random())
+                        attempt += 1
+                        continue
+                    logger.error(f"Error fetching {url}: {e}")
+                    self.stats.errors += 1
+                    return None
+
+                self.stats.requests += 1
+                self.stats.bytes += len(response.content)
+                self.stats.statuses[response.status_code] += 1
+                if response.status_code == 304 and entry:
+                    body = self.cache.not_modified(entry, response.headers)
+                    if body is None:
+                        # Cached body lost: ask again unconditionally. This is
+                        # not a failure, so it does not use up a retry.
+                        conditional = False
+                        continue
+                    self.stats.unchanged += 1
+                    return FetchResult(
+                        url=url,
+                        status_code=304,
+                        content=body,
+                        headers=dict(response.headers),
+                        elapsed=time.perf_counter() - start,
+                        unchanged=True,
+                    )
+                if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                    self.stats.retries += 1
+                    delay = self._retry_after(response) or 2**attempt + random.random()
+                    if response.status_code == 429:
+                        self.limiter.bucket(url).block_for(delay)
+                    logger.warning(
+                        f"{response.status_code} from {url}, retrying in {delay:.1f}s"
+                    )
+                    await asyncio.sleep(delay)
+                    attempt += 1
+                    continue
+                if response.status_code >= 400:
+                    logger.error(f"HTTP {response.status_code} fetching {url}")
+                    self.stats.errors += 1
+                    return None
+                unchanged = bool(
+                    self.cache and self.cache.store(url, response.content, response.headers)
+                )
+                self.stats.unchanged += unchanged
+                return FetchResult(
+                    url=url,
+                    status_code=response.status_code,
+                    content=response.content,
+                    headers=dict(response.headers),
+                    elapsed=time.perf_counter() - start,
+                    unchanged=unchanged,
+                )
+        return None
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> Optional[float]:
+        value = response.headers.get("Retry-After")
+        try:
+            return float(value) if value else None
+        except ValueError:
+            return None
+
+    async def fetch_many(self, urls: Iterable[str]) -> AsyncIterator[FetchResult]:
+        """Fetch URLs concurrently, yielding successful results as they complete."""
+        pending = set()
+        url_iter = iter(urls)
+        # Keep a little more than `concurrency` requests in flight so the
+        # semaphore always has a waiter ready, without creating a task per URL.
+        window = self.concurrency * 2
+
+        def refill():
+            for url in url_iter:
+                pending.add(asyncio.ensure_future(self.fetch(url)))
+                if len(pending) >= window:
+                    break
+
+        refill()
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                pending.difference_update(done)
+                refill()
+                for task in done:
+                    result = task.result()
+                    if result is not None:
+                        yield result
+        finally:
+            for task in pending:
+                task.cancel()
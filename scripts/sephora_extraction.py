@@ -0,0 +1,567 @@
+#!/usr/bin/env python3
+"""
+Sephora Product Extraction Plan
+Compiles the per-field CSS selector lists of the product scraper into a single
+plan that is matched in one pass over the DOM, instead of one `select_one`
+tree walk per selector per field. Uses lxml when available and falls back to
+BeautifulSoup's html.parser.
+
+Product pages also embed their data as JSON (ld+json and the app's
+application/json state). `extract_product` reads those blobs straight from
+the raw HTML and only builds a DOM for the fields they do not provide.
+"""
+
+import json
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+
+    HAS_LXML = True
+except ImportError:  # pragma: no cover - lxml is a project dependency
+    HAS_LXML = False
+
+logger = logging.getLogger(__name__)
+
+# Elements whose text BeautifulSoup's get_text() leaves out.
+_SKIPPED_TEXT_TAGS = {"script", "style", "template"}
+
+
+# =============================================================================
+# SELECTORS
+# =============================================================================
+
+_SELECTOR_RE = re.compile(r"^(?P<tag>[a-zA-Z][\w-]*)?(?P<rest>(?:\.[\w-]+|\[[^\]]+\])*)$")
+_PART_RE = re.compile(r"\.([\w-]+)|\[([\w-]+)\s*(?:([*^$]?=)\s*[\"']?([^\"'\]]*)[\"']?)?\]")
+
+
+@dataclass(frozen=True)
+class SimpleSelector:
+    """A compound CSS selector: optional tag, classes and attribute tests.
+
+    Only the selector forms the scraper uses are supported (no combinators),
+    which is what lets every selector be tested against each element during a
+    single document-order traversal.
+    """
+
+    text: str
+    tag: Optional[str]
+    classes: Tuple[str, ...]
+    attributes: Tuple[Tuple[str, str, str], ...]
+
+    @classmethod
+    def parse(cls, text: str) -> "SimpleSelector":
+        match = _SELECTOR_RE.match(text.strip())
+        if not match or not (match.group("tag") or match.group("rest")):
+            raise ValueError(f"Unsupported selector for an extraction plan: {text!r}")
+        classes, attributes = [], []
+        for class_name, attr, op, value in _PART_RE.findall(match.group("rest")):
+            if class_name:
+                classes.append(class_name)
+            else:
+                attributes.append((attr, op or "", value))
+        tag = match.group("tag")
+        return cls(text, tag.lower() if tag else None, tuple(classes), tuple(attributes))
+
+    @property
+    def dispatch_key(self) -> tuple:
+        """The most selective single test; an element can only match if it has it."""
+        for name, op, value in self.attributes:
+            if op == "=":
+                return ("attr", name, value)
+        if self.classes:
+            return ("class", self.classes[0])
+        if self.tag:
+            return ("tag", self.tag)
+        return ("any",)
+
+    def matches(self, tag: str, attrs) -> bool:
+        if self.tag and tag != self.tag:
+            return False
+        if self.classes:
+            element_classes = (attrs.get("class") or "").split()
+            if not all(c in element_classes for c in self.classes):
+                return False
+        for name, op, value in self.attributes:
+            actual = attrs.get(name)
+            if actual is None:
+                return False
+            if op == "=" and actual != value:
+                return False
+            if op == "*=" and value not in actual:
+                return False
+            if op == "^=" and not actual.startswith(value):
+                return False
+            if op == "$=" and not actual.endswith(value):
+                return False
+        return True
+
+
+# =============================================================================
+# FIELD RULES
+# =============================================================================
+
+
+@dataclass
+class FieldRule:
+    """How one product field is extracted.
+
+    The first element matched by each selector is tried in order, and the
+    first one whose text ``accept`` turns into a value wins, exactly like the
+    scraper's original `select_one` loops.
+    """
+
+    name: str
+    selectors: List[str]
+    accept: Callable[[str], Optional[str]] = lambda text: text or None
+    default: str = ""
+
+
+def _regex(pattern: str, group: int = 0) -> Callable[[str], Optional[str]]:
+    compiled = re.compile(pattern)
+
+    def accept(text: str) -> Optional[str]:
+        match = compiled.search(text)
+        return match.group(group) if match else None
+
+    return accept
+
+
+def _substantial(text: str) -> Optional[str]:
+    # Only return substantial descriptions, limited in length
+    return text[:500] if len(text) > 20 else None
+
+
+PRODUCT_FIELD_RULES = [
+    FieldRule("name", ["h1", ".css-1xvwxyi", '[data-at="product_name"]']),
+    FieldRule("brand", [".css-1xvwxyi", '[data-at="brand_name"]', ".css-1qe8tjm"]),
+    FieldRule(
+        "price",
+        [
+            '.css-1xvwxyi[data-at="price"]',
+            '[data-at="price"]',
+            '.css-1qe8tjm[data-at="price"]',
+            ".css-1xvwxyi",
+            ".css-1qe8tjm",
+        ],
+        accept=_regex(r"\$[\d,]+\.?\d*"),
+    ),
+    FieldRule(
+        "rating",
+        [
+            '[data-at="number_of_reviews"]',
+            '.css-1xvwxyi[data-at="number_of_reviews"]',
+            '.css-1qe8tjm[data-at="number_of_reviews"]',
+        ],
+        accept=_regex(r"(\d+\.?\d*)\s*out\s*of\s*5", 1),
+    ),
+    FieldRule(
+        "review_count",
+        [
+            '[data-at="number_of_reviews"]',
+            '.css-1xvwxyi[data-at="number_of_reviews"]',
+            '.css-1qe8tjm[data-at="number_of_reviews"]',
+        ],
+        accept=_regex(r"(\d+(?:,\d+)*)\s*reviews?", 1),
+    ),
+    FieldRule(
+        "category",
+        [
+            '.css-1xvwxyi[data-at="breadcrumb"]',
+            '[data-at="breadcrumb"]',
+            '.css-1qe8tjm[data-at="breadcrumb"]',
+        ],
+    ),
+    FieldRule(
+        "description",
+        [
+            '[data-at="product_description"]',
+            '.css-1xvwxyi[data-at="product_description"]',
+            '.css-1qe8tjm[data-at="product_description"]',
+            ".css-1xvwxyi",
+            ".css-1qe8tjm",
+        ],
+        accept=_substantial,
+    ),
+    FieldRule(
+        "ingredients",
+        [
+            '[data-at="ingredients"]',
+            '.css-1xvwxyi[data-at="ingredients"]',
+            '.css-1qe8tjm[data-at="ingredients"]',
+        ],
+    ),
+    FieldRule(
+        "size",
+        ['[data-at="size"]', '.css-1xvwxyi[data-at="size"]', '.css-1qe8tjm[data-at="size"]'],
+    ),
+    FieldRule(
+        "availability",
+        [
+            '[data-at="availability"]',
+            '.css-1xvwxyi[data-at="availability"]',
+            '.css-1qe8tjm[data-at="availability"]',
+        ],
+        default="Available",  # Default assumption
+    ),
+]
+
+
+# =============================================================================
+# EXTRACTION PLAN
+# =============================================================================
+
+
+def _lxml_text(element) -> str:
+    """Text of an lxml element, matching BeautifulSoup's get_text(strip=True)."""
+    parts = []
+
+    def walk(node):
+        if node.text and node.tag not in _SKIPPED_TEXT_TAGS:
+            parts.append(node.text.strip())
+        for child in node:
+            if isinstance(child.tag, str):
+                walk(child)
+            if child.tail:
+                parts.append(child.tail.strip())
+
+    walk(element)
+    return "".join(parts)
+
+
+@dataclass
+class ExtractionPlan:
+    """All field rules compiled into one deduplicated list of selectors.
+
+    Selectors are bucketed by their most selective test (an attribute value,
+    a class or a tag), so during the single document-order traversal each
+    element is only tested against the few selectors that could match it.
+    The first match of every selector is recorded and the traversal stops
+    once all have matched. Fields are then resolved from those first matches,
+    and each element's text is computed at most once.
+    """
+
+    rules: List[FieldRule]
+    selectors: List[SimpleSelector] = field(init=False)
+    _rule_indices: Dict[str, List[int]] = field(init=False, repr=False)
+    _dispatch: Dict[tuple, List[int]] = field(init=False, repr=False)
+    _dispatch_attrs: Tuple[str, ...] = field(init=False, repr=False)
+    _subplans: Dict[frozenset, "ExtractionPlan"] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        index_by_text: Dict[str, int] = {}
+        self._rule_indices = {}
+        for rule in self.rules:
+            indices = []
+            for text in rule.selectors:
+                if text not in index_by_text:
+                    index_by_text[text] = len(index_by_text)
+                indices.append(index_by_text[text])
+            self._rule_indices[rule.name] = indices
+        self.selectors = [SimpleSelector.parse(text) for text in index_by_text]
+        self._dispatch = {}
+        for i, selector in enumerate(self.selectors):
+            self._dispatch.setdefault(selector.dispatch_key, []).append(i)
+        self._dispatch_attrs = tuple(
+            sorted({key[1] for key in self._dispatch if key[0] == "attr"})
+        )
+        self._subplans = {}
+
+    def for_fields(self, names) -> "ExtractionPlan":
+        """A (cached) plan for a subset of the fields; fewer selectors to match."""
+        key = frozenset(names)
+        if key not in self._subplans:
+            self._subplans[key] = ExtractionPlan(
+                [rule for rule in self.rules if rule.name in key]
+            )
+        return self._subplans[key]
+
+    def _candidates(self, tag: str, attrs) -> List[int]:
+        """Indices of the selectors that could match an element."""
+        dispatch = self._dispatch
+        candidates = dispatch.get(("tag", tag), []) + dispatch.get(("any",), [])
+        for name in self._dispatch_attrs:
+            value = attrs.get(name)
+            if value is not None:
+                candidates += dispatch.get(("attr", name, value), [])
+        class_attr = attrs.get("class")
+        if class_attr:
+            for class_name in class_attr.split():
+                candidates += dispatch.get(("class", class_name), [])
+        return candidates
+
+    def extract(self, html: bytes, backend: Optional[str] = None) -> Dict[str, str]:
+        """Extract every field from a page in one traversal.
+
+        Args:
+            html: Raw page HTML.
+            backend: "lxml" or "html.parser"; defaults to lxml when installed.
+
+        Returns:
+            Field name to extracted (unstripped) value.
+        """
+        backend = backend or ("lxml" if HAS_LXML else "html.parser")
+        if backend == "lxml":
+            return self._extract_lxml(html)
+        return self._extract_soup(BeautifulSoup(html, "html.parser"))
+
+    def _resolve(self, first_matches: list, text_of: Callable) -> Dict[str, str]:
+        texts: Dict[int, str] = {}
+        result = {}
+        for rule in self.rules:
+            value = None
+            for index in self._rule_indices[rule.name]:
+                element = first_matches[index]
+                if element is None:
+                    continue
+                if index not in texts:
+                    texts[index] = text_of(element)
+                value = rule.accept(texts[index])
+                if value:
+                    break
+            result[rule.name] = value or rule.default
+        return result
+
+    def _extract_lxml(self, html: bytes) -> Dict[str, str]:
+        if not html.strip():
+            return self._resolve([None] * len(self.selectors), _lxml_text)
+        try:
+            # Without a charset declaration lxml assumes latin-1 for bytes.
+            root = lxml.html.fromstring(html.decode("utf-8"))
+        except UnicodeDecodeError:
+            root = lxml.html.fromstring(html)
+        first_matches = [None] * len(self.selectors)
+        remaining = len(self.selectors)
+        for element in root.iter():
+            tag = element.tag
+            if not isinstance(tag, str):  # comments and processing instructions
+                continue
+            attrs = element.attrib
+            for i in self._candidates(tag, attrs):
+                if first_matches[i] is None and self.selectors[i].matches(tag, attrs):
+                    first_matches[i] = element
+                    remaining -= 1
+            if not remaining:
+                break
+        return self._resolve(first_matches, _lxml_text)
+
+    def _extract_soup(self, soup: BeautifulSoup) -> Dict[str, str]:
+        first_matches = [None] * len(self.selectors)
+        remaining = len(self.selectors)
+        for element in soup.find_all(True):
+            attrs = {
+                name: " ".join(value) if isinstance(value, list) else value
+                for name, value in element.attrs.items()
+            }
+            for i in self._candidates(element.name, attrs):
+                if first_matches[i] is None and self.selectors[i].matches(element.name, attrs):
+                    first_matches[i] = element
+                    remaining -= 1
+            if not remaining:
+                break
+        return self._resolve(first_matches, lambda el: el.get_text(strip=True))
+
+    def extract_per_selector(self, html: bytes) -> Dict[str, str]:
+        """Reference extraction with one `select_one` per selector per field.
+
+        This is how the scraper used to extract fields; it is kept to check
+        the plan's output and as the benchmark baseline.
+        """
+        soup = BeautifulSoup(html, "html.parser")
+        result = {}
+        for rule in self.rules:
+            value = None
+            for text in rule.selectors:
+                element = soup.select_one(text)
+                if element:
+                    value = rule.accept(element.get_text(strip=True))
+                    if value:
+                        break
+            result[rule.name] = value or rule.default
+        return result
+
+
+PRODUCT_PLAN = ExtractionPlan(PRODUCT_FIELD_RULES)
+
+
+# =============================================================================
+# STRUCTURED DATA FAST PATH
+# =============================================================================
+
+_JSON_SCRIPT_RE = re.compile(
+    rb"<script\b[^>]*\btype\s*=\s*[\"']application/(ld\+json|json)[\"'][^>]*>(.*?)</script\s*>",
+    re.IGNORECASE | re.DOTALL,
+)
+_TAG_RE = re.compile(r"<[^>]+>")
+_SCHEMA_AVAILABILITY = {
+    "InStock": "In stock",
+    "OutOfStock": "Out of stock",
+    "LimitedAvailability": "Limited availability",
+    "PreOrder": "Pre-order",
+}
+
+
+def _json_blobs(html: bytes):
+    """Yield (kind, data) for every parseable JSON script blob in the page."""
+    for kind, body in _JSON_SCRIPT_RE.findall(html):
+        try:
+            yield kind.decode().lower(), json.loads(body)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            continue
+
+
+def _find_ld_product(data):
+    """Find the schema.org Product node in an ld+json document."""
+    if isinstance(data, list):
+        for item in data:
+            if found := _find_ld_product(item):
+                return found
+    elif isinstance(data, dict):
+        node_type = data.get("@type")
+        if node_type == "Product" or (isinstance(node_type, list) and "Product" in node_type):
+            return data
+        if "@graph" in data:
+            return _find_ld_product(data["@graph"])
+    return None
+
+
+def _find_key(data, key: str, max_depth: int = 8):
+    """Breadth-first search for the shallowest non-empty value of ``key``."""
+    level = [data]
+    for _ in range(max_depth):
+        next_level = []
+        for node in level:
+            if isinstance(node, dict):
+                value = node.get(key)
+                if value not in (None, "", [], {}):
+                    return value
+                next_level.extend(v for v in node.values() if isinstance(v, (dict, list)))
+            elif isinstance(node, list):
+                next_level.extend(v for v in node if isinstance(v, (dict, list)))
+        if not next_level:
+            break
+        level = next_level
+    return None
+
+
+def _display_name(value) -> str:
+    if isinstance(value, dict):
+        return str(value.get("name") or value.get("displayName") or "")
+    return str(value) if value is not None else ""
+
+
+def _format_price(price, currency: Optional[str] = None) -> str:
+    """Format a price like the page shows it, e.g. "$52.00"."""
+    if isinstance(price, str) and price.startswith("$"):
+        return price
+    try:
+        amount = f"{float(str(price).replace(',', '')):.2f}"
+    except ValueError:
+        return str(price)
+    return f"${amount}" if currency in (None, "", "USD") else f"{amount} {currency}"
+
+
+def _from_ld_product(product: Dict) -> Dict[str, str]:
+    fields = {
+        "name": _display_name(product.get("name")),
+        "brand": _display_name(product.get("brand")),
+        "description": str(product.get("description") or "")[:500],
+    }
+    offers = product.get("offers")
+    if isinstance(offers, list):
+        offers = offers[0] if offers else None
+    if isinstance(offers, dict):
+        price = offers.get("price", offers.get("lowPrice"))
+        if price not in (None, ""):
+            fields["price"] = _format_price(price, offers.get("priceCurrency"))
+        availability = str(offers.get("availability") or "").rsplit("/", 1)[-1]
+        fields["availability"] = _SCHEMA_AVAILABILITY.get(availability, "")
+    rating = product.get("aggregateRating")
+    if isinstance(rating, dict):
+        if rating.get("ratingValue") not in (None, ""):
+            fields["rating"] = str(rating["ratingValue"])
+        count = rating.get("reviewCount", rating.get("ratingCount"))
+        if isinstance(count, (int, float)) or (isinstance(count, str) and count.isdigit()):
+            fields["review_count"] = f"{int(count):,}"
+    return fields
+
+
+def _from_app_state(data) -> Dict[str, str]:
+    """Fields from the app's embedded JSON state (Sephora's linkStore)."""
+    product = _find_key(data, "product")
+    if not isinstance(product, dict):
+        return {}
+    fields = {
+        "name": _display_name(product.get("displayName")),
+        "brand": _display_name(product.get("brand")),
+        "category": _display_name(product.get("parentCategory")),
+    }
+    if product.get("rating") not in (None, ""):
+        fields["rating"] = str(product["rating"])
+    reviews = product.get("reviews")
+    if isinstance(reviews, (int, float)):
+        fields["review_count"] = f"{int(reviews):,}"
+    sku = product.get("currentSku") or {}
+    if sku.get("listPrice"):
+        fields["price"] = _format_price(sku["listPrice"])
+    if sku.get("size"):
+        fields["size"] = str(sku["size"])
+    ingredients = sku.get("ingredientDesc") or _find_key(product, "ingredientDesc")
+    if ingredients:
+        fields["ingredients"] = " ".join(_TAG_RE.sub(" ", str(ingredients)).split())
+    return fields
+
+
+def extract_structured_fields(html: bytes) -> Dict[str, str]:
+    """Product fields from the page's embedded JSON, without building a DOM.
+
+    ld+json Product data wins over the app state, which fills the fields
+    ld+json does not carry (category, size, ingredients).
+    """
+    fields: Dict[str, str] = {}
+    for kind, data in _json_blobs(html):
+        if kind == "ld+json":
+            product = _find_ld_product(data)
+            found = _from_ld_product(product) if product else {}
+        else:
+            found = _from_app_state(data)
+        for name, value in found.items():
+            if value and not fields.get(name):
+                fields[name] = value
+    return fields
+
+
+def extract_product(
+    html: bytes, backend: Optional[str] = None, plan: ExtractionPlan = None
+) -> Dict[str, str]:
+    """Extract a product, using embedded JSON first and the DOM for the rest.
+
+    Args:
+        html: Raw product page HTML.
+        backend: DOM parser backend for the fallback, see `ExtractionPlan.extract`.
+        plan: Extraction plan for the DOM fallback; defaults to `PRODUCT_PLAN`.
+
+    Returns:
+        Field name to value for every field of the plan.
+    """
+    plan = plan or PRODUCT_PLAN
+    fields = extract_structured_fields(html)
+    missing = [rule.name for rule in plan.rules if not fields.get(rule.name)]
+    if missing:
+        fields.update(plan.for_fields(missing).extract(html, backend))
+    return {rule.name: fields.get(rule.name, rule.default) for rule in plan.rules}
+
+
+def product_row(url: str, html: bytes, backend: Optional[str] = None) -> Optional[Dict]:
+    """Parse a product page into a cleaned row, or None if it has no name.
+
+    A module-level function so it can run in a process pool.
+    """
+    row = {"url": url, **extract_product(html, backend)}
+    row = {k: v.strip() if isinstance(v, str) else v for k, v in row.items()}
+    return row if row["name"] else None
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Sephora Fixture Server
+A local stand-in for sephora.com serving deterministic bestseller listings and
+product pages shaped like the real ones (product cards, embedded JSON blobs,
+ld+json, tracking query params), with configurable latency, so the scraper
+can be exercised and benchmarked without touching the real site. Pages carry
+ETag/Last-Modified validators and answer conditional requests with 304;
+``--revision N`` reprices a tenth of the catalog to simulate a site update.
+
+Point the scraper at it with:
+    python scripts/sephora_fixture_server.py --port 8901
+    python scripts/sephora_products_scraper.py --base-url http://127.0.0.1:8901
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import random
+from dataclasses import dataclass
+from email.utils import formatdate
+from typing import Dict, List
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, Response
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+CATEGORIES = [
+    "makeup",
+    "skincare",
+    "hair",
+    "fragrance",
+    "tools-and-brushes",
+    "bath-and-body",
+    "mini-size",
+    "gifts",
+    "clean-beauty",
+    "luxury",
+]
+BRANDS = [
+    "Estée Lauder",
+    "Clinique",
+    "MAC",
+    "Bobbi Brown",
+    "La Mer",
+    "Tom Ford",
+    "Charlotte Tilbury",
+    "Rare Beauty",
+    "Fenty Beauty",
+    "Drunk Elephant",
+    "Glow Recipe",
+    "Olaplex",
+]
+NOUNS = [
+    "Serum",
+    "Foundation",
+    "Lipstick",
+    "Moisturizer",
+    "Eye Cream",
+    "Cleanser",
+    "Blush",
+    "Hair Oil",
+    "Mascara",
+    "Eau de Parfum",
+]
+ADJECTIVES = [
+    "Advanced",
+    "Double Wear",
+    "Hydrating",
+    "Luminous",
+    "Soft Focus",
+    "Peptide",
+    "Glass Skin",
+    "Velvet",
+    "Barrier Repair",
+    "Overnight",
+]
+INGREDIENTS = [
+    "Water",
+    "Glycerin",
+    "Niacinamide",
+    "Hyaluronic Acid",
+    "Retinol",
+    "Squalane",
+    "Peptides",
+    "Ceramides",
+    "Vitamin C",
+    "Tocopherol",
+    "Dimethicone",
+    "Phenoxyethanol",
+]
+
+
+# =============================================================================
+# CATALOG
+# =============================================================================
+
+
+def make_catalog(num_products: int, seed: int = 7, revision: int = 0) -> List[Dict]:
+    """Build a deterministic fake catalog.
+
+    Each revision after 0 reprices the products whose id ends in the same
+    digit as the revision, so successive revisions change a tenth of pages.
+    """
+    rng = random.Random(seed)
+    catalog = []
+    for i in range(num_products):
+        brand = rng.choice(BRANDS)
+        name = f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}"
+        product_id = f"P{400000 + i}"
+        slug = name.lower().replace(" ", "-")
+        catalog.append(
+            {
+                "product_id": product_id,
+                "sku_ids": [str(2000000 + i * 3 + k) for k in range(rng.randint(1, 3))],
+                "path": f"/product/{slug}-{product_id}",
+                "name": name,
+                "brand": brand,
+                "price": round(rng.uniform(12, 420), 2),
+                "rating": round(rng.uniform(3.2, 5.0), 1),
+                "review_count": rng.randint(0, 25000),
+                "category": rng.choice(CATEGORIES),
+                "description": (
+                    f"{name} by {brand} is a best-selling formula loved for its "
+                    "luxurious texture and visible results after just one week."
+                ),
+                "ingredients": ", ".join(rng.sample(INGREDIENTS, k=6)),
+                "size": f"{rng.choice([15, 30, 50, 75, 100])} mL",
+            }
+        )
+        if revision and i % 10 == revision % 10:
+            catalog[-1]["price"] = round(catalog[-1]["price"] * (1 + 0.01 * revision), 2)
+    return catalog
+
+
+def category_listing(catalog: List[Dict], category: str) -> List[Dict]:
+    """Products listed on a category's bestseller page, best sellers first.
+
+    Categories overlap heavily (a product appears in its own category and in
+    a few neighbouring ones), as the real bestseller pages do.
+    """
+    if category == "all":
+        return sorted(catalog, key=lambda p: -p["review_count"])
+    index = CATEGORIES.index(category)
+    listed = [
+        p
+        for p in catalog
+        if p["category"] == category or int(p["product_id"][1:]) % len(CATEGORIES) == index
+    ]
+    return sorted(listed, key=lambda p: -p["review_count"])
+
+
+# =============================================================================
+# HTML RENDERING
+# =============================================================================
+
+
+def _product_href(product: Dict, rng: random.Random) -> str:
+    """A product link with the SKU and tracking params the real site adds."""
+    sku = rng.choice(product["sku_ids"])
+    return f"{product['path']}?skuId={sku}&icid2=bestsellers_carousel_{rng.randint(1, 9)}"
+
+
+def _padding(kb: int) -> str:
+    """Inline CSS/markup filler so pages have a realistic size."""
+    block = (
+        '<div class="css-1qe8tjm css-0 e65zztl0"><span class="css-ra4ilm">'
+        "&nbsp;</span><svg viewBox=\"0 0 24 24\"><path d=\"M12 2l3 7h7l-5.5 4 2 7-6.5-4.5"
+        'L5.5 20l2-7L2 9h7z"/></svg></div>\n'
+    )
+    return block * max(0, kb * 1024 // len(block))
+
+
+def render_listing(
+    products: List[Dict], page: int, page_size: int, total: int, padding_kb: int
+) -> str:
+    """Render one page of a bestseller listing."""
+    rng = random.Random(page * 7919 + total)
+    cards = []
+    for product in products:
+        href = _product_href(product, rng)
+        cards.append(
+            f'<div data-comp="ProductCard "><a data-at="product_link" href="{href}">'
+            f'<span data-at="sku_item_brand">{product["brand"]}</span>'
+            f'<span data-at="sku_item_name">{product["name"]}</span></a></div>'
+        )
+    blob = {
+        "page": {
+            "currentPage": page,
+            "pageSize": page_size,
+            "totalProducts": total,
+            "products": [
+                {"productId": p["product_id"], "targetUrl": p["path"], "url": _product_href(p, rng)}
+                for p in products
+            ],
+        }
+    }
+    return (
+        '<!DOCTYPE html><html><head><meta charset="utf-8">'
+        "<title>Bestsellers | Sephora</title>"
+        f'<script type="application/json" id="linkStore">{json.dumps(blob)}</script>'
+        "</head><body>"
+        f"{_padding(padding_kb)}"
+        f'<div data-comp="ProductGrid">{"".join(cards)}</div>'
+        "</body></html>"
+    )
+
+
+def render_product(product: Dict, padding_kb: int) -> str:
+    """Render a product page with both DOM fields and embedded product JSON."""
+    ld_json = {
+        "@context": "http://schema.org",
+        "@type": "Product",
+        "name": product["name"],
+        "brand": {"@type": "Brand", "name": product["brand"]},
+        "sku": product["sku_ids"][0],
+        "productID": product["product_id"],
+        "description": product["description"],
+        "aggregateRating": {
+            "@type": "AggregateRating",
+            "ratingValue": product["rating"],
+            "reviewCount": product["review_count"],
+        },
+        "offers": {
+            "@type": "Offer",
+            "price": f"{product['price']:.2f}",
+            "priceCurrency": "USD",
+            "availability": "http://schema.org/InStock",
+        },
+    }
+    link_store = {
+        "page": {
+            "product": {
+                "productId": product["product_id"],
+                "displayName": product["name"],
+                "brand": {"displayName": product["brand"]},
+                "parentCategory": {"displayName": product["category"].replace("-", " ").title()},
+                "currentSku": {
+                    "skuId": product["sku_ids"][0],
+                    "listPrice": f"${product['price']:.2f}",
+                    "size": product["size"],
+                    "ingredientDesc": product["ingredients"],
+                },
+                "rating": product["rating"],
+                "reviews": product["review_count"],
+            }
+        }
+    }
+    return (
+        '<!DOCTYPE html><html><head><meta charset="utf-8">'
+        f"<title>{product['name']} | Sephora</title>"
+        f'<script type="application/ld+json">{json.dumps(ld_json)}</script>'
+        f'<script type="application/json" id="linkStore">{json.dumps(link_store)}</script>'
+        "</head><body>"
+        f"{_padding(padding_kb)}"
+        '<nav data-at="breadcrumb">'
+        f'{product["category"].replace("-", " ").title()}</nav>'
+        f'<h1><a data-at="brand_name">{product["brand"]}</a>'
+        f'<span data-at="product_name">{product["name"]}</span></h1>'
+        f'<b data-at="price">${product["price"]:.2f}</b>'
+        f'<span data-at="number_of_reviews">{product["rating"]} out of 5 stars, '
+        f'{product["review_count"]:,} reviews</span>'
+        f'<div data-at="size">Size: {product["size"]}</div>'
+        f'<div data-at="product_description">{product["description"]}</div>'
+        f'<div data-at="ingredients">{product["ingredients"]}</div>'
+        '<div data-at="availability">In stock</div>'
+        "</body></html>"
+    )
+
+
+# =============================================================================
+# FIXTURE APP
+# =============================================================================
+
+
+@dataclass
+class FixtureSettings:
+    num_products: int = 3000
+    latency: float = 0.05
+    padding_kb: int = 150
+    default_page_size: int = 60
+    # Send ETag/Last-Modified and honour If-None-Match/If-Modified-Since
+    etags: bool = True
+    revision: int = 0
+
+
+def create_fixture_app(settings: FixtureSettings) -> FastAPI:
+    """Create the fixture app serving listings and product pages."""
+    app = FastAPI(title="Sephora fixture")
+    catalog = make_catalog(settings.num_products, revision=settings.revision)
+    by_id = {p["product_id"]: p for p in catalog}
+    listings = {c: category_listing(catalog, c) for c in CATEGORIES + ["all"]}
+    app.state.hits = {"listing": 0, "product": 0, "not_modified": 0}
+    # Pages only change between server runs, so the start time serves as Last-Modified.
+    last_modified = formatdate(usegmt=True)
+
+    def page_response(html: str, request: Request) -> Response:
+        if not settings.etags:
+            return HTMLResponse(html)
+        etag = '"' + hashlib.sha1(html.encode("utf-8")).hexdigest() + '"'
+        headers = {"ETag": etag, "Last-Modified": last_modified}
+        if_none_match = request.headers.get("if-none-match")
+        if (if_none_match and etag in if_none_match) or (
+            if_none_match is None and request.headers.get("if-modified-since") == last_modified
+        ):
+            app.state.hits["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+        return HTMLResponse(html, headers=headers)
+
+    async def listing_page(category: str, request: Request) -> Response:
+        await asyncio.sleep(settings.latency)
+        app.state.hits["listing"] += 1
+        products = listings[category]
+        page_size = int(request.query_params.get("pageSize", settings.default_page_size))
+        page = max(1, int(request.query_params.get("currentPage", 1)))
+        # Like the real site, pageSize without currentPage returns the top N.
+        start = (page - 1) * page_size
+        html = render_listing(
+            products[start : start + page_size],
+            page,
+            page_size,
+            len(products),
+            settings.padding_kb,
+        )
+        return page_response(html, request)
+
+    @app.get("/bestsellers")
+    async def bestsellers(request: Request):
+        return await listing_page("all", request)
+
+    @app.get("/shop/{slug}")
+    async def shop(slug: str, request: Request):
+        category = slug.removesuffix("-bestsellers")
+        if category not in listings:
+            return HTMLResponse("Not found", status_code=404)
+        return await listing_page(category, request)
+
+    @app.get("/product/{slug}")
+    async def product(slug: str, request: Request):
+        await asyncio.sleep(settings.latency)
+        app.state.hits["product"] += 1
+        product_id = slug.rsplit("-", 1)[-1]
+        if product_id not in by_id:
+            return HTMLResponse("Not found", status_code=404)
+        return page_response(render_product(by_id[product_id], settings.padding_kb), request)
+
+    @app.get("/__stats")
+    async def stats():
+        return app.state.hits
+
+    return app
+
+
+def main(argv: List[str] = None):
+    """Main function to run the fixture server."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--num-products", type=int, default=3000)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per response")
+    parser.add_argument("--padding-kb", type=int, default=150, help="Filler markup per page")
+    parser.add_argument("--no-etags", action="store_true",
+                        help="Never send validators or answer 304")
+    parser.add_argument("--revision", type=int, default=0,
+                        help="Catalog revision; each one reprices a tenth of products")
+    args = parser.parse_args(argv)
+
+    settings = FixtureSettings(
+        num_products=args.num_products,
+        latency=args.latency,
+        padding_kb=args.padding_kb,
+        etags=not args.no_etags,
+        revision=args.revision,
+    )
+    logger.info(f"Sephora fixture listening on http://{args.host}:{args.port}")
+    uvicorn.run(create_fixture_app(settings), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
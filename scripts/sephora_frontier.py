@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Sephora URL Frontier
+Canonicalizes discovered product links and deduplicates them in O(1) per
+link, keyed on the Sephora product id, so `/product/x-P123?skuId=1` and
+`/product/x-P123?skuId=2&icid2=...` are fetched once.
+"""
+
+import re
+from typing import Dict, Iterator, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+# Sephora product URLs end in the product id: /product/<slug>-P123456
+PRODUCT_ID_RE = re.compile(r"-(P\d+)/?$")
+# The same id located in a raw link, before any parsing.
+RAW_PRODUCT_ID_RE = re.compile(r"/product/[^?#]*-(P\d+)/?(?:[?#]|$)")
+
+# Query params that only track the click or pick a variant of the same product.
+DROPPED_PARAMS = {"skuid", "icid", "icid2", "om_mmc", "ref", "gclid", "fbclid", "country_switch"}
+DROPPED_PREFIXES = ("utm_", "cm_")
+
+
+def canonicalize_product_url(url: str, base_url: str) -> Tuple[str, str]:
+    """Return ``(key, canonical_url)`` for a product link.
+
+    The key is the product id when the path carries one, otherwise the
+    canonical URL itself. The canonical URL is absolute, has a lowercase
+    scheme and host, no fragment, and no tracking or variant params.
+
+    Args:
+        url: A product link as found on the page (relative or absolute).
+        base_url: The site the link was found on.
+    """
+    parts = urlsplit(urljoin(base_url, url))
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(
+        sorted(
+            (key, value)
+            for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if key.lower() not in DROPPED_PARAMS and not key.lower().startswith(DROPPED_PREFIXES)
+        )
+    )
+    canonical = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, query, ""))
+    match = PRODUCT_ID_RE.search(path)
+    return (match.group(1) if match else canonical), canonical
+
+
+class UrlFrontier:
+    """Insertion-ordered, dict-backed set of canonical product URLs."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self._urls: Dict[str, str] = {}
+        self.links_seen = 0
+
+    def add(self, url: str) -> Optional[str]:
+        """Add a discovered link.
+
+        Returns:
+            The canonical URL if the product is new, None if already known.
+        """
+        self.links_seen += 1
+        # Cheap check first: most duplicates are variants of a known product.
+        raw_id = RAW_PRODUCT_ID_RE.search(url)
+        if raw_id and raw_id.group(1) in self._urls:
+            return None
+        key, canonical = canonicalize_product_url(url, self.base_url)
+        if key in self._urls:
+            return None
+        self._urls[key] = canonical
+        return canonical
+
+    def get(self, key: str) -> Optional[str]:
+        return self._urls.get(key)
+
+    def update(self, urls) -> int:
+        """Add several links; returns how many were new."""
+        return sum(self.add(url) is not None for url in urls)
+
+    @property
+    def duplicates(self) -> int:
+        return self.links_seen - len(self._urls)
+
+    def __len__(self) -> int:
+        return len(self._urls)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._urls.values())
+
+    def __contains__(self, url: str) -> bool:
+        return canonicalize_product_url(url, self.base_url)[0] in self._urls
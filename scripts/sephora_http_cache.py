@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Sephora HTTP Cache
+An on-disk HTTP cache for scraper reruns. Stores each page's body with its
+ETag/Last-Modified validators and a content hash, so the next run can send
+conditional requests, reuse the body on 304, and skip re-parsing pages whose
+content did not change. The cache is bounded in size and evicts the least
+recently used pages first.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_hash: str
+    body_file: str
+    size: int
+
+
+class HttpCache:
+    """Size-bounded on-disk cache of page bodies, validators and parsed rows.
+
+    Bodies are stored zlib-compressed, one file per URL; the index lives in
+    SQLite next to them. Only the event loop thread may use an instance.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 500 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(directory, "index.sqlite3"))
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT NOT NULL,
+                body_file TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                row TEXT,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        self.total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        self.stats = Counter()
+        self._writes = 0
+
+    # -------------------------------------------------------------------------
+    # Lookups
+    # -------------------------------------------------------------------------
+
+    def lookup(self, url: str) -> Optional[CacheEntry]:
+        row = self._db.execute(
+            "SELECT url, etag, last_modified, content_hash, body_file, size FROM entries WHERE url = ?",
+            (url,),
+        ).fetchone()
+        return CacheEntry(*row) if row else None
+
+    @staticmethod
+    def conditional_headers(entry: CacheEntry) -> Dict[str, str]:
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def load_body(self, entry: CacheEntry) -> Optional[bytes]:
+        try:
+            with open(os.path.join(self.directory, entry.body_file), "rb") as f:
+                return zlib.decompress(f.read())
+        except (OSError, zlib.error):
+            return None
+
+    def get_row(self, url: str) -> Optional[Dict]:
+        """The parsed row stored for the cached body, if any."""
+        row = self._db.execute("SELECT row FROM entries WHERE url = ?", (url,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    # -------------------------------------------------------------------------
+    # Updates
+    # -------------------------------------------------------------------------
+
+    def not_modified(self, entry: CacheEntry, headers) -> Optional[bytes]:
+        """Handle a 304: refresh validators and return the cached body."""
+        body = self.load_body(entry)
+        if body is None:
+            self.forget(entry.url)
+            return None
+        self._db.execute(
+            "UPDATE entries SET etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified), "
+            "last_used = ? WHERE url = ?",
+            (headers.get("etag"), headers.get("last-modified"), time.time(), entry.url),
+        )
+        self.stats["not_modified"] += 1
+        self._maybe_commit()
+        return body
+
+    def store(self, url: str, content: bytes, headers) -> bool:
+        """Store a 200 response; returns True if the content is unchanged."""
+        content_hash = hashlib.sha256(content).hexdigest()
+        entry = self.lookup(url)
+        now = time.time()
+        if entry and entry.content_hash == content_hash:
+            self._db.execute(
+                "UPDATE entries SET etag = ?, last_modified = ?, last_used = ? WHERE url = ?",
+                (headers.get("etag"), headers.get("last-modified"), now, url),
+            )
+            self.stats["unchanged"] += 1
+            self._maybe_commit()
+            return True
+
+        body_file = hashlib.sha1(url.encode("utf-8")).hexdigest() + ".z"
+        compressed = zlib.compress(content, 1)
+        with open(os.path.join(self.directory, body_file), "wb") as f:
+            f.write(compressed)
+        self._db.execute(
+            "INSERT OR REPLACE INTO entries "
+            "(url, etag, last_modified, content_hash, body_file, size, row, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?, NULL, ?)",
+            (
+                url,
+                headers.get("etag"),
+                headers.get("last-modified"),
+                content_hash,
+                body_file,
+                len(compressed),
+                now,
+            ),
+        )
+        self.total_bytes += len(compressed) - (entry.size if entry else 0)
+        self.stats["changed" if entry else "new"] += 1
+        self._evict()
+        self._maybe_commit()
+        return False
+
+    def put_row(self, url: str, row: Optional[Dict]):
+        """Remember the parsed row for the currently cached body."""
+        self._db.execute(
+            "UPDATE entries SET row = ? WHERE url = ?",
+            (json.dumps(row) if row else None, url),
+        )
+        self._maybe_commit()
+
+    def forget(self, url: str):
+        entry = self.lookup(url)
+        if not entry:
+            return
+        self._db.execute("DELETE FROM entries WHERE url = ?", (url,))
+        self.total_bytes -= entry.size
+        try:
+            os.remove(os.path.join(self.directory, entry.body_file))
+        except OSError:
+            pass
+
+    def _evict(self):
+        """Drop least recently used bodies until the cache is 90% full."""
+        if self.total_bytes <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        victims = self._db.execute(
+            "SELECT url, body_file, size FROM entries ORDER BY last_used ASC"
+        ).fetchall()
+        evicted = []
+        for url, body_file, size in victims:
+            if self.total_bytes <= target:
+                break
+            evicted.append((url, body_file))
+            self.total_bytes -= size
+        for url, body_file in evicted:
+            self._db.execute("DELETE FROM entries WHERE url = ?", (url,))
+            try:
+                os.remove(os.path.join(self.directory, body_file))
+            except OSError:
+                pass
+        self.stats["evicted"] += len(evicted)
+
+    def _maybe_commit(self):
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self._db.commit()
+
+    def close(self):
+        self._db.commit()
+        self._db.close()
+
+    def summary(self) -> str:
+        return (
+            f"{dict(self.stats)}, {self.total_bytes / 1e6:.1f} MB of "
+            f"{self.max_bytes / 1e6:.0f} MB used"
+        )
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Sephora Typed Product Output
+Streams scraped products to JSONL and Parquet with typed columns (float
+price and rating, int review_count, dictionary-encoded brand and category)
+so consumers no longer re-parse "$52.00" or "1,234", and keeps the run
+summary as running totals instead of building a DataFrame at the end.
+Parquet output needs pyarrow, a project dependency; requesting it without
+pyarrow installed is an error.
+"""
+
+import json
+import logging
+import os
+import re
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    HAS_PYARROW = True
+except ImportError:  # pragma: no cover - pyarrow is a project dependency
+    HAS_PYARROW = False
+
+from sephora_pipeline import CsvProductWriter
+
+logger = logging.getLogger(__name__)
+
+_NUMBER_RE = re.compile(r"\d[\d,]*(?:\.\d+)?")
+
+# Output columns in scrape order with their types
+FIELD_TYPES = {
+    "url": "string",
+    "name": "string",
+    "brand": "category",
+    "price": "float",
+    "rating": "float",
+    "review_count": "int",
+    "category": "category",
+    "description": "string",
+    "ingredients": "string",
+    "size": "string",
+    "availability": "string",
+}
+NUMERIC_FIELDS = [name for name, kind in FIELD_TYPES.items() if kind in ("float", "int")]
+
+
+# =============================================================================
+# TYPED ROWS
+# =============================================================================
+
+
+def _parse_number(value) -> Optional[float]:
+    """First number in a scraped string, e.g. "$1,299.00 - $1,499.00" -> 1299.0."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _NUMBER_RE.search(value or "")
+    return float(match.group().replace(",", "")) if match else None
+
+
+def typed_row(row: Dict) -> Dict:
+    """Convert a scraped row of strings to typed values (None when missing)."""
+    typed = {}
+    for name, kind in FIELD_TYPES.items():
+        value = row.get(name)
+        if kind in ("float", "int"):
+            value = _parse_number(value)
+            if kind == "int" and value is not None:
+                value = int(value)
+        typed[name] = value if value not in ("", None) else None
+    return typed
+
+
+# =============================================================================
+# WRITERS
+# =============================================================================
+
+
+class JsonlProductWriter:
+    """Appends typed rows to a JSON Lines file, flushing in batches."""
+
+    def __init__(self, path: str, batch_size: int = 50):
+        self.path = path
+        self.batch_size = batch_size
+        self.rows_written = 0
+        self._file = open(path, "w", encoding="utf-8")
+
+    def write(self, row: Dict):
+        self._file.write(json.dumps(typed_row(row), ensure_ascii=False) + "\n")
+        self.rows_written += 1
+        if self.rows_written % self.batch_size == 0:
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetProductWriter:
+    """Buffers typed rows and appends them to a Parquet file one row group per batch.
+
+    A Parquet file is only readable once its footer is written on close, so
+    rows go to ``<path>.partial`` and the file is renamed to ``path`` when it
+    is complete; a crashed run leaves the previous ``path`` untouched.
+    """
+
+    def __init__(self, path: str, batch_size: int = 1000):
+        if not HAS_PYARROW:
+            raise ImportError("Parquet output requires pyarrow (pip install pyarrow)")
+        self.path = path
+        self.batch_size = batch_size
+        self.rows_written = 0
+        arrow_types = {
+            "string": pa.string(),
+            "category": pa.dictionary(pa.int32(), pa.string()),
+            "float": pa.float64(),
+            "int": pa.int64(),
+        }
+        self.schema = pa.schema(
+            [(name, arrow_types[kind]) for name, kind in FIELD_TYPES.items()]
+        )
+        self._partial_path = f"{path}.partial"
+        self._writer = pq.ParquetWriter(self._partial_path, self.schema)
+        self._buffer: List[Dict] = []
+
+    def write(self, row: Dict):
+        self._buffer.append(typed_row(row))
+        if len(self._buffer) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        self._writer.write_table(pa.Table.from_pylist(self._buffer, schema=self.schema))
+        self.rows_written += len(self._buffer)
+        self._buffer = []
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+        os.replace(self._partial_path, self.path)
+
+
+# =============================================================================
+# SUMMARY
+# =============================================================================
+
+
+class ProductSummary:
+    """Running totals for the scrape summary, updated one row at a time."""
+
+    def __init__(self):
+        self.total = 0
+        self.brands = Counter()
+        self.categories = Counter()
+        self.numeric = {
+            name: {"count": 0, "sum": 0.0, "min": None, "max": None}
+            for name in NUMERIC_FIELDS
+        }
+
+    def update(self, row: Dict):
+        typed = typed_row(row)
+        self.total += 1
+        if typed["brand"]:
+            self.brands[typed["brand"]] += 1
+        if typed["category"]:
+            self.categories[typed["category"]] += 1
+        for name, stats in self.numeric.items():
+            value = typed[name]
+            if value is None:
+                continue
+            stats["count"] += 1
+            stats["sum"] += value
+            stats["min"] = value if stats["min"] is None else min(stats["min"], value)
+            stats["max"] = value if stats["max"] is None else max(stats["max"], value)
+
+    def write(self, summary_filename: str):
+        with open(summary_filename, "w", encoding="utf-8") as f:
+            f.write("Sephora Products Scraping Summary\n")
+            f.write("================================\n")
+            f.write(f"Total products scraped: {self.total}\n")
+            f.write(f"Date: {datetime.now()}\n\n")
+
+            if self.brands:
+                f.write("Top 10 Brands:\n")
+                for brand, count in self.brands.most_common(10):
+                    f.write(f"  {brand}: {count} products\n")
+                f.write("\n")
+
+            if self.categories:
+                f.write("Top 10 Categories:\n")
+                for category, count in self.categories.most_common(10):
+                    f.write(f"  {category}: {count} products\n")
+                f.write("\n")
+
+            f.write("Numeric Fields:\n")
+            for name, stats in self.numeric.items():
+                if not stats["count"]:
+                    continue
+                mean = stats["sum"] / stats["count"]
+                fmt = ",.0f" if FIELD_TYPES[name] == "int" else ",.2f"
+                f.write(
+                    f"  {name}: {stats['count']} values, mean {mean:{fmt}}, "
+                    f"min {stats['min']:{fmt}}, max {stats['max']:{fmt}}\n"
+                )
+
+
+# =============================================================================
+# OUTPUT FAN-OUT
+# =============================================================================
+
+
+class ProductOutput:
+    """Writes each row to every requested format and the running summary.
+
+    Args:
+        basename: Path without extension, e.g. "sephora_products".
+        formats: Any of "csv", "jsonl", "parquet".
+        csv_fieldnames: Column order of the CSV file.
+    """
+
+    def __init__(self, basename: str, formats: List[str], csv_fieldnames: List[str]):
+        self.summary = ProductSummary()
+        self.paths: Dict[str, str] = {}
+        self._writers = []
+        for fmt in formats:
+            path = f"{basename}.{fmt}"
+            if fmt == "csv":
+                writer = CsvProductWriter(path, csv_fieldnames)
+            elif fmt == "jsonl":
+                writer = JsonlProductWriter(path)
+            elif fmt == "parquet":
+                writer = ParquetProductWriter(path)
+            else:
+                raise ValueError(f"Unknown output format: {fmt}")
+            self.paths[fmt] = path
+            self._writers.append(writer)
+
+    @property
+    def rows_written(self) -> int:
+        return self.summary.total
+
+    def write(self, row: Dict):
+        for writer in self._writers:
+            writer.write(row)
+        self.summary.update(row)
+
+    def close(self):
+        for writer in self._writers:
+            writer.close()
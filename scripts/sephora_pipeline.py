@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Sephora Fetch/Parse/Write Pipeline
+Runs product scraping as three overlapping stages connected by bounded
+queues: async fetching, HTML parsing in a process pool on all cores, and an
+incremental writer. A full queue makes the stage before it wait, so memory
+stays bounded, and each stage reports its own throughput.
+"""
+
+import asyncio
+import csv
+import logging
+import os
+import time
+from contextlib import aclosing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sephora_crawler import AsyncCrawler
+from sephora_http_cache import HttpCache
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+# =============================================================================
+# STAGE METRICS
+# =============================================================================
+
+
+@dataclass
+class StageStats:
+    name: str
+    items: int = 0
+    busy: float = 0.0
+    max_queue: int = 0
+    started: float = field(default_factory=time.perf_counter)
+    finished: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def summary(self) -> str:
+        rate = self.items / self.elapsed if self.elapsed else 0.0
+        return (
+            f"{self.name:<6} {self.items:6d} items  {rate:8.1f}/s  "
+            f"busy {self.busy:7.1f}s  peak input queue {self.max_queue}"
+        )
+
+
+# =============================================================================
+# WRITERS
+# =============================================================================
+
+
+class CsvProductWriter:
+    """Appends product rows to a CSV file as they arrive, flushing in batches."""
+
+    def __init__(self, path: str, fieldnames: List[str], batch_size: int = 50):
+        self.path = path
+        self.batch_size = batch_size
+        self.rows_written = 0
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=fieldnames, extrasaction="ignore")
+        self._writer.writeheader()
+        self._pending = 0
+
+    def write(self, row: Dict):
+        self._writer.writerow(row)
+        self.rows_written += 1
+        self._pending += 1
+        if self._pending >= self.batch_size:
+            self._file.flush()
+            self._pending = 0
+
+    def close(self):
+        self._file.close()
+
+
+# =============================================================================
+# PIPELINE
+# =============================================================================
+
+
+@dataclass
+class PipelineResult:
+    rows: int
+    fetch: StageStats
+    parse: StageStats
+    write: StageStats
+    # Rows taken from the cache because the page was unchanged
+    reused: int = 0
+
+    def summary(self) -> str:
+        lines = [stage.summary() for stage in (self.fetch, self.parse, self.write)]
+        if self.reused:
+            lines.append(f"{self.reused} unchanged pages reused their cached rows")
+        return "\n".join(lines)
+
+
+async def run_pipeline(
+    crawler: AsyncCrawler,
+    urls: Iterable[str],
+    parse: Callable[[str, bytes], Optional[Dict]],
+    write: Callable[[Dict], None],
+    parse_workers: Optional[int] = None,
+    queue_size: int = 64,
+    max_rows: Optional[int] = None,
+    cache: Optional[HttpCache] = None,
+    on_parsed: Optional[Callable[[str, Optional[Dict]], None]] = None,
+) -> PipelineResult:
+    """Fetch, parse and write pages with the three stages overlapping.
+
+    Args:
+        crawler: An entered AsyncCrawler used for the fetch stage.
+        urls: Pages to fetch.
+        parse: Picklable ``parse(url, html) -> row or None`` run in the pool.
+        write: Called with every parsed row, in completion order.
+        parse_workers: Parser processes; defaults to all cores. 0 parses
+            inline on the event loop (cheaper when pages parse in microseconds).
+        queue_size: Capacity of each queue between stages.
+        max_rows: Stop writing once this many rows were written.
+        cache: HTTP cache holding the rows parsed from cached bodies; pages
+            the crawler reports unchanged reuse them instead of re-parsing.
+        on_parsed: Called on the event loop with ``(url, row or None)`` for
+            every page once it is parsed, e.g. to checkpoint crawl state.
+
+    Returns:
+        Row count and per-stage throughput.
+    """
+    if parse_workers is None:
+        parse_workers = os.cpu_count() or 1
+    fetched: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    parsed: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    fetch_stats, parse_stats, write_stats = StageStats("fetch"), StageStats("parse"), StageStats("write")
+    reused = 0
+    loop = asyncio.get_running_loop()
+    pool = ProcessPoolExecutor(max_workers=parse_workers) if parse_workers else None
+    stop = asyncio.Event()
+
+    async def fetch_stage():
+        try:
+            async with aclosing(crawler.fetch_many(urls)) as results:
+                async for result in results:
+                    fetch_stats.items += 1
+                    fetch_stats.busy += result.elapsed
+                    await fetched.put(result)
+                    if stop.is_set():
+                        break
+        finally:
+            fetch_stats.finished = time.perf_counter()
+            for _ in range(max(1, parse_workers)):
+                await fetched.put(_DONE)
+
+    async def parse_stage():
+        nonlocal reused
+        while (result := await fetched.get()) is not _DONE:
+            parse_stats.max_queue = max(parse_stats.max_queue, fetched.qsize() + 1)
+            if cache and result.unchanged and (row := cache.get_row(result.url)):
+                reused += 1
+                if on_parsed:
+                    on_parsed(result.url, row)
+                await parsed.put(row)
+                continue
+            start = time.perf_counter()
+            try:
+                if pool:
+                    row = await loop.run_in_executor(pool, parse, result.url, result.content)
+                else:
+                    row = parse(result.url, result.content)
+            except Exception as e:  # pylint: disable=broad-except
+                logger.error(f"Error parsing {result.url}: {e}")
+                row = None
+            parse_stats.busy += time.perf_counter() - start
+            parse_stats.items += 1
+            if cache:
+                cache.put_row(result.url, row)
+            if on_parsed:
+                on_parsed(result.url, row)
+            if row:
+                await parsed.put(row)
+
+    async def write_stage():
+        while (row := await parsed.get()) is not _DONE:
+            write_stats.max_queue = max(write_stats.max_queue, parsed.qsize() + 1)
+            if max_rows is not None and write_stats.items >= max_rows:
+                stop.set()
+                continue
+            start = time.perf_counter()
+            write(row)
+            write_stats.busy += time.perf_counter() - start
+            write_stats.items += 1
+            if write_stats.items % 50 == 0:
+                logger.info(
+                    f"Progress: {fetch_stats.items} fetched, {parse_stats.items} parsed, "
+                    f"{write_stats.items} written"
+                )
+        write_stats.finished = time.perf_counter()
+
+    async def parse_stages():
+        try:
+            await asyncio.gather(*(parse_stage() for _ in range(max(1, parse_workers))))
+        finally:
+            parse_stats.finished = time.perf_counter()
+            await parsed.put(_DONE)
+
+    try:
+        await asyncio.gather(fetch_stage(), parse_stages(), write_stage())
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+
+    return PipelineResult(write_stats.items, fetch_stats, parse_stats, write_stats, reused)
@@ -5,101 +5,237 @@ Scrapes the top 1000 products from Sephora and saves them to a CSV file.
 Includes demo mode for testing when website access is restricted.
 """
 
+import argparse
+import asyncio
+import functools
+import os
 import requests
-import pandas as pd
-import time
-import random
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 import json
 import logging
 from typing import List, Dict, Optional
-import re
+from collections import Counter
+from dataclasses import dataclass, field
+
+from sephora_crawl_state import CrawlState, open_crawl_state
+from sephora_crawler import AsyncCrawler
+from sephora_extraction import PRODUCT_FIELD_RULES, product_row
+from sephora_frontier import UrlFrontier
+from sephora_http_cache import HttpCache
+from sephora_output import ProductOutput, ProductSummary
+from sephora_pipeline import run_pipeline
 
 # Set up logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 logger = logging.getLogger(__name__)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept-Encoding": "gzip, deflate",
+    "Connection": "keep-alive",
+    "Upgrade-Insecure-Requests": "1",
+    "Cache-Control": "no-cache",
+    "Pragma": "no-cache",
+}
+
+BESTSELLER_CATEGORIES = [
+    "makeup",
+    "skincare",
+    "hair",
+    "fragrance",
+    "tools-and-brushes",
+    "bath-and-body",
+    "mini-size",
+    "gifts",
+    "clean-beauty",
+    "luxury",
+]
+LISTING_PAGE_SIZE = 60
+
+
+@dataclass
+class DiscoveryStats:
+    """What adaptive listing discovery fetched, and why each listing stopped."""
+
+    listing_fetches: int = 0
+    static_plan_fetches: int = 0
+    stop_reasons: Counter = field(default_factory=Counter)
+
+    @property
+    def fetches_saved(self) -> int:
+        return self.static_plan_fetches - self.listing_fetches
+
+    def summary(self) -> str:
+        return (
+            f"{self.listing_fetches} listing page fetches "
+            f"(static URL list: {self.static_plan_fetches}, saved {self.fetches_saved}); "
+            f"listings stopped by {dict(self.stop_reasons)}"
+        )
 
 
 class SephoraScraper:
-    def __init__(self):
-        self.base_url = "https://www.sephora.com"
+    def __init__(
+        self,
+        base_url: str = "https://www.sephora.com",
+        concurrency: int = 4,
+        rate_per_host: float = 2.0,
+        parser: Optional[str] = None,
+        parse_workers: Optional[int] = None,
+        cache_dir: Optional[str] = None,
+        cache_max_mb: int = 500,
+        state_path: Optional[str] = "sephora_crawl_state.sqlite3",
+        fresh: bool = False,
+        output_formats: Optional[List[str]] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
         self.session = requests.Session()
-        self.session.headers.update(
-            {
-                "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-                "Accept-Language": "en-US,en;q=0.9",
-                "Accept-Encoding": "gzip, deflate",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1",
-                "Cache-Control": "no-cache",
-                "Pragma": "no-cache",
-            }
-        )
+        self.session.headers.update(DEFAULT_HEADERS)
         # Allow redirects but limit them
         self.session.max_redirects = 3
-        self.products = []
         self.max_products = 1000
+        # Async crawl settings: requests in flight and requests/second per host
+        self.concurrency = concurrency
+        self.rate_per_host = rate_per_host
+        # Product page parser backend: "lxml" (default if installed) or "html.parser"
+        self.parser = parser
+        # Processes parsing product pages (None: all cores, 0: parse inline)
+        self.parse_workers = parse_workers
+        # Upper bound on pages followed per listing during adaptive discovery
+        self.max_listing_pages = 20
+        # On-disk HTTP cache for reruns (None disables conditional requests)
+        self.cache_dir = cache_dir
+        self.cache_max_mb = cache_max_mb
+        # SQLite crawl state checkpointing the frontier and rows (None: in memory only)
+        self.state_path = state_path
+        self.fresh = fresh
+        # Files written next to the CSV name: typed JSONL and Parquet by default
+        self.output_formats = output_formats or ["csv", "jsonl", "parquet"]
+        # Running summary statistics, updated as rows are written
+        self.summary = ProductSummary()
+        # Format -> path of the files the last run wrote
+        self.output_paths: Dict[str, str] = {}
 
     def get_bestsellers_urls(self) -> List[str]:
         """Get URLs for bestseller pages across different categories."""
         bestseller_urls = [
-            "https://www.sephora.com/bestsellers",
-            "https://www.sephora.com/bestsellers?pageSize=60",
-            "https://www.sephora.com/bestsellers?pageSize=120",
-            "https://www.sephora.com/bestsellers?pageSize=180",
-            "https://www.sephora.com/bestsellers?pageSize=240",
-            "https://www.sephora.com/bestsellers?pageSize=300",
-            "https://www.sephora.com/bestsellers?pageSize=360",
-            "https://www.sephora.com/bestsellers?pageSize=420",
-            "https://www.sephora.com/bestsellers?pageSize=480",
-            "https://www.sephora.com/bestsellers?pageSize=540",
-            "https://www.sephora.com/bestsellers?pageSize=600",
-            "https://www.sephora.com/bestsellers?pageSize=660",
-            "https://www.sephora.com/bestsellers?pageSize=720",
-            "https://www.sephora.com/bestsellers?pageSize=780",
-            "https://www.sephora.com/bestsellers?pageSize=840",
-            "https://www.sephora.com/bestsellers?pageSize=900",
-            "https://www.sephora.com/bestsellers?pageSize=960",
-            "https://www.sephora.com/bestsellers?pageSize=1020",
+            f"{self.base_url}/bestsellers",
+            f"{self.base_url}/bestsellers?pageSize=60",
+            f"{self.base_url}/bestsellers?pageSize=120",
+            f"{self.base_url}/bestsellers?pageSize=180",
+            f"{self.base_url}/bestsellers?pageSize=240",
+            f"{self.base_url}/bestsellers?pageSize=300",
+            f"{self.base_url}/bestsellers?pageSize=360",
+            f"{self.base_url}/bestsellers?pageSize=420",
+            f"{self.base_url}/bestsellers?pageSize=480",
+            f"{self.base_url}/bestsellers?pageSize=540",
+            f"{self.base_url}/bestsellers?pageSize=600",
+            f"{self.base_url}/bestsellers?pageSize=660",
+            f"{self.base_url}/bestsellers?pageSize=720",
+            f"{self.base_url}/bestsellers?pageSize=780",
+            f"{self.base_url}/bestsellers?pageSize=840",
+            f"{self.base_url}/bestsellers?pageSize=900",
+            f"{self.base_url}/bestsellers?pageSize=960",
+            f"{self.base_url}/bestsellers?pageSize=1020",
         ]
 
         # Also add category-specific bestsellers
-        categories = [
-            "makeup",
-            "skincare",
-            "hair",
-            "fragrance",
-            "tools-and-brushes",
-            "bath-and-body",
-            "mini-size",
-            "gifts",
-            "clean-beauty",
-            "luxury",
-        ]
-
-        for category in categories:
+        for category in BESTSELLER_CATEGORIES:
             bestseller_urls.extend(
                 [
-                    f"https://www.sephora.com/shop/{category}-bestsellers",
-                    f"https://www.sephora.com/shop/{category}-bestsellers?pageSize=60",
-                    f"https://www.sephora.com/shop/{category}-bestsellers?pageSize=120",
+                    f"{self.base_url}/shop/{category}-bestsellers",
+                    f"{self.base_url}/shop/{category}-bestsellers?pageSize=60",
+                    f"{self.base_url}/shop/{category}-bestsellers?pageSize=120",
                 ]
             )
 
         return bestseller_urls
 
+    def get_listing_seeds(self) -> List[str]:
+        """First pages of the bestseller listings that adaptive discovery follows."""
+        return [f"{self.base_url}/bestsellers"] + [
+            f"{self.base_url}/shop/{category}-bestsellers"
+            for category in BESTSELLER_CATEGORIES
+        ]
+
+    async def discover_products(
+        self, crawler: AsyncCrawler, frontier: UrlFrontier, state: Optional[CrawlState] = None
+    ) -> DiscoveryStats:
+        """Follow listing pagination until it stops paying off.
+
+        Each listing is paged through with ``currentPage`` and stops as soon
+        as a page yields no product ids new to the frontier, or once the
+        frontier holds ``max_products`` products. Listings are crawled
+        concurrently, pages within a listing in order.
+
+        With ``state``, the products of every listing page and the page
+        reached are committed as they are found, and an interrupted discovery
+        resumes each listing after its last saved page (``frontier`` should
+        then hold ``state.urls()``).
+        """
+        stats = DiscoveryStats(static_plan_fetches=len(self.get_bestsellers_urls()))
+
+        def save_progress(seed: str, new_links: List[str], progress: str):
+            if state:
+                state.add_urls(new_links)
+                state.set_meta(f"listing:{seed}", progress)
+                state.commit()
+
+        async def crawl_listing(seed: str):
+            progress = state.get_meta(f"listing:{seed}") if state else None
+            if progress == "done":
+                return
+            for page in range(int(progress or 0) + 1, self.max_listing_pages + 1):
+                if len(frontier) >= self.max_products:
+                    stats.stop_reasons["target_reached"] += 1
+                    return
+                url = f"{seed}?pageSize={LISTING_PAGE_SIZE}&currentPage={page}"
+                result = await crawler.fetch(url)
+                stats.listing_fetches += 1
+                if result is None:
+                    stats.stop_reasons["fetch_failed"] += 1
+                    return
+                new_links = self.parse_product_links(result.url, result.content, frontier)
+                if not new_links:
+                    stats.stop_reasons["no_new_products"] += 1
+                    save_progress(seed, new_links, "done")
+                    return
+                save_progress(seed, new_links, str(page))
+            stats.stop_reasons["page_limit"] += 1
+            save_progress(seed, [], "done")
+
+        await asyncio.gather(*(crawl_listing(seed) for seed in self.get_listing_seeds()))
+        return stats
+
     def extract_product_links(self, url: str) -> List[str]:
         """Extract product links from a category or bestseller page."""
         try:
             logger.info(f"Fetching product links from: {url}")
             response = self.session.get(url, timeout=10)
             response.raise_for_status()
+            return self.parse_product_links(url, response.content)
+
+        except Exception as e:
+            logger.error(f"Error extracting product links from {url}: {e}")
+            return []
+
+    def parse_product_links(
+        self, url: str, html: bytes, frontier: Optional[UrlFrontier] = None
+    ) -> List[str]:
+        """Extract product links from the HTML of a category or bestseller page.
 
-            soup = BeautifulSoup(response.content, "html.parser")
+        Links are canonicalized and deduplicated by product id. When a shared
+        ``frontier`` is given, they are added to it and only the products new
+        to it are returned.
+        """
+        try:
+            soup = BeautifulSoup(html, "html.parser")
+            frontier = frontier if frontier is not None else UrlFrontier(self.base_url)
             product_links = []
 
             # Look for product links in various formats
@@ -118,9 +254,7 @@ class SephoraScraper:
                 for link in links:
                     href = link.get("href")
                     if href and "/product/" in href:
-                        full_url = urljoin(self.base_url, str(href))
-                        if full_url not in product_links:
-                            product_links.append(full_url)
+                        self._add_link(str(href), frontier, product_links)
 
             # Also look for JSON data in script tags
             scripts = soup.find_all("script", type="application/json")
@@ -131,7 +265,7 @@ class SephoraScraper:
                         data = json.loads(script_content)
                         if isinstance(data, dict):
                             # Extract product URLs from JSON data
-                            self._extract_urls_from_json(data, product_links)
+                            self._extract_urls_from_json(data, product_links, frontier)
                 except (json.JSONDecodeError, AttributeError):
                     continue
 
@@ -142,8 +276,19 @@ class SephoraScraper:
             logger.error(f"Error extracting product links from {url}: {e}")
             return []
 
-    def _extract_urls_from_json(self, data, product_links: List[str]):
+    def _add_link(self, href: str, frontier: UrlFrontier, product_links: List[str]):
+        """Add a link to the frontier, recording it if its product is new."""
+        canonical = frontier.add(urljoin(self.base_url, href))
+        if canonical:
+            product_links.append(canonical)
+
+    def _extract_urls_from_json(
+        self, data, product_links: List[str], frontier: Optional[UrlFrontier] = None
+    ):
         """Recursively extract product URLs from JSON data."""
+        if frontier is None:
+            frontier = UrlFrontier(self.base_url)
+            frontier.update(product_links)
         if isinstance(data, dict):
             for key, value in data.items():
                 if (
@@ -151,14 +296,12 @@ class SephoraScraper:
                     and isinstance(value, str)
                     and "/product/" in value
                 ):
-                    full_url = urljoin(self.base_url, value)
-                    if full_url not in product_links:
-                        product_links.append(full_url)
+                    self._add_link(value, frontier, product_links)
                 elif isinstance(value, (dict, list)):
-                    self._extract_urls_from_json(value, product_links)
+                    self._extract_urls_from_json(value, product_links, frontier)
         elif isinstance(data, list):
             for item in data:
-                self._extract_urls_from_json(item, product_links)
+                self._extract_urls_from_json(item, product_links, frontier)
 
     def scrape_product_page(self, url: str) -> Optional[Dict]:
         """Scrape individual product page and extract product information."""
@@ -166,36 +309,21 @@ class SephoraScraper:
             logger.info(f"Scraping product: {url}")
             response = self.session.get(url, timeout=10)
             response.raise_for_status()
+            return self.parse_product_page(url, response.content)
+
+        except Exception as e:
+            logger.error(f"Error scraping product {url}: {e}")
+            return None
 
-            soup = BeautifulSoup(response.content, "html.parser")
-
-            # Extract product information
-            product_data = {
-                "url": url,
-                "name": self._extract_text(
-                    soup, ["h1", ".css-1xvwxyi", '[data-at="product_name"]']
-                ),
-                "brand": self._extract_text(
-                    soup, [".css-1xvwxyi", '[data-at="brand_name"]', ".css-1qe8tjm"]
-                ),
-                "price": self._extract_price(soup),
-                "rating": self._extract_rating(soup),
-                "review_count": self._extract_review_count(soup),
-                "category": self._extract_category(soup),
-                "description": self._extract_description(soup),
-                "ingredients": self._extract_ingredients(soup),
-                "size": self._extract_size(soup),
-                "availability": self._extract_availability(soup),
-            }
-
-            # Clean up the data
-            product_data = {
-                k: v.strip() if isinstance(v, str) else v
-                for k, v in product_data.items()
-            }
+    def parse_product_page(self, url: str, html: bytes) -> Optional[Dict]:
+        """Extract product information from the HTML of a product page."""
+        try:
+            # Extract product information from the embedded product JSON,
+            # falling back to a single DOM pass for any fields it lacks
+            product_data = product_row(url, html, self.parser)
 
             # Only add if we have at least a name
-            if product_data["name"]:
+            if product_data:
                 logger.info(f"Successfully scraped: {product_data['name']}")
                 return product_data
             else:
@@ -206,229 +334,168 @@ class SephoraScraper:
             logger.error(f"Error scraping product {url}: {e}")
             return None
 
-    def _extract_text(self, soup: BeautifulSoup, selectors: List[str]) -> str:
-        """Extract text using multiple selectors."""
-        for selector in selectors:
-            element = soup.select_one(selector)
-            if element:
-                text = element.get_text(strip=True)
-                if text:
-                    return text
-        return ""
-
-    def _extract_price(self, soup: BeautifulSoup) -> str:
-        """Extract product price."""
-        price_selectors = [
-            '.css-1xvwxyi[data-at="price"]',
-            '[data-at="price"]',
-            '.css-1qe8tjm[data-at="price"]',
-            ".css-1xvwxyi",
-            ".css-1qe8tjm",
-        ]
-
-        for selector in price_selectors:
-            element = soup.select_one(selector)
-            if element:
-                text = element.get_text(strip=True)
-                # Look for price patterns
-                price_match = re.search(r"\$[\d,]+\.?\d*", text)
-                if price_match:
-                    return price_match.group()
-        return ""
-
-    def _extract_rating(self, soup: BeautifulSoup) -> str:
-        """Extract product rating."""
-        rating_selectors = [
-            '[data-at="number_of_reviews"]',
-            '.css-1xvwxyi[data-at="number_of_reviews"]',
-            '.css-1qe8tjm[data-at="number_of_reviews"]',
-        ]
-
-        for selector in rating_selectors:
-            element = soup.select_one(selector)
-            if element:
-                text = element.get_text(strip=True)
-                # Look for rating patterns (e.g., "4.5 out of 5")
-                rating_match = re.search(r"(\d+\.?\d*)\s*out\s*of\s*5", text)
-                if rating_match:
-                    return rating_match.group(1)
-        return ""
-
-    def _extract_review_count(self, soup: BeautifulSoup) -> str:
-        """Extract number of reviews."""
-        review_selectors = [
-            '[data-at="number_of_reviews"]',
-            '.css-1xvwxyi[data-at="number_of_reviews"]',
-            '.css-1qe8tjm[data-at="number_of_reviews"]',
-        ]
-
-        for selector in review_selectors:
-            element = soup.select_one(selector)
-            if element:
-                text = element.get_text(strip=True)
-                # Look for review count patterns
-                review_match = re.search(r"(\d+(?:,\d+)*)\s*reviews?", text)
-                if review_match:
-                    return review_match.group(1)
-        return ""
-
-    def _extract_category(self, soup: BeautifulSoup) -> str:
-        """Extract product category."""
-        # Try to extract from breadcrumbs
-        breadcrumb_selectors = [
-            '.css-1xvwxyi[data-at="breadcrumb"]',
-            '[data-at="breadcrumb"]',
-            '.css-1qe8tjm[data-at="breadcrumb"]',
-        ]
-
-        for selector in breadcrumb_selectors:
-            element = soup.select_one(selector)
-            if element:
-                text = element.get_text(strip=True)
-                if text:
-                    return text
-        return ""
-
-    def _extract_description(self, soup: BeautifulSoup) -> str:
-        """Extract product description."""
-        desc_selectors = [
-            '[data-at="product_description"]',
-            '.css-1xvwxyi[data-at="product_description"]',
-            '.css-1qe8tjm[data-at="product_description"]',
-            ".css-1xvwxyi",
-            ".css-1qe8tjm",
-        ]
-
-        for selector in desc_selectors:
-            element = soup.select_one(selector)
-            if element:
-                text = element.get_text(strip=True)
-                if len(text) > 20:  # Only return substantial descriptions
-                    return text[:500]  # Limit length
-        return ""
-
-    def _extract_ingredients(self, soup: BeautifulSoup) -> str:
-        """Extract product ingredients."""
-        ingredient_selectors = [
-            '[data-at="ingredients"]',
-            '.css-1xvwxyi[data-at="ingredients"]',
-            '.css-1qe8tjm[data-at="ingredients"]',
-        ]
-
-        for selector in ingredient_selectors:
-            element = soup.select_one(selector)
-            if element:
-                text = element.get_text(strip=True)
-                if text:
-                    return text
-        return ""
-
-    def _extract_size(self, soup: BeautifulSoup) -> str:
-        """Extract product size."""
-        size_selectors = [
-            '[data-at="size"]',
-            '.css-1xvwxyi[data-at="size"]',
-            '.css-1qe8tjm[data-at="size"]',
-        ]
-
-        for selector in size_selectors:
-            element = soup.select_one(selector)
-            if element:
-                text = element.get_text(strip=True)
-                if text:
-                    return text
-        return ""
-
-    def _extract_availability(self, soup: BeautifulSoup) -> str:
-        """Extract product availability."""
-        availability_selectors = [
-            '[data-at="availability"]',
-            '.css-1xvwxyi[data-at="availability"]',
-            '.css-1qe8tjm[data-at="availability"]',
-        ]
-
-        for selector in availability_selectors:
-            element = soup.select_one(selector)
-            if element:
-                text = element.get_text(strip=True)
-                if text:
-                    return text
-        return "Available"  # Default assumption
-
-    def scrape_all_products(self):
+    def scrape_all_products(self, filename: str = "sephora_products.csv"):
         """Main method to scrape all products."""
+        asyncio.run(self.scrape_all_products_async(filename))
+
+    async def scrape_all_products_async(self, filename: str = "sephora_products.csv"):
+        """Scrape all products with the async crawl engine.
+
+        Listing and product pages are fetched concurrently over a pooled
+        connection, paced by a per-host token bucket instead of fixed sleeps.
+        Product pages then flow through a fetch/parse/write pipeline: pages
+        are parsed in a process pool while later ones are still downloading,
+        and rows are appended to ``filename`` as soon as they are parsed,
+        along with typed ``.jsonl``/``.parquet`` files of the same base name.
+
+        With ``cache_dir`` set, pages are requested conditionally; a 304 or a
+        byte-identical body reuses the cached copy and, for product pages,
+        the row parsed from it last time.
+
+        With ``state_path`` set, the frontier and every parsed row are
+        checkpointed to SQLite (the frontier after every listing page, rows
+        in batches). A run that crashed or was interrupted resumes from
+        there: discovery continues after the last saved listing pages or is
+        skipped once complete, stored rows are rewritten to ``filename``, and only the products
+        still pending are fetched.
+        """
         logger.info("Starting Sephora product scraping...")
 
-        # Get all product URLs
-        all_product_urls = set()
-        bestseller_urls = self.get_bestsellers_urls()
-
-        for url in bestseller_urls:
-            product_links = self.extract_product_links(url)
-            all_product_urls.update(product_links)
-
-            # Add some delay to be respectful
-            time.sleep(random.uniform(1, 3))
-
-        logger.info(f"Found {len(all_product_urls)} unique product URLs")
-
-        # Convert to list and limit to max_products
-        product_urls = list(all_product_urls)[: self.max_products]
+        state = (
+            open_crawl_state(self.state_path, self.base_url, fresh=self.fresh)
+            if self.state_path
+            else None
+        )
 
-        # Scrape each product
-        for i, url in enumerate(product_urls, 1):
-            if len(self.products) >= self.max_products:
-                break
+        cache = (
+            HttpCache(self.cache_dir, max_bytes=self.cache_max_mb * 1024 * 1024)
+            if self.cache_dir
+            else None
+        )
+        async with AsyncCrawler(
+            headers=DEFAULT_HEADERS,
+            concurrency=self.concurrency,
+            rate_per_host=self.rate_per_host,
+            cache=cache,
+        ) as crawler:
+            # Get all product URLs, deduplicated by product id
+            frontier = UrlFrontier(self.base_url)
+            if state:
+                frontier.update(state.urls())
+            if state and state.discovery_complete:
+                logger.info(f"Restored {len(frontier)} discovered products from crawl state")
+            else:
+                if len(frontier):
+                    logger.info(f"Resuming discovery with {len(frontier)} products from crawl state")
+                discovery = await self.discover_products(crawler, frontier, state)
+                logger.info(f"Listing discovery: {discovery.summary()}")
+                logger.info(
+                    f"Found {len(frontier)} unique products from {frontier.links_seen} "
+                    f"links ({frontier.duplicates} duplicate or variant links skipped)"
+                )
+                if state:
+                    state.add_urls(frontier)
+                    state.set_meta("discovery_complete", "1")
+                    state.commit()
+
+            # Limit to max_products
+            product_urls = list(frontier)[: self.max_products]
+
+            # Scrape each product
+            writer = ProductOutput(
+                os.path.splitext(filename)[0],
+                self.output_formats,
+                ["url"] + [rule.name for rule in PRODUCT_FIELD_RULES],
+            )
+            self.summary = writer.summary
+            self.output_paths = writer.paths
+
+            try:
+                if state:
+                    for row in state.rows():
+                        writer.write(row)
+                    pending = set(state.pending_urls())
+                    product_urls = [url for url in product_urls if url in pending]
+                    if writer.rows_written:
+                        logger.info(
+                            f"Restored {writer.rows_written} rows; "
+                            f"{len(product_urls)} products left to fetch"
+                        )
+                result = await run_pipeline(
+                    crawler,
+                    product_urls,
+                    functools.partial(product_row, backend=self.parser),
+                    writer.write,
+                    parse_workers=self.parse_workers,
+                    max_rows=self.max_products - writer.rows_written,
+                    cache=cache,
+                    on_parsed=state.mark_done if state else None,
+                )
+                if state:
+                    # Pages whose fetch failed stay pending for the next run.
+                    unfinished = set(state.pending_urls()).intersection(product_urls)
+                    if writer.rows_written >= self.max_products or not unfinished:
+                        state.set_meta("finished", "1")
+                    else:
+                        logger.warning(
+                            f"{len(unfinished)} products could not be fetched; "
+                            "rerun to retry them"
+                        )
+            finally:
+                writer.close()
+                if cache:
+                    cache.close()
+                if state:
+                    state.close()
+
+            logger.info(f"Crawl stats: {crawler.stats.summary()}")
+            logger.info(f"Pipeline stages:\n{result.summary()}")
+            if cache:
+                logger.info(f"HTTP cache: {cache.summary()}")
+
+        logger.info(
+            f"Saved {writer.rows_written} products to {', '.join(writer.paths.values())}"
+        )
+        logger.info(f"Scraping completed. Total products scraped: {self.rows_written}")
 
-            product_data = self.scrape_product_page(url)
-            if product_data:
-                self.products.append(product_data)
-
-            # Progress update
-            if i % 10 == 0:
-                logger.info(f"Progress: {i}/{len(product_urls)} products scraped")
-
-            # Add delay between requests
-            time.sleep(random.uniform(0.5, 2))
-
-        logger.info(f"Scraping completed. Total products scraped: {len(self.products)}")
-
-    def save_to_csv(self, filename: str = "sephora_products.csv"):
-        """Save scraped products to CSV file."""
-        if not self.products:
-            logger.warning("No products to save!")
-            return
-
-        df = pd.DataFrame(self.products)
-        df.to_csv(filename, index=False, encoding="utf-8")
-        logger.info(f"Saved {len(self.products)} products to {filename}")
-
-        # Also save a summary
-        summary_filename = "sephora_products_summary.txt"
-        with open(summary_filename, "w", encoding="utf-8") as f:
-            f.write(f"Sephora Products Scraping Summary\n")
-            f.write(f"================================\n")
-            f.write(f"Total products scraped: {len(self.products)}\n")
-            f.write(f"Date: {pd.Timestamp.now()}\n\n")
-
-            if "brand" in df.columns:
-                brand_counts = df["brand"].value_counts().head(10)
-                f.write("Top 10 Brands:\n")
-                for brand, count in brand_counts.items():
-                    f.write(f"  {brand}: {count} products\n")
-                f.write("\n")
-
-            if "category" in df.columns:
-                category_counts = df["category"].value_counts().head(10)
-                f.write("Top 10 Categories:\n")
-                for category, count in category_counts.items():
-                    f.write(f"  {category}: {count} products\n")
+    @property
+    def rows_written(self) -> int:
+        """Rows written to the output files (restored ones included)."""
+        return self.summary.total
 
+    def save_summary(self, summary_filename: str = "sephora_products_summary.txt"):
+        """Save a summary of the scraped products from the running totals."""
+        self.summary.write(summary_filename)
         logger.info(f"Summary saved to {summary_filename}")
 
 
-def main():
+def main(argv: List[str] = None):
     """Main function to run the scraper."""
+    parser = argparse.ArgumentParser(description="Scrape top products from Sephora")
+    parser.add_argument("--base-url", default="https://www.sephora.com",
+                        help="Site to crawl (e.g. a local fixture server)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Requests in flight")
+    parser.add_argument("--rate", type=float, default=2.0, help="Requests per second per host")
+    parser.add_argument("--max-products", type=int, default=1000)
+    parser.add_argument("--parser", choices=["lxml", "html.parser"], default=None,
+                        help="Product page parser backend (default: lxml if installed)")
+    parser.add_argument("--parse-workers", type=int, default=None,
+                        help="Parser processes (default: all cores, 0: parse inline)")
+    parser.add_argument("--cache-dir", default=None,
+                        help="On-disk HTTP cache for conditional requests on reruns")
+    parser.add_argument("--cache-max-mb", type=int, default=500,
+                        help="Size limit of the HTTP cache before LRU eviction")
+    parser.add_argument("--state-db", default="sephora_crawl_state.sqlite3",
+                        help="SQLite crawl state used to resume an interrupted run")
+    parser.add_argument("--no-state", action="store_true",
+                        help="Keep crawl state in memory only")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Discard unfinished crawl state instead of resuming it")
+    parser.add_argument("--formats", nargs="+", choices=["csv", "jsonl", "parquet"],
+                        default=["csv", "jsonl", "parquet"],
+                        help="Output files to write")
+    args = parser.parse_args(argv)
+
     print("🛍️  Sephora Product Scraper")
     print("=" * 40)
     print("⚠️  Important Notes:")
@@ -438,18 +505,31 @@ def main():
     print("• Use responsibly and in compliance with Sephora's terms of service")
     print("=" * 40)
 
-    scraper = SephoraScraper()
+    scraper = SephoraScraper(
+        base_url=args.base_url,
+        concurrency=args.concurrency,
+        rate_per_host=args.rate,
+        parser=args.parser,
+        parse_workers=args.parse_workers,
+        cache_dir=args.cache_dir,
+        cache_max_mb=args.cache_max_mb,
+        state_path=None if args.no_state else args.state_db,
+        fresh=args.fresh,
+        output_formats=args.formats,
+    )
+    scraper.max_products = args.max_products
 
     try:
         scraper.scrape_all_products()
-        scraper.save_to_csv()
+        if scraper.rows_written:
+            scraper.save_summary()
 
         print(f"\n✅ Scraping completed!")
-        print(f"📊 Total products scraped: {len(scraper.products)}")
-        print(f"💾 Data saved to: sephora_products.csv")
+        print(f"📊 Total products scraped: {scraper.rows_written}")
+        print(f"💾 Data saved to: {', '.join(scraper.output_paths.values())}")
         print(f"📋 Summary saved to: sephora_products_summary.txt")
 
-        if len(scraper.products) == 0:
+        if scraper.rows_written == 0:
             print(f"\n⚠️  No products were scraped. This could be due to:")
             print(f"   • Website blocking automated requests")
             print(f"   • Changes in Sephora's website structure")
@@ -458,14 +538,18 @@ def main():
 
     except KeyboardInterrupt:
         logger.info("Scraping interrupted by user")
-        if scraper.products:
-            scraper.save_to_csv("sephora_products_partial.csv")
-            print(f"\n⚠️  Partial results saved to: sephora_products_partial.csv")
+        if scraper.rows_written:
+            scraper.save_summary()
+            print(f"\n⚠️  Partial results saved to: {', '.join(scraper.output_paths.values())}")
+        if scraper.state_path:
+            print(f"🔁 Rerun to resume from: {scraper.state_path}")
     except Exception as e:
         logger.error(f"An error occurred: {e}")
-        if scraper.products:
-            scraper.save_to_csv("sephora_products_error.csv")
-            print(f"\n⚠️  Partial results saved to: sephora_products_error.csv")
+        if scraper.rows_written:
+            scraper.save_summary()
+            print(f"\n⚠️  Partial results saved to: {', '.join(scraper.output_paths.values())}")
+        if scraper.state_path:
+            print(f"🔁 Rerun to resume from: {scraper.state_path}")
 
 
 if __name__ == "__main__":
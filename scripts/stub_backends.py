@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Stub Gemini and Azure FLUX Backends
+Local stand-ins for the Gemini API and the Azure OpenAI FLUX images/edits API,
+with configurable latency distributions, for offline load testing.
+
+Point the backend at the stubs with:
+    GOOGLE_GENAI_USE_VERTEXAI=False
+    GOOGLE_API_KEY=stub
+    GOOGLE_GEMINI_BASE_URL=http://127.0.0.1:8900/
+    AZURE_OPENAI_API_KEY=stub
+    AZURE_FLUX_EDIT_URL=http://127.0.0.1:8900/openai/deployments/FLUX.1-Kontext-pro/images/edits
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import math
+import random
+import string
+import struct
+import zlib
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# LATENCY DISTRIBUTIONS
+# =============================================================================
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """Parse a latency distribution spec into a sampler returning seconds.
+
+    Supported specs:
+        fixed:0.5                 always 0.5s
+        uniform:0.2,1.5           uniform between 0.2s and 1.5s
+        normal:1.0,0.2            normal with mean 1.0s and stddev 0.2s
+        lognormal:8.0,0.4         log-normal with median 8.0s and sigma 0.4
+    """
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v]
+    if kind == "fixed" and len(values) == 1:
+        return lambda: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "normal" and len(values) == 2:
+        return lambda: max(0.0, random.gauss(values[0], values[1]))
+    if kind == "lognormal" and len(values) == 2:
+        mu = math.log(values[0])
+        return lambda: random.lognormvariate(mu, values[1])
+    raise argparse.ArgumentTypeError(f"Invalid latency spec: {spec}")
+
+
+# =============================================================================
+# FAKE PAYLOADS
+# =============================================================================
+
+TREND_NAMES = {
+    "makeup": ["Latte Makeup", "Cherry Cola Lips", "Soft Focus Skin", "Blush Draping"],
+    "skincare": ["Glass Skin", "Skin Cycling", "Peptide Layering", "Barrier Repair"],
+    "hair": ["Butter Blonde", "Bixie Cut", "Scalp Serums", "Glossy Bob"],
+}
+DOMAINS = [
+    "vogue.com",
+    "allure.com",
+    "reddit.com",
+    "byrdie.com",
+    "harpersbazaar.com",
+    "elle.com",
+    "tiktok.com",
+    "youtube.com",
+]
+
+
+def _redirect_url() -> str:
+    """A Vertex AI grounding redirect URL, as long as the real ones."""
+    token = "".join(random.choices(string.ascii_letters + string.digits + "-_", k=220))
+    return f"https://vertexaisearch.cloud.google.com/grounding-api-redirect/{token}"
+
+
+def make_research_response(num_sources: int) -> dict:
+    """Build a research-agent response with realistic grounding metadata.
+
+    Every sentence of the findings is backed by one or two grounding chunks,
+    mirroring how Gemini attaches ``groundingSupports`` to text segments.
+    """
+    chunks = []
+    for _ in range(num_sources):
+        domain = random.choice(DOMAINS)
+        chunks.append({"web": {"uri": _redirect_url(), "title": domain, "domain": domain}})
+
+    text = ""
+    supports = []
+    for category, names in TREND_NAMES.items():
+        if text:
+            text += "\n"
+        text += f"## {category.title()} Trends\n\n"
+        for name in names:
+            sentences = [
+                f"**{name}** is gaining rapid traction on TikTok and Instagram, with creators posting tutorials that rack up millions of views.",
+                f"Reddit threads in r/MakeupAddiction and r/SkincareAddiction describe {name.lower()} as a luxurious, high-performance routine.",
+                "Users recommend techniques such as applying in thin layers, patting gently and blending outward for a polished finish.",
+            ]
+            for sentence in sentences:
+                start = len(text.encode("utf-8"))
+                text += sentence + " "
+                indices = random.sample(range(num_sources), k=min(2, num_sources))
+                supports.append(
+                    {
+                        "segment": {
+                            "startIndex": start,
+                            "endIndex": start + len(sentence.encode("utf-8")),
+                            "text": sentence,
+                        },
+                        "groundingChunkIndices": indices,
+                        "confidenceScores": [
+                            round(random.uniform(0.6, 0.99), 3) for _ in indices
+                        ],
+                    }
+                )
+            text += "\n"
+
+    queries = [f"{name.lower()} trend tiktok" for names in TREND_NAMES.values() for name in names[:2]]
+    return {
+        "text": text,
+        "groundingMetadata": {
+            "webSearchQueries": queries,
+            "groundingChunks": chunks,
+            "groundingSupports": supports,
+        },
+    }
+
+
+def make_report_response() -> dict:
+    """Build a composer response: a JSON EsteeLauderTrendsReport."""
+
+    def trend(name: str) -> dict:
+        return {
+            "name": name,
+            "description": f"{name} is a rising luxury beauty trend driven by social media tutorials.",
+            "techniques": ["Blend outward", "Pat gently", "Apply in layers"],
+            "popularity": random.choice(["Rising", "Viral", "Emerging", "Growing"]),
+            "difficulty": random.choice(["Beginner", "Intermediate", "Advanced"]),
+            "key_products": ["Advanced Night Repair Serum", "Double Wear Foundation"],
+            "target_demographic": random.choice(["Gen Z", "Millennials", "All ages"]),
+        }
+
+    report = {
+        "report_summary": "Luxury beauty is shifting toward skin-first, high-performance routines.",
+        "trends": {
+            "makeup_trends": [trend(n) for n in TREND_NAMES["makeup"]],
+            "skincare_trends": [trend(n) for n in TREND_NAMES["skincare"]],
+            "hair_trends": [trend(n) for n in TREND_NAMES["hair"]],
+        },
+    }
+    return {"text": json.dumps(report)}
+
+
+def make_png(approx_bytes: int) -> bytes:
+    """Create a valid RGB noise PNG of roughly ``approx_bytes`` (noise does not compress)."""
+    side = max(1, int((approx_bytes / 3) ** 0.5))
+    raw = b"".join(b"\x00" + random.randbytes(side * 3) for _ in range(side))
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return (
+            struct.pack(">I", len(data))
+            + tag
+            + data
+            + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+        )
+
+    header = struct.pack(">IIBBBBB", side, side, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(raw, 1))
+        + chunk(b"IEND", b"")
+    )
+
+
+# =============================================================================
+# STUB APP
+# =============================================================================
+
+
+@dataclass
+class StubSettings:
+    gemini_latency: Callable[[], float]
+    composer_latency: Callable[[], float]
+    flux_latency: Callable[[], float]
+    num_sources: int = 24
+    stream_chunks: int = 12
+    flux_image_kb: int = 1500
+    error_rate: float = 0.0
+    gemini_capacity: int = 0
+    # Latency multiplier per model name, e.g. {"gemini-2.5-flash": 0.3}
+    model_latency_scale: Dict[str, float] = field(default_factory=dict)
+
+
+def _thinking_tokens(body: dict) -> int:
+    """Thinking tokens within the request's thinking budget (0 turns it off)."""
+    thinking_config = (body.get("generationConfig") or {}).get("thinkingConfig") or {}
+    budget = thinking_config.get("thinkingBudget")
+    if budget is None or budget < 0:
+        return random.randint(200, 2000)
+    return random.randint(min(budget, 200), budget)
+
+
+def _usage_metadata(prompt: dict, text: str) -> dict:
+    prompt_tokens = len(json.dumps(prompt)) // 4
+    output_tokens = len(text) // 4
+    thinking_tokens = _thinking_tokens(prompt)
+    return {
+        "promptTokenCount": prompt_tokens,
+        "candidatesTokenCount": output_tokens,
+        "thoughtsTokenCount": thinking_tokens,
+        "totalTokenCount": prompt_tokens + output_tokens + thinking_tokens,
+    }
+
+
+def _wants_json(body: dict) -> bool:
+    generation_config = body.get("generationConfig") or {}
+    return (
+        generation_config.get("responseMimeType") == "application/json"
+        or "responseSchema" in generation_config
+        or "responseJsonSchema" in generation_config
+    )
+
+
+def create_stub_app(settings: StubSettings) -> FastAPI:
+    """Create the stub app serving both the Gemini and the FLUX APIs."""
+    app = FastAPI(title="Gemini / FLUX stubs")
+    flux_b64 = base64.b64encode(make_png(settings.flux_image_kb * 1024)).decode()
+    # Gemini calls in progress, for the --gemini-capacity quota
+    active = {"gemini": 0}
+
+    def resource_exhausted() -> JSONResponse:
+        return JSONResponse(
+            {"error": {"code": 429, "message": "Resource exhausted (stub)", "status": "RESOURCE_EXHAUSTED"}},
+            status_code=429,
+        )
+
+    def candidate(payload: dict, text: str, finish: bool) -> dict:
+        result = {"content": {"role": "model", "parts": [{"text": text}]}}
+        if finish:
+            result["finishReason"] = "STOP"
+            if "groundingMetadata" in payload:
+                result["groundingMetadata"] = payload["groundingMetadata"]
+        return result
+
+    @app.post("/{api_version}/models/{model_action}")
+    async def gemini(api_version: str, model_action: str, request: Request):
+        body = await request.json()
+        model, _, action = model_action.partition(":")
+        structured = _wants_json(body)
+        payload = make_report_response() if structured else make_research_response(
+            settings.num_sources
+        )
+        latency = (settings.composer_latency if structured else settings.gemini_latency)()
+        latency *= settings.model_latency_scale.get(model, 1.0)
+
+        if random.random() < settings.error_rate:
+            await asyncio.sleep(latency / 10)
+            return resource_exhausted()
+        if settings.gemini_capacity and active["gemini"] >= settings.gemini_capacity:
+            await asyncio.sleep(0.05)
+            return resource_exhausted()
+
+        usage = _usage_metadata(body, payload["text"])
+        if action == "generateContent":
+            active["gemini"] += 1
+            try:
+                await asyncio.sleep(latency)
+            finally:
+                active["gemini"] -= 1
+            return {
+                "candidates": [candidate(payload, payload["text"], finish=True)],
+                "usageMetadata": usage,
+                "modelVersion": model,
+            }
+
+        async def stream():
+            text = payload["text"]
+            step = max(1, len(text) // settings.stream_chunks)
+            pieces = [text[i : i + step] for i in range(0, len(text), step)]
+            try:
+                # Spend half of the latency before the first token, spread the rest.
+                await asyncio.sleep(latency / 2)
+                for i, piece in enumerate(pieces):
+                    last = i == len(pieces) - 1
+                    event = {"candidates": [candidate(payload, piece, finish=last)], "modelVersion": model}
+                    if last:
+                        event["usageMetadata"] = usage
+                    yield f"data: {json.dumps(event)}\r\n\r\n"
+                    await asyncio.sleep(latency / 2 / len(pieces))
+            finally:
+                active["gemini"] -= 1
+
+        active["gemini"] += 1
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    @app.post("/openai/deployments/{deployment}/images/edits")
+    async def flux_edit(deployment: str, request: Request):
+        form = await request.form()
+        if "image" not in form or "prompt" not in form:
+            return JSONResponse({"error": {"message": "image and prompt are required"}}, status_code=400)
+        await asyncio.sleep(settings.flux_latency())
+        if random.random() < settings.error_rate:
+            return JSONResponse({"error": {"code": "429", "message": "Rate limit (stub)"}}, status_code=429)
+        return {"created": 0, "data": [{"b64_json": flux_b64}]}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    return app
+
+
+def main(argv: List[str] = None):
+    """Main function to run the stub backends."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--gemini-latency", type=parse_latency, default="lognormal:20,0.3",
+                        help="Research (grounded search) call latency")
+    parser.add_argument("--composer-latency", type=parse_latency, default="lognormal:12,0.3",
+                        help="Structured-output (composer) call latency")
+    parser.add_argument("--flux-latency", type=parse_latency, default="lognormal:9,0.25",
+                        help="FLUX images/edits latency")
+    parser.add_argument("--num-sources", type=int, default=24, help="Grounding chunks per research response")
+    parser.add_argument("--flux-image-kb", type=int, default=1500, help="Size of the returned image")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls answered with 429")
+    parser.add_argument("--gemini-capacity", type=int, default=0,
+                        help="Concurrent Gemini calls served; more are answered with 429 (0: unlimited)")
+    parser.add_argument("--model-latency-scale", action="append", default=[], metavar="MODEL=FACTOR",
+                        help="Multiply the latency of calls to MODEL, e.g. gemini-2.5-flash=0.3 (repeatable)")
+    args = parser.parse_args(argv)
+
+    model_latency_scale = {}
+    for spec in args.model_latency_scale:
+        model, _, factor = spec.partition("=")
+        try:
+            model_latency_scale[model] = float(factor)
+        except ValueError:
+            parser.error(f"Invalid --model-latency-scale: {spec}")
+
+    settings = StubSettings(
+        gemini_latency=args.gemini_latency,
+        composer_latency=args.composer_latency,
+        flux_latency=args.flux_latency,
+        num_sources=args.num_sources,
+        flux_image_kb=args.flux_image_kb,
+        error_rate=args.error_rate,
+        gemini_capacity=args.gemini_capacity,
+        model_latency_scale=model_latency_scale,
+    )
+    logger.info(f"Stub backends listening on http://{args.host}:{args.port}")
+    uvicorn.run(create_stub_app(settings), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
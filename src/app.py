@@ -18,21 +18,68 @@ else:
     else:
         print("[STARTUP] WARNING: GOOGLE_API_KEY not found!")
 
+import asyncio
 import base64
 import io
+import time
 from contextlib import asynccontextmanager
 from typing import Optional
 
 import httpx
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse
+from google import genai
 from google.adk.cli.fast_api import get_fast_api_app
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from fastapi import Request
 
 AGENT_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# Azure OpenAI FLUX image edit endpoint; override to point at a local stub.
+AZURE_FLUX_EDIT_URL = os.getenv(
+    "AZURE_FLUX_EDIT_URL",
+    "https://ashle-m8gjmknf-eastus2.services.ai.azure.com/openai/deployments/FLUX.1-Kontext-pro/images/edits?api-version=2025-04-01-preview",
+)
+
+# Scraped product catalog (scripts/sephora_products_scraper.py output, .jsonl or .csv)
+PRODUCT_CATALOG_PATH = os.getenv("PRODUCT_CATALOG_PATH", "sephora_products.jsonl")
+# Where vectorized catalogs for trend matching are cached (unset: memory only)
+TREND_MATCHER_CACHE_DIR = os.getenv("TREND_MATCHER_CACHE_DIR")
+# Most trends one /products/match-trends request may match
+TREND_MATCH_MAX_TRENDS = int(os.getenv("TREND_MATCH_MAX_TRENDS", "200"))
+# SQLite file of trend items seen across reports, for stable trend ids (unset: memory only)
+TREND_IDENTITY_DB = os.getenv("TREND_IDENTITY_DB")
+# Responses smaller than this are not gzip-compressed
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", "6"))
+# Content-addressed store for transformed images, served from /images/{blob_id}
+IMAGE_BLOB_DIR = os.getenv("IMAGE_BLOB_DIR", "image_blobs")
+IMAGE_BLOB_MAX_MB = int(os.getenv("IMAGE_BLOB_MAX_MB", "512"))
+IMAGE_BLOB_MAX_AGE_HOURS = float(os.getenv("IMAGE_BLOB_MAX_AGE_HOURS", "168"))
+
+# ADK loads agents as top-level packages from AGENT_DIR; import them the same
+# way so the app shares module state (e.g. usage metrics) with the agent.
+if AGENT_DIR not in sys.path:
+    sys.path.insert(0, AGENT_DIR)
+
+from estee_lauder_trend_agent.agent import EsteeLauderTrendsReport, TrendItem
+from estee_lauder_trend_agent.blob_store import BlobStore
+from estee_lauder_trend_agent.catalog import load_catalog
+from estee_lauder_trend_agent.config import config
+from estee_lauder_trend_agent.gemini_client import gemini_client
+from estee_lauder_trend_agent.http_middleware import (
+    CompressionMiddleware,
+    ConditionalGetMiddleware,
+    etag_matches,
+)
+from estee_lauder_trend_agent.latency_profiles import LATENCY_PROFILES
+from estee_lauder_trend_agent.matching import get_trend_matcher
+from estee_lauder_trend_agent.run_scheduler import RunAdmissionMiddleware, run_scheduler
+from estee_lauder_trend_agent.trend_identity import TrendIdentityIndex
+from estee_lauder_trend_agent.usage import usage_metrics
+
 # Pydantic models
 class TrendInfo(BaseModel):
     name: str
@@ -44,22 +91,48 @@ class TrendInfo(BaseModel):
     target_demographic: Optional[str] = None
 
 
+class TrendMatchRequest(BaseModel):
+    report: Optional[EsteeLauderTrendsReport] = None
+    trends: list[TrendItem] = Field(default=[], max_length=TREND_MATCH_MAX_TRENDS)
+    top_k: int = 5
+
+
+class TrendIdentifyRequest(BaseModel):
+    report: Optional[EsteeLauderTrendsReport] = None
+    trends: list[TrendItem] = []
+    report_id: Optional[str] = None
+    record: bool = True
+
+
 class ImageTransformRequest(BaseModel):
     trend_info: TrendInfo
     image_data: str  # base64 encoded image
+    inline_image: bool = False  # also return the result as base64
 
 
 class ImageTransformResponse(BaseModel):
     success: bool
-    transformed_image: Optional[str] = None  # base64 encoded image
+    image_url: Optional[str] = None  # path of the stored result under /images
+    transformed_image: Optional[str] = None  # base64 encoded image, with inline_image
     error: Optional[str] = None
 
 
 @asynccontextmanager
-async def lifespan(_: FastAPI):
+async def lifespan(app: FastAPI):
     """Application lifespan manager - loads data on startup."""
     print("Application starting up...")
+    app.state.catalog = load_catalog(PRODUCT_CATALOG_PATH)
+    print(f"Product catalog: {len(app.state.catalog)} products from {PRODUCT_CATALOG_PATH}")
+    # Vectorize the catalog for trend matching now rather than on the first request.
+    app.state.trend_matcher = get_trend_matcher(app.state.catalog, TREND_MATCHER_CACHE_DIR)
+    app.state.trend_identity = TrendIdentityIndex(TREND_IDENTITY_DB)
+    app.state.image_blobs = BlobStore(
+        IMAGE_BLOB_DIR,
+        max_bytes=IMAGE_BLOB_MAX_MB << 20,
+        max_age=IMAGE_BLOB_MAX_AGE_HOURS * 3600,
+    )
     yield
+    app.state.trend_identity.close()
     print("Application shutting down...")
 
 
@@ -74,6 +147,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Server-Timing"],
+)
+# Reject agent runs with 503 before ADK starts a response once the run queue is full.
+app.add_middleware(RunAdmissionMiddleware)
+# ETags and 304s are computed on the uncompressed body, so compression goes outermost.
+app.add_middleware(ConditionalGetMiddleware)
+app.add_middleware(
+    CompressionMiddleware, minimum_size=COMPRESSION_MIN_BYTES, level=COMPRESSION_LEVEL
 )
 
 @app.get("/health")
@@ -81,12 +162,131 @@ async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/metrics/usage")
+async def usage_metrics_endpoint():
+    """Cumulative token usage per agent stage since the process started."""
+    return usage_metrics.snapshot()
+
+
+@app.get("/metrics/gemini")
+async def gemini_metrics_endpoint():
+    """Current adaptive concurrency limit, in-flight and queued Gemini calls."""
+    return gemini_client.snapshot()
+
+
+@app.get("/metrics/runs")
+async def run_metrics_endpoint():
+    """Running, queued and coalesced agent runs."""
+    return run_scheduler.snapshot()
+
+
+@app.get("/latency-profiles")
+async def latency_profiles_endpoint():
+    """Latency profiles a run can pick with ``stateDelta.latency_profile``."""
+    return {
+        "default": config.latency_profile,
+        "profiles": [profile.summary() for profile in LATENCY_PROFILES.values()],
+    }
+
+
+@app.get("/products/search")
+async def search_products(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, description="Keywords; the last word may be a prefix"),
+    limit: int = Query(20, ge=1, le=100),
+    prefix: bool = Query(True, description="Match the last word as a prefix"),
+):
+    """Search the scraped product catalog by name, brand, description and ingredients.
+
+    The body depends only on the query and the catalog, so repeat searches
+    revalidate with ``If-None-Match``; the search time is reported in the
+    ``Server-Timing`` header.
+    """
+    catalog = request.app.state.catalog
+    start = time.perf_counter()
+    results = catalog.search(q, limit=limit, prefix=prefix)
+    response.headers["Server-Timing"] = f"search;dur={(time.perf_counter() - start) * 1000:.3f}"
+    return {
+        "query": q,
+        "count": len(results),
+        "catalog_size": len(catalog),
+        "catalog_version": catalog.version,
+        "results": results,
+    }
+
+
+def report_trends(body) -> tuple[list[TrendItem], list[str]]:
+    """The trends of a request's ``trends`` list and ``report``, with their categories."""
+    trends = list(body.trends)
+    categories = ["other"] * len(trends)
+    if body.report:
+        for category, items in body.report.trends:
+            trends.extend(items)
+            categories.extend([category.removesuffix("_trends")] * len(items))
+    return trends, categories
+
+
+@app.post("/products/match-trends")
+async def match_trend_products(request: Request, body: TrendMatchRequest):
+    """Link each trend of a report (or a list of trends) to its best catalog products."""
+    trends, categories = report_trends(body)
+    if len(trends) > TREND_MATCH_MAX_TRENDS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"At most {TREND_MATCH_MAX_TRENDS} trends can be matched per request",
+        )
+    top_k = max(1, min(body.top_k, 50))
+    start = time.perf_counter()
+    # Scoring is CPU-bound; keep it off the event loop
+    matches = await asyncio.to_thread(request.app.state.trend_matcher.match, trends, k=top_k)
+    return {
+        "catalog_size": len(request.app.state.catalog),
+        "took_ms": round((time.perf_counter() - start) * 1000, 3),
+        "matches": [
+            {"trend": trend.name, "category": category, "products": products}
+            for trend, category, products in zip(trends, categories, matches)
+        ],
+    }
+
+
+@app.post("/trends/identify")
+async def identify_trends(request: Request, body: TrendIdentifyRequest):
+    """Give every trend of a report a stable trend id shared with its earlier variants.
+
+    With ``record`` (the default) the trends are stored, so later reports
+    naming the same trend differently get the same id.
+    """
+    trends, categories = report_trends(body)
+    identity = request.app.state.trend_identity
+    start = time.perf_counter()
+    if body.record:
+        results = identity.assign(trends, categories, report_id=body.report_id)
+    else:
+        results = [identity.lookup(trend) for trend in trends]
+    return {
+        "known_trends": identity.trend_count,
+        "took_ms": round((time.perf_counter() - start) * 1000, 3),
+        "trends": [
+            {"trend": trend.name, "category": category, **result}
+            for trend, category, result in zip(trends, categories, results)
+        ],
+    }
+
+
+@app.get("/trends/{trend_id}")
+async def get_trend_cluster(request: Request, trend_id: str):
+    """Every recorded variant of a trend, oldest first."""
+    cluster = request.app.state.trend_identity.cluster(trend_id)
+    if cluster is None:
+        raise HTTPException(status_code=404, detail=f"Unknown trend id: {trend_id}")
+    return cluster
+
+
 # Test endpoint to verify API key configuration
 @app.get("/test-api-key")
 async def test_api_key():
     """Test endpoint to verify Google API key is working."""
-    import google.genai
-
     api_key = os.getenv("GOOGLE_API_KEY")
     use_vertex = os.getenv("GOOGLE_GENAI_USE_VERTEXAI", "True").lower() == "true"
 
@@ -94,11 +294,13 @@ async def test_api_key():
         return {"error": "GOOGLE_API_KEY not set", "use_vertex_ai": use_vertex}
 
     try:
-        # Test the API key by making a simple request
-        client = google.genai.Client(api_key=api_key)
-        response = await client.aio.models.generate_content(
+        # Test the API key itself (never Vertex AI credentials), under the
+        # shared concurrency limit
+        client = genai.Client(api_key=api_key, vertexai=False)
+        response = await gemini_client.generate_content(
             model="gemini-2.5-flash",
-            contents="Say 'API key works!'"
+            contents="Say 'API key works!'",
+            client=client,
         )
         return {
             "success": True,
@@ -189,6 +391,25 @@ def create_beauty_prompt(trend_info: TrendInfo) -> str:
     return full_prompt
 
 
+@app.api_route("/images/{blob_id}", methods=["GET", "HEAD"])
+async def get_image(request: Request, blob_id: str):
+    """A stored transformed image; supports Range requests and If-None-Match.
+
+    Blob ids are content hashes, so the content under an id never changes
+    and clients may cache it indefinitely.
+    """
+    path = request.app.state.image_blobs.get_path(blob_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Unknown image: {blob_id}")
+    headers = {
+        "ETag": f'"{blob_id.split(".", 1)[0]}"',
+        "Cache-Control": "public, max-age=31536000, immutable",
+    }
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=BlobStore.media_type(blob_id), headers=headers)
+
+
 @app.post("/ai_transform_image", response_model=ImageTransformResponse)
 async def ai_transform_image(request: ImageTransformRequest):
     """Generate a beauty trend image using AI based on the selected trend."""
@@ -269,7 +490,7 @@ async def ai_transform_image(request: ImageTransformRequest):
             )
 
         # Prepare the request to Azure OpenAI
-        url = "https://ashle-m8gjmknf-eastus2.services.ai.azure.com/openai/deployments/FLUX.1-Kontext-pro/images/edits?api-version=2025-04-01-preview"
+        url = AZURE_FLUX_EDIT_URL
 
         headers = {"Authorization": f"Bearer {azure_api_key}"}
 
@@ -295,8 +516,15 @@ async def ai_transform_image(request: ImageTransformRequest):
             if "data" in result and len(result["data"]) > 0:
                 transformed_image_b64 = result["data"][0].get("b64_json")
                 if transformed_image_b64:
+                    # Store the image and return its URL rather than inlining
+                    # megabytes of base64 in the JSON response.
+                    blob_id = await asyncio.to_thread(
+                        app.state.image_blobs.put, base64.b64decode(transformed_image_b64)
+                    )
                     return ImageTransformResponse(
-                        success=True, transformed_image=transformed_image_b64
+                        success=True,
+                        image_url=f"/images/{blob_id}",
+                        transformed_image=transformed_image_b64 if request.inline_image else None,
                     )
                 else:
                     return ImageTransformResponse(
@@ -1,6 +1,6 @@
 import logging
 
-from google.adk.agents import LlmAgent, SequentialAgent
+from google.adk.agents import LlmAgent
 from google.adk.planners import BuiltInPlanner
 from google.adk.tools import google_search
 from google.genai import types as genai_types
@@ -11,8 +11,36 @@ from google.genai import types
 from .config import config
 from .callbacks import (
     collect_research_sources_callback,
+    discard_stream_renderer,
+    expand_report_citations_callback,
+    stream_research_citations_callback,
     # citation_replacement_callback,
 )
+from .cassette import (
+    discard_recording,
+    record_model_response_callback,
+    save_cassette_callback,
+)
+from .gemini_client import SharedGemini
+from .latency_profiles import latency_profile_callback
+from .run_scheduler import ScheduledSequentialAgent
+from .tracing import (
+    end_run_spans,
+    trace_after_agent,
+    trace_after_model,
+    trace_after_tool,
+    trace_before_agent,
+    trace_before_model,
+    trace_before_tool,
+    traced_after_agent,
+)
+from .usage import (
+    discard_streamed_searches,
+    enforce_budget_before_agent,
+    enforce_budget_before_model,
+    format_usage_report,
+    record_usage_callback,
+)
 
 logging.basicConfig(
     level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(name)s - %(message)s"
@@ -65,7 +93,7 @@ class EsteeLauderTrendsReport(BaseModel):
 
 
 trend_research_agent = LlmAgent(
-    model=config.critic_model,
+    model=SharedGemini(model=config.critic_model),
     name="estee_lauder_trend_research_agent",
     description="Identifies up-and-coming luxury beauty and style trends using Google Search with source attribution and timestamps.",
     planner=BuiltInPlanner(
@@ -111,16 +139,31 @@ trend_research_agent = LlmAgent(
     tools=[google_search],
     output_key="estee_lauder_trend_research_findings",
     generate_content_config=types.GenerateContentConfig(temperature=0.01),
-    after_agent_callback=collect_research_sources_callback,
+    before_agent_callback=[enforce_budget_before_agent, trace_before_agent],
+    after_agent_callback=traced_after_agent(collect_research_sources_callback),
+    before_model_callback=[
+        latency_profile_callback("research"),
+        enforce_budget_before_model,
+        trace_before_model,
+    ],
+    after_model_callback=[
+        trace_after_model,
+        record_usage_callback,
+        record_model_response_callback,
+        stream_research_citations_callback,
+    ],
+    before_tool_callback=trace_before_tool,
+    after_tool_callback=trace_after_tool,
 )
 
 output_composer_agent = LlmAgent(
-    model=config.critic_model,
+    model=SharedGemini(model=config.critic_model),
     name="output_composer_agent",
     description="Composes the output of the trend research agent into a pydantic model.",
     instruction="""
     You are an Estee Lauder research output composer agent. You are given the output of the trend research agent and you need to compose it into a pydantic model.
-    The output research from the trend research agent is in the {estee_lauder_trend_research_findings_with_citations} key. Make sure to use the citations in the output.
+    The output research from the trend research agent is in the {estee_lauder_trend_research_findings_for_composer} key. Make sure to use the citations in the output.
+    Citations are either markdown links or short markers like [src-3] that refer to the "Sources" table at the end of the research. Copy citations exactly as they appear, next to the claims they support.
     The output model is EsteeLauderTrendsReport.
     The output model has the following fields:
     - report_summary: str (A comprehensive summary of the overall beauty landscape based on the research)
@@ -144,12 +187,33 @@ output_composer_agent = LlmAgent(
     """,
     output_key="estee_lauder_trends_report",
     output_schema=EsteeLauderTrendsReport,
+    before_agent_callback=[enforce_budget_before_agent, trace_before_agent],
+    after_agent_callback=trace_after_agent,
+    before_model_callback=[
+        latency_profile_callback("composer"),
+        enforce_budget_before_model,
+        trace_before_model,
+    ],
+    after_model_callback=[
+        trace_after_model,
+        record_usage_callback,
+        record_model_response_callback,
+        expand_report_citations_callback,
+    ],
 )
 
-root_agent = SequentialAgent(
+root_agent = ScheduledSequentialAgent(
     name="estee_lauder_trend_agent",
     description="A sequential agent that uses the trend research agent to find luxury beauty trends and the output composer agent to compose the output into a pydantic model.",
     sub_agents=[trend_research_agent, output_composer_agent],
+    before_agent_callback=trace_before_agent,
+    after_agent_callback=[trace_after_agent, save_cassette_callback],
+    run_aborted_callbacks=[
+        end_run_spans,
+        discard_streamed_searches,
+        discard_recording,
+        discard_stream_renderer,
+    ],
 )
 
 if __name__ == "__main__":
@@ -218,6 +282,8 @@ if __name__ == "__main__":
                     )
                     print(citations)
 
+                    print(format_usage_report(final_session.state))
+
                 # if final_output:
                 #     print("\n" + "=" * 80)
                 #     print("FINAL SEPHORA TRENDS REPORT OUTPUT")
@@ -0,0 +1,140 @@
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Extension (as used in blob ids) and media type by file signature
+IMAGE_TYPES = (
+    (b"\x89PNG\r\n\x1a\n", "png", "image/png"),
+    (b"\xff\xd8\xff", "jpg", "image/jpeg"),
+    (b"RIFF", "webp", "image/webp"),
+)
+MEDIA_TYPES = {extension: media_type for _, extension, media_type in IMAGE_TYPES}
+MEDIA_TYPES["bin"] = "application/octet-stream"
+
+_BLOB_ID = re.compile(r"^[0-9a-f]{64}\.(?:png|jpg|webp|bin)$")
+
+
+def image_extension(data: bytes) -> str:
+    for signature, extension, _ in IMAGE_TYPES:
+        if data.startswith(signature):
+            return extension
+    return "bin"
+
+
+class BlobStore:
+    """Content-addressed files on local disk with size and age eviction.
+
+    A blob's id is the SHA-256 of its content plus an extension from its
+    file signature (``<sha256>.png``), so the same image stored twice is one
+    file and a blob never changes under its id: it can be cached forever
+    and its id doubles as its ETag. Files live in ``root/<id[:2]>/<id>`` and
+    are written to a temporary file first, so readers never see a partial
+    blob.
+
+    Blobs older than ``max_age`` seconds are not served and are deleted on
+    the next ``put``, which also deletes the oldest blobs while the store
+    holds more than ``max_bytes``. Storing an existing blob again makes it
+    new. Several stores (e.g. one per worker process) can share a root:
+    blobs another store wrote are served by their file's modification time.
+    """
+
+    def __init__(self, root: str, max_bytes: int = 512 << 20, max_age: float = 7 * 24 * 3600):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        # blob id -> (size, stored at), oldest first
+        self._blobs: OrderedDict[str, tuple[int, float]] = OrderedDict()
+        self._bytes = 0
+        os.makedirs(root, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        found = []
+        for shard in os.listdir(self.root):
+            shard_dir = os.path.join(self.root, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for name in os.listdir(shard_dir):
+                if _BLOB_ID.match(name):
+                    stat = os.stat(os.path.join(shard_dir, name))
+                    found.append((stat.st_mtime, name, stat.st_size))
+        for mtime, blob_id, size in sorted(found):
+            self._blobs[blob_id] = (size, mtime)
+            self._bytes += size
+        with self._lock:
+            self._evict(time.time())
+        if self._blobs:
+            logger.info(f"Blob store {self.root}: {len(self._blobs)} blobs, {self._bytes / 1e6:.1f} MB")
+
+    def __len__(self) -> int:
+        return len(self._blobs)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._bytes
+
+    def _path(self, blob_id: str) -> str:
+        return os.path.join(self.root, blob_id[:2], blob_id)
+
+    def put(self, data: bytes, extension: Optional[str] = None) -> str:
+        """Store ``data`` and return its blob id."""
+        blob_id = f"{hashlib.sha256(data).hexdigest()}.{extension or image_extension(data)}"
+        path = self._path(blob_id)
+        now = time.time()
+        with self._lock:
+            if blob_id in self._blobs and os.path.exists(path):
+                os.utime(path, (now, now))
+                self._bytes -= self._blobs.pop(blob_id)[0]
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            self._blobs[blob_id] = (len(data), now)
+            self._bytes += len(data)
+            self._evict(now)
+        return blob_id
+
+    def _evict(self, now: float):
+        while self._blobs:
+            blob_id, (size, stored_at) = next(iter(self._blobs.items()))
+            if self._bytes <= self.max_bytes and now - stored_at <= self.max_age:
+                break
+            del self._blobs[blob_id]
+            self._bytes -= size
+            try:
+                os.remove(self._path(blob_id))
+            except FileNotFoundError:
+                pass
+
+    def get_path(self, blob_id: str) -> Optional[str]:
+        """Path of a stored, unexpired blob, or None."""
+        if not _BLOB_ID.match(blob_id):
+            return None
+        with self._lock:
+            entry = self._blobs.get(blob_id)
+        path = self._path(blob_id)
+        if entry is None:
+            # Not stored through this instance: another store on the root may have written it
+            try:
+                stored_at = os.stat(path).st_mtime
+            except FileNotFoundError:
+                return None
+            return path if time.time() - stored_at <= self.max_age else None
+        if time.time() - entry[1] > self.max_age:
+            return None
+        return path if os.path.exists(path) else None
+
+    @staticmethod
+    def media_type(blob_id: str) -> str:
+        return MEDIA_TYPES[blob_id.rsplit(".", 1)[1]]
@@ -1,10 +1,18 @@
 import re
+import json
 import logging
 from difflib import SequenceMatcher
+from typing import Any, Optional
 
 from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmResponse
 from google.genai import types as genai_types
 
+from .config import config
+
+CITE_TAG_PATTERN = r'<cite\s+source\s*=\s*["\']?\s*(src-\d+)\s*["\']?\s*/>'
+CITATION_MARKER_PATTERN = r"\[(src-\d+)\]"
+
 
 def add_citations_to_report(report: str, sources: dict) -> str:
     """Add citation tags to the report based on supported claims from sources.
@@ -159,19 +167,315 @@ def collect_research_sources_callback(
         display_text = source_info.get("title", source_info.get("domain", short_id))
         return f" [{display_text}]({source_info['url']})"
 
-    processed_report = re.sub(
-        r'<cite\s+source\s*=\s*["\']?\s*(src-\d+)\s*["\']?\s*/>',
-        tag_replacer,
-        report_with_citations,
-    )
+    processed_report = re.sub(CITE_TAG_PATTERN, tag_replacer, report_with_citations)
     processed_report = re.sub(r"\s+([.,;:])", r"\1", processed_report)
     callback_context.state["estee_lauder_trend_research_findings_with_citations"] = (
         processed_report
     )
+    callback_context.state["estee_lauder_trend_research_findings_for_composer"] = (
+        compact_citations(report_with_citations, sources)
+        if config.compact_citations
+        else processed_report
+    )
 
     return genai_types.Content(parts=[genai_types.Part(text=processed_report)])
 
 
+def compact_citations(report_with_citations: str, sources: dict) -> str:
+    """Replace citation tags with short `[src-N]` markers and a source table.
+
+    Grounding redirect URLs are long, so expanding every citation into a
+    markdown link inflates the composer prompt. The compact form keeps one
+    line per cited source instead; `expand_report_citations_callback` turns
+    the markers back into links once the report has been generated.
+
+    Args:
+        report_with_citations: Report containing `<cite source="src-N"/>` tags
+        sources: Dictionary of sources keyed by short ID
+
+    Returns:
+        Report with `[src-N]` markers followed by a table of the cited sources
+    """
+    cited = []
+
+    def tag_replacer(match: re.Match) -> str:
+        short_id = match.group(1)
+        if short_id not in sources:
+            logging.warning(f"Invalid citation tag found and removed: {match.group(0)}")
+            return ""
+        if short_id not in cited:
+            cited.append(short_id)
+        return f" [{short_id}]"
+
+    compact_report = re.sub(CITE_TAG_PATTERN, tag_replacer, report_with_citations)
+    compact_report = re.sub(r"\s+([.,;:])", r"\1", compact_report)
+    if not cited:
+        return compact_report
+
+    source_lines = [
+        f"[{short_id}] {sources[short_id].get('title') or sources[short_id].get('domain')}"
+        for short_id in cited
+    ]
+    return compact_report + "\n\nSources:\n" + "\n".join(source_lines)
+
+
+def expand_citation_markers(text: str, sources: dict) -> str:
+    """Replace `[src-N]` markers in text with markdown links to the sources.
+
+    Args:
+        text: Text containing `[src-N]` markers
+        sources: Dictionary of sources keyed by short ID
+
+    Returns:
+        Text with markers replaced by `[title](url)` links
+    """
+
+    def marker_replacer(match: re.Match) -> str:
+        short_id = match.group(1)
+        if not (source_info := sources.get(short_id)):
+            logging.warning(f"Invalid citation marker found and removed: {match.group(0)}")
+            return ""
+        display_text = source_info.get("title", source_info.get("domain", short_id))
+        return f"[{display_text}]({source_info['url']})"
+
+    return re.sub(CITATION_MARKER_PATTERN, marker_replacer, text)
+
+
+def _expand_in_value(value: Any, sources: dict) -> Any:
+    if isinstance(value, str):
+        return expand_citation_markers(value, sources)
+    if isinstance(value, list):
+        return [_expand_in_value(item, sources) for item in value]
+    if isinstance(value, dict):
+        return {key: _expand_in_value(item, sources) for key, item in value.items()}
+    return value
+
+
+def expand_report_citations_callback(
+    callback_context: CallbackContext, llm_response: LlmResponse
+) -> Optional[LlmResponse]:
+    """Expands `[src-N]` markers in the composer's JSON report into links.
+
+    Runs on the final (non-partial) composer response before it is parsed
+    into `EsteeLauderTrendsReport`, so the stored report and the final event
+    both carry full markdown links. Does nothing unless compact citations
+    are enabled.
+
+    Args:
+        callback_context: The callback context of the composer agent.
+        llm_response: The model response containing the JSON report.
+
+    Returns:
+        The response with expanded citations, or None to keep it unchanged.
+    """
+    if not config.compact_citations or llm_response.partial:
+        return None
+    if not (llm_response.content and llm_response.content.parts):
+        return None
+    sources = callback_context.state.get("sources", {})
+    text = "".join(part.text or "" for part in llm_response.content.parts if not part.thought)
+    if not sources or not re.search(CITATION_MARKER_PATTERN, text):
+        return None
+
+    try:
+        report = json.loads(text)
+    except json.JSONDecodeError:
+        logging.warning("Composer output is not valid JSON; citations left compact")
+        return None
+
+    expanded = json.dumps(_expand_in_value(report, sources), ensure_ascii=False)
+    response = llm_response.model_copy(deep=True)
+    response.content.parts = [
+        part for part in response.content.parts if part.thought
+    ] + [genai_types.Part(text=expanded)]
+    return response
+
+
+class StreamingCitationRenderer:
+    """Inserts citation links into streamed model text as grounding arrives.
+
+    Text chunks and their grounding metadata are fed in as the model
+    streams them. Each grounding support is placed at the end of its
+    segment (by the segment's UTF-8 ``end_index``, or by finding its text)
+    as a ` [title](url)` link, and everything except the last ``tail_chars``
+    characters is released as soon as it arrives. Only that bounded tail is
+    held back, waiting for supports that may still cite it; supports for
+    text already released are counted in ``late_supports`` and left to the
+    full citation pass in `collect_research_sources_callback`.
+
+    Args:
+        tail_chars: Characters of not-yet-cited text to hold back.
+        max_pending: Supports for text that has not arrived yet to keep.
+    """
+
+    def __init__(self, tail_chars: int = 600, max_pending: int = 64):
+        self.tail_chars = tail_chars
+        self.max_pending = max_pending
+        self.late_supports = 0
+        self.cited = 0
+        self._buffer = ""
+        self._buffer_start_byte = 0
+        self._total_bytes = 0
+        self._links: dict[int, list[tuple[str, str]]] = {}
+        self._chunks: list = []
+        self._pending: list = []
+
+    def feed(
+        self, text: str, grounding_metadata: Optional[genai_types.GroundingMetadata] = None
+    ) -> str:
+        """Adds a streamed chunk; returns the markdown that can be released now."""
+        if text:
+            self._buffer += text
+            self._total_bytes += len(text.encode("utf-8"))
+        if grounding_metadata:
+            if grounding_metadata.grounding_chunks:
+                self._chunks = grounding_metadata.grounding_chunks
+            self._pending.extend(
+                (support, self._chunks) for support in grounding_metadata.grounding_supports or []
+            )
+        self._place_pending()
+        cut = len(self._buffer) - self.tail_chars
+        if cut <= 0:
+            return ""
+        # Release whole words only, so a link never lands mid-word.
+        boundary = max(self._buffer.rfind(" ", 0, cut), self._buffer.rfind("\n", 0, cut))
+        return self._release(boundary + 1) if boundary >= 0 else ""
+
+    def flush(self) -> str:
+        """Releases everything still held back, once the response is complete."""
+        self._place_pending()
+        self.late_supports += len(self._pending)
+        self._pending = []
+        return self._release(len(self._buffer))
+
+    def _place_pending(self):
+        still_pending = []
+        for support, chunks in self._pending:
+            position = self._segment_end(support.segment)
+            if position is None:
+                still_pending.append((support, chunks))
+            elif position < 0:
+                self.late_supports += 1
+            else:
+                self._add_links(position, support, chunks)
+        # Bound the supports waiting for text; the oldest are the least likely to fit.
+        self.late_supports += max(0, len(still_pending) - self.max_pending)
+        self._pending = still_pending[-self.max_pending :]
+
+    def _segment_end(self, segment: Optional[genai_types.Segment]) -> Optional[int]:
+        """Buffer position after ``segment``; -1 if already released, None if not arrived."""
+        if segment is None:
+            return -1
+        if segment.end_index is not None:
+            if segment.end_index > self._total_bytes:
+                return None
+            offset = segment.end_index - self._buffer_start_byte
+            if offset <= 0:
+                return -1
+            return len(self._buffer.encode("utf-8")[:offset].decode("utf-8", "ignore"))
+        position = self._buffer.find(segment.text or "") if segment.text else -1
+        return position + len(segment.text) if position >= 0 else None
+
+    def _add_links(self, position: int, support, chunks: list):
+        links = self._links.setdefault(position, [])
+        for chunk_index in support.grounding_chunk_indices or []:
+            if chunk_index >= len(chunks) or not chunks[chunk_index].web:
+                continue
+            web = chunks[chunk_index].web
+            link = (web.title or web.domain or web.uri, web.uri)
+            if link not in links:
+                links.append(link)
+                self.cited += 1
+
+    def _release(self, end: int) -> str:
+        pieces, start = [], 0
+        for position in sorted(p for p in self._links if p <= end):
+            pieces.append(self._buffer[start:position])
+            pieces.extend(f" [{title}]({url})" for title, url in self._links.pop(position))
+            start = position
+        pieces.append(self._buffer[start:end])
+        released = self._buffer[:end]
+        self._buffer = self._buffer[end:]
+        self._buffer_start_byte += len(released.encode("utf-8"))
+        self._links = {p - end: links for p, links in self._links.items()}
+        return "".join(pieces)
+
+
+# invocation_id -> renderer of the research model call currently streaming
+_renderers: dict[str, StreamingCitationRenderer] = {}
+
+
+def discard_stream_renderer(invocation_id: str, reason: str) -> None:
+    """Forgets the renderer of a research call whose run stopped mid-stream."""
+    _renderers.pop(invocation_id, None)
+    return None
+
+
+def stream_research_citations_callback(
+    callback_context: CallbackContext, llm_response: LlmResponse
+) -> Optional[LlmResponse]:
+    """Streams the research text with citation links already in place.
+
+    In SSE streaming runs every partial research chunk is passed through a
+    `StreamingCitationRenderer` and replaced by the markdown it releases;
+    the held-back tail is released with the final chunk (the one carrying a
+    finish reason) or, failing that, attached to the complete response as
+    ``custom_metadata["cited_markdown"]``. The complete response itself is
+    left uncited, since it becomes the agent's output that
+    `collect_research_sources_callback` cites in full. Non-streaming runs
+    are unaffected. Must be the last after-model callback of the agent,
+    because ADK skips the remaining ones once a callback returns a response.
+
+    Args:
+        callback_context: The callback context of the research agent.
+        llm_response: A streamed chunk or the complete model response.
+
+    Returns:
+        The chunk with cited markdown, or None to keep the response unchanged.
+    """
+    if not config.stream_citations:
+        return None
+    invocation_id = callback_context.invocation_id
+    text = "".join(
+        part.text or ""
+        for part in (llm_response.content.parts if llm_response.content else None) or []
+        if not part.thought
+    )
+    if llm_response.partial:
+        renderer = _renderers.get(invocation_id)
+        if renderer is None:
+            renderer = _renderers[invocation_id] = StreamingCitationRenderer(config.citation_tail_chars)
+        markdown = renderer.feed(text, llm_response.grounding_metadata)
+        if llm_response.finish_reason:
+            markdown += renderer.flush()
+            _log_stream_citations(_renderers.pop(invocation_id))
+        response = llm_response.model_copy(deep=True)
+        response.content.parts = [
+            part for part in response.content.parts if part.thought
+        ] + [genai_types.Part(text=markdown)]
+        response.custom_metadata = {**(response.custom_metadata or {}), "cited_markdown": markdown}
+        return response
+
+    renderer = _renderers.pop(invocation_id, None)
+    if renderer is None:
+        return None
+    renderer.feed("", llm_response.grounding_metadata)
+    markdown = renderer.flush()
+    _log_stream_citations(renderer)
+    if not markdown:
+        return None
+    response = llm_response.model_copy(deep=True)
+    response.custom_metadata = {**(response.custom_metadata or {}), "cited_markdown": markdown}
+    return response
+
+
+def _log_stream_citations(renderer: StreamingCitationRenderer):
+    logging.info(
+        f"Streamed research text with {renderer.cited} citation links "
+        f"({renderer.late_supports} supports arrived after their text was released)"
+    )
+
+
 # def citation_replacement_callback(
 #     callback_context: CallbackContext,
 # ) -> genai_types.Content:
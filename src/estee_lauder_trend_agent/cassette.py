@@ -0,0 +1,228 @@
+import contextlib
+import gzip
+import json
+import logging
+import os
+from typing import AsyncGenerator, Iterator, Optional
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from pydantic import Field, PrivateAttr
+
+from .config import config
+from .latency_profiles import profile_name
+
+CASSETTE_VERSION = 1
+
+# invocation_id -> recorded interactions, flushed when the root agent ends
+# and dropped when the run stops without finishing.
+_recordings: dict[str, list[dict]] = {}
+
+
+# =============================================================================
+# CASSETTE FILES
+# =============================================================================
+
+
+class Cassette:
+    """The model responses of one recorded ``root_agent`` run.
+
+    A cassette is a gzipped JSON document holding the user message, the
+    run's latency profile and, per agent, the ordered list of ``LlmResponse`` objects (including grounding
+    chunks and supports, usage metadata and any streamed partial chunks) that
+    the models returned during the run.
+    """
+
+    def __init__(
+        self,
+        user_message: str,
+        models: dict[str, str],
+        interactions: list[dict],
+        latency_profile: Optional[str] = None,
+    ):
+        self.user_message = user_message
+        self.models = models
+        self.interactions = interactions
+        self.latency_profile = latency_profile
+
+    def responses_for(self, agent_name: str) -> list[LlmResponse]:
+        return [
+            LlmResponse.model_validate(interaction["response"])
+            for interaction in self.interactions
+            if interaction["agent"] == agent_name
+        ]
+
+    def save(self, path: str) -> None:
+        document = {
+            "version": CASSETTE_VERSION,
+            "user_message": self.user_message,
+            "models": self.models,
+            "interactions": self.interactions,
+            "latency_profile": self.latency_profile,
+        }
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(document, f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            document = json.load(f)
+        if document.get("version") != CASSETTE_VERSION:
+            raise ValueError(
+                f"Unsupported cassette version {document.get('version')} in {path}"
+            )
+        return cls(
+            user_message=document["user_message"],
+            models=document["models"],
+            interactions=document["interactions"],
+            # Absent from cassettes recorded before latency profiles existed.
+            latency_profile=document.get("latency_profile"),
+        )
+
+
+# =============================================================================
+# RECORDING
+# =============================================================================
+
+
+def record_model_response_callback(
+    callback_context: CallbackContext, llm_response: LlmResponse
+) -> None:
+    """Buffers every model response of the run when recording is enabled.
+
+    Args:
+        callback_context: The callback context of the calling agent.
+        llm_response: The model response (partial or complete).
+    """
+    if not config.cassette_dir:
+        return None
+    _recordings.setdefault(callback_context.invocation_id, []).append(
+        {
+            "agent": callback_context.agent_name,
+            "model": callback_context._invocation_context.agent.canonical_model.model,
+            "response": llm_response.model_dump(
+                mode="json", exclude_none=True, by_alias=True
+            ),
+        }
+    )
+    return None
+
+
+def discard_recording(invocation_id: str, reason: str) -> None:
+    """Drops the buffered responses of a run that stopped without finishing.
+
+    A failed or cancelled run never reaches `save_cassette_callback`, and a
+    partial cassette could not be replayed anyway.
+    """
+    if _recordings.pop(invocation_id, None):
+        logging.info(f"Discarded the recording of run {invocation_id}: {reason}")
+    return None
+
+
+def save_cassette_callback(callback_context: CallbackContext) -> None:
+    """Writes the run's buffered responses to ``<cassette_dir>`` as a cassette.
+
+    Registered on the root agent, so it runs once all sub-agents are done.
+
+    Args:
+        callback_context: The callback context of the root agent.
+    """
+    interactions = _recordings.pop(callback_context.invocation_id, None)
+    if not config.cassette_dir or not interactions:
+        return None
+
+    user_content = callback_context.user_content
+    user_message = "".join(
+        part.text or "" for part in (user_content.parts if user_content else [])
+    )
+    models = {}
+    for interaction in interactions:
+        models[interaction["agent"]] = interaction.pop("model")
+
+    os.makedirs(config.cassette_dir, exist_ok=True)
+    path = os.path.join(
+        config.cassette_dir, f"{callback_context.invocation_id}.json.gz"
+    )
+    try:
+        Cassette(
+            user_message, models, interactions, profile_name(callback_context.state)
+        ).save(path)
+        logging.info(f"Recorded agent run to cassette {path}")
+    except OSError as e:
+        logging.error(f"Failed to write cassette {path}: {e}")
+    return None
+
+
+# =============================================================================
+# REPLAY
+# =============================================================================
+
+
+class CassetteLlm(BaseLlm):
+    """A model that replays recorded responses instead of calling Gemini.
+
+    Each call consumes the recorded responses up to and including the next
+    complete (non-partial) one. Partial chunks are only replayed for
+    streaming calls, matching what the real model would have produced.
+    """
+
+    responses: list[LlmResponse] = Field(default_factory=list)
+    _position: int = PrivateAttr(default=0)
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        while True:
+            if self._position >= len(self.responses):
+                raise ValueError(
+                    f"Cassette has no more recorded responses for model {self.model}"
+                )
+            response = self.responses[self._position]
+            self._position += 1
+            if response.partial:
+                if stream:
+                    yield response.model_copy(deep=True)
+                continue
+            yield response.model_copy(deep=True)
+            return
+
+
+def _llm_agents(agent: BaseAgent) -> Iterator[LlmAgent]:
+    if isinstance(agent, LlmAgent):
+        yield agent
+    for sub_agent in agent.sub_agents:
+        yield from _llm_agents(sub_agent)
+
+
+@contextlib.contextmanager
+def replay_cassette(agent: BaseAgent, cassette: Cassette):
+    """Temporarily swaps the models of ``agent``'s tree for cassette replays.
+
+    The real agents, callbacks and output processing run unchanged; only the
+    model calls are served from the cassette, so no network access is needed.
+
+    Args:
+        agent: The root of the agent tree, e.g. ``root_agent``.
+        cassette: The recorded run to replay.
+    """
+    originals: dict[str, object] = {}
+    try:
+        for llm_agent in _llm_agents(agent):
+            originals[llm_agent.name] = llm_agent.model
+            llm_agent.model = CassetteLlm(
+                model=cassette.models.get(llm_agent.name, config.critic_model),
+                responses=cassette.responses_for(llm_agent.name),
+            )
+        yield agent
+    finally:
+        for llm_agent in _llm_agents(agent):
+            if llm_agent.name in originals:
+                llm_agent.model = originals[llm_agent.name]
+
+
+def load_cassette(path: Optional[str]) -> Cassette:
+    """Loads a cassette file, failing with a clear error if it is missing."""
+    if not path or not os.path.exists(path):
+        raise FileNotFoundError(f"Cassette not found: {path}")
+    return Cassette.load(path)
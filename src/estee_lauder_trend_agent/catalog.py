@@ -0,0 +1,268 @@
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left
+from heapq import merge
+from typing import Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_NUMBER_RE = re.compile(r"\d[\d,]*(?:\.\d+)?")
+
+# Words too common in product copy to narrow a search.
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the this to "
+    "with your you after just".split()
+)
+
+# Title fields rank a product ahead of matches found only in the body fields.
+TITLE_FIELDS = ("name", "brand")
+BODY_FIELDS = ("description", "ingredients")
+NUMERIC_FIELDS = {"price": float, "rating": float, "review_count": int}
+
+
+def tokenize(text: Optional[str]) -> list[str]:
+    """Lowercase, accent-folded alphanumeric tokens without stopwords."""
+    if not text:
+        return []
+    folded = unicodedata.normalize("NFKD", text.lower()).encode("ascii", "ignore").decode()
+    return [token for token in _TOKEN_RE.findall(folded) if token not in STOPWORDS]
+
+
+def _to_number(value, kind):
+    """Typed value of a scraped field such as "$52.00" or "1,234"."""
+    if value in (None, ""):
+        return None
+    if isinstance(value, (int, float)):
+        return kind(value)
+    match = _NUMBER_RE.search(str(value))
+    return kind(float(match.group().replace(",", ""))) if match else None
+
+
+def _contains(postings: array, product_id: int) -> bool:
+    i = bisect_left(postings, product_id)
+    return i < len(postings) and postings[i] == product_id
+
+
+# =============================================================================
+# INVERTED INDEX
+# =============================================================================
+
+
+class _InvertedIndex:
+    """Token -> sorted array of product ids, plus a sorted vocabulary for prefixes."""
+
+    def __init__(self):
+        self.postings: dict[str, array] = {}
+        self.vocabulary: list[str] = []
+
+    def add(self, product_id: int, tokens: Iterable[str]):
+        # Ids are added in increasing order, so every postings list stays sorted.
+        for token in set(tokens):
+            postings = self.postings.get(token)
+            if postings is None:
+                postings = self.postings[token] = array("i")
+            postings.append(product_id)
+
+    def freeze(self):
+        self.vocabulary = sorted(self.postings)
+
+    def __len__(self) -> int:
+        return len(self.vocabulary)
+
+    def lookup(self, term: str) -> Optional[array]:
+        return self.postings.get(term)
+
+    def expand_prefix(self, prefix: str) -> list[array]:
+        start = bisect_left(self.vocabulary, prefix)
+        end = bisect_left(self.vocabulary, prefix + "\x7f", start)
+        return [self.postings[token] for token in self.vocabulary[start:end]]
+
+    def match(
+        self, terms: list[str], prefix: Optional[str], exclude: set[int], limit: int
+    ) -> list[int]:
+        """Ids containing every term (and a token starting with ``prefix``), lowest first.
+
+        Candidates come from the shortest postings list, or from a lazy merge
+        of the prefix expansions when those are shorter; other terms are
+        checked with binary search, and the scan stops after ``limit`` hits.
+        """
+        required = []
+        for term in terms:
+            postings = self.lookup(term)
+            if postings is None:
+                return []
+            required.append(postings)
+        expansions = self.expand_prefix(prefix) if prefix else []
+        if prefix and not expansions:
+            return []
+        if len(expansions) == 1:
+            required.append(expansions[0])
+            expansions = []
+        required.sort(key=len)
+
+        if expansions and (
+            not required or sum(len(p) for p in expansions) < len(required[0])
+        ):
+            candidates, checks = merge(*expansions), required
+        else:
+            candidates, checks = iter(required[0]), required[1:]
+            if expansions:
+                checks = checks + [None]
+
+        found, previous = [], -1
+        for product_id in candidates:
+            if product_id == previous or product_id in exclude:
+                continue
+            previous = product_id
+            for postings in checks:
+                if postings is None:
+                    if not any(_contains(e, product_id) for e in expansions):
+                        break
+                    continue
+                i = bisect_left(postings, product_id)
+                if i == len(postings) or postings[i] != product_id:
+                    break
+            else:
+                found.append(product_id)
+                if len(found) >= limit:
+                    break
+        return found
+
+
+# =============================================================================
+# CATALOG
+# =============================================================================
+
+
+class ProductCatalog:
+    """Read-only product catalog with keyword and prefix search.
+
+    Products are ordered by review count, so ids double as a popularity
+    rank: a search returns the most reviewed matches first, products
+    matching in their name or brand ahead of those matching only in the
+    description or ingredients.
+
+    ``version`` identifies the catalog contents, so derived structures
+    (e.g. the trend matcher) can be cached per catalog.
+    """
+
+    def __init__(self, products: list[dict], version: Optional[str] = None):
+        self.products = sorted(
+            products, key=lambda p: p.get("review_count") or 0, reverse=True
+        )
+        self._version = version
+        self._by_url: Optional[dict[str, int]] = None
+        # Prebuilt trend-matcher arrays shipped with a catalog store, if any
+        self.matcher_arrays: Optional[dict] = None
+        self._title = _InvertedIndex()
+        self._all = _InvertedIndex()
+        for product_id, product in enumerate(self.products):
+            title = [t for field in TITLE_FIELDS for t in tokenize(product.get(field))]
+            body = [t for field in BODY_FIELDS for t in tokenize(product.get(field))]
+            self._title.add(product_id, title)
+            self._all.add(product_id, title + body)
+        self._title.freeze()
+        self._all.freeze()
+
+    @classmethod
+    def load(cls, path: str) -> "ProductCatalog":
+        """Load the scraper's ``.jsonl`` or ``.csv`` output."""
+        with open(path, "rb") as f:
+            data = f.read()
+        text = data.decode("utf-8")
+        if path.endswith(".jsonl"):
+            rows = [json.loads(line) for line in text.splitlines() if line.strip()]
+        else:
+            rows = list(csv.DictReader(io.StringIO(text, newline="")))
+        for row in rows:
+            for field, kind in NUMERIC_FIELDS.items():
+                row[field] = _to_number(row.get(field), kind)
+        catalog = cls(rows, version=hashlib.sha1(data).hexdigest()[:16])
+        logger.info(
+            f"Loaded {len(catalog)} products from {path} "
+            f"({len(catalog._all)} indexed terms)"
+        )
+        return catalog
+
+    @classmethod
+    def from_index(
+        cls, products, title_index, all_index, version: str, matcher_arrays: Optional[dict] = None
+    ) -> "ProductCatalog":
+        """Wrap products already in rank order and their prebuilt indexes."""
+        catalog = cls.__new__(cls)
+        catalog.products = products
+        catalog._version = version
+        catalog._by_url = None
+        catalog.matcher_arrays = matcher_arrays
+        catalog._title = title_index
+        catalog._all = all_index
+        return catalog
+
+    @classmethod
+    def empty(cls) -> "ProductCatalog":
+        return cls([])
+
+    @property
+    def version(self) -> str:
+        """Content hash: of the source file when loaded, else of the products."""
+        if self._version is None:
+            digest = hashlib.sha1()
+            for product in self.products:
+                digest.update(json.dumps(product, sort_keys=True, default=str).encode("utf-8"))
+            self._version = digest.hexdigest()[:16]
+        return self._version
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self.products)
+
+    def get(self, url: str) -> Optional[dict]:
+        if self._by_url is None:
+            self._by_url = {p["url"]: i for i, p in enumerate(self.products) if p.get("url")}
+        product_id = self._by_url.get(url)
+        return self.products[product_id] if product_id is not None else None
+
+    def search(self, query: str, limit: int = 20, prefix: bool = True) -> list[dict]:
+        """Products matching every word of ``query``.
+
+        Args:
+            query: Free text; stopwords and punctuation are ignored.
+            limit: Maximum number of results.
+            prefix: Treat the last word as a prefix (search-as-you-type),
+                e.g. "lip" matches "lipstick". Otherwise all words must
+                match whole tokens.
+        """
+        terms = tokenize(query)
+        if not terms or limit <= 0:
+            return []
+        last = terms.pop() if prefix else None
+        found = self._title.match(terms, last, set(), limit)
+        if len(found) < limit:
+            found += self._all.match(terms, last, set(found), limit - len(found))
+        return [self.products[product_id] for product_id in found]
+
+
+def load_catalog(path: Optional[str]) -> ProductCatalog:
+    """Load the catalog at ``path``; an empty catalog if it is unset or missing.
+
+    A ``.catalog`` file built by ``scripts/build_catalog.py`` is memory-mapped
+    instead of parsed; see ``catalog_store``.
+    """
+    if not path or not os.path.exists(path):
+        logger.warning(f"Product catalog {path!r} not found; product search is empty")
+        return ProductCatalog.empty()
+    if path.endswith(".catalog"):
+        from .catalog_store import open_catalog_store
+
+        return open_catalog_store(path)
+    return ProductCatalog.load(path)
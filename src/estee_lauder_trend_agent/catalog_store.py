@@ -0,0 +1,255 @@
+import json
+import logging
+import mmap
+import os
+import time
+from bisect import bisect_left
+from typing import Iterator, Optional, Sequence
+
+import numpy as np
+
+from .catalog import NUMERIC_FIELDS, ProductCatalog, _InvertedIndex
+
+logger = logging.getLogger(__name__)
+
+# File layout (little-endian):
+#   MAGIC | uint64 header length | JSON header | sections, each 64-byte aligned
+# The header maps every section name to [offset, byte length, struct typecode].
+MAGIC = b"PRODCAT1"
+ALIGNMENT = 64
+
+# Columns in the scraper's output order
+FIELDS = (
+    "url",
+    "name",
+    "brand",
+    "price",
+    "rating",
+    "review_count",
+    "category",
+    "description",
+    "ingredients",
+    "size",
+    "availability",
+)
+STRING_FIELDS = tuple(f for f in FIELDS if f not in NUMERIC_FIELDS)
+MATCHER_ARRAYS = {"indptr": "q", "rows": "i", "values": "f", "idf": "f"}
+_NUMPY_TYPES = {"q": np.int64, "i": np.int32, "d": np.float64, "f": np.float32, "B": np.uint8}
+
+
+# =============================================================================
+# BUILD
+# =============================================================================
+
+
+def _string_sections(values: list[str]) -> tuple[np.ndarray, bytes]:
+    encoded = [(v or "").encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return offsets, b"".join(encoded)
+
+
+def _index_sections(index: _InvertedIndex, prefix: str) -> dict:
+    vocabulary = list(index.vocabulary)
+    offsets, arena = _string_sections(vocabulary)
+    lengths = [len(index.lookup(term)) for term in vocabulary]
+    postings_offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=postings_offsets[1:])
+    postings = np.concatenate(
+        [np.frombuffer(index.lookup(term), dtype=np.int32) for term in vocabulary]
+    ) if vocabulary else np.zeros(0, np.int32)
+    return {
+        f"{prefix}.vocab.offsets": offsets,
+        f"{prefix}.vocab.arena": arena,
+        f"{prefix}.postings.offsets": postings_offsets,
+        f"{prefix}.postings": postings,
+    }
+
+
+def write_catalog_store(catalog: ProductCatalog, path: str, matcher=None):
+    """Write ``catalog`` (and a built trend matcher) as one memory-mappable file.
+
+    Products keep the catalog's rank order; string fields become an offsets
+    array plus a UTF-8 arena, numeric fields plain arrays (NaN or -1 when
+    missing), and both inverted indexes a sorted vocabulary arena plus one
+    concatenated postings array.
+    """
+    sections: dict[str, object] = {}
+    products = list(catalog)
+    for field in STRING_FIELDS:
+        offsets, arena = _string_sections([p.get(field) for p in products])
+        sections[f"col.{field}.offsets"] = offsets
+        sections[f"col.{field}.arena"] = arena
+    for field, kind in NUMERIC_FIELDS.items():
+        if kind is int:
+            sections[f"col.{field}"] = np.array(
+                [-1 if p.get(field) is None else p[field] for p in products], dtype=np.int64
+            )
+        else:
+            sections[f"col.{field}"] = np.array(
+                [np.nan if p.get(field) is None else p[field] for p in products], dtype=np.float64
+            )
+    sections.update(_index_sections(catalog._title, "title"))
+    sections.update(_index_sections(catalog._all, "all"))
+    if matcher is not None:
+        for name, typecode in MATCHER_ARRAYS.items():
+            sections[f"matcher.{name}"] = np.ascontiguousarray(
+                getattr(matcher, name), dtype=_NUMPY_TYPES[typecode]
+            )
+
+    layout, blobs = {}, []
+    for name, value in sections.items():
+        if isinstance(value, bytes):
+            blobs.append((name, value, "B"))
+        else:
+            typecode = {v: k for k, v in _NUMPY_TYPES.items()}[value.dtype.type]
+            blobs.append((name, value.astype(value.dtype.newbyteorder("<")).tobytes(), typecode))
+    header = {
+        "version": catalog.version,
+        "count": len(products),
+        "sections": layout,
+    }
+    # Offsets depend on the header length, which depends on the offsets; the
+    # header is padded to a fixed size first so one pass is enough.
+    header_size = ALIGNMENT * ((len(json.dumps(header)) + 80 * len(blobs) + ALIGNMENT) // ALIGNMENT)
+    offset = len(MAGIC) + 8 + header_size
+    for name, data, typecode in blobs:
+        offset += -offset % ALIGNMENT
+        layout[name] = [offset, len(data), typecode]
+        offset += len(data)
+    header_bytes = json.dumps(header).encode("utf-8")
+    assert len(header_bytes) <= header_size, "catalog store header overflow"
+    header_bytes = header_bytes.ljust(header_size)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header_bytes).to_bytes(8, "little"))
+        f.write(header_bytes)
+        for name, data, _ in blobs:
+            f.write(b"\0" * (layout[name][0] - f.tell()))
+            f.write(data)
+    os.replace(tmp_path, path)
+
+
+# =============================================================================
+# MEMORY-MAPPED READERS
+# =============================================================================
+
+
+class _MappedStrings(Sequence):
+    """Read-only sequence of strings stored as offsets plus a UTF-8 arena."""
+
+    def __init__(self, offsets: memoryview, arena: memoryview):
+        self._offsets = offsets
+        self._arena = arena
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += len(self)
+        return str(self._arena[self._offsets[i] : self._offsets[i + 1]], "utf-8")
+
+
+class _MappedProducts(Sequence):
+    """Products decoded on access from the mapped columns."""
+
+    def __init__(self, columns: dict[str, Sequence], count: int):
+        self._columns = [(field, column, field in NUMERIC_FIELDS) for field, column in columns.items()]
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i: int) -> dict:
+        if not -self._count <= i < self._count:
+            raise IndexError(i)
+        product = {}
+        for field, column, numeric in self._columns:
+            value = column[i]
+            if numeric:
+                product[field] = None if value != value or value == -1 else value
+            else:
+                product[field] = value or None
+        return product
+
+    def __iter__(self) -> Iterator[dict]:
+        for i in range(self._count):
+            yield self[i]
+
+
+class _MappedIndex(_InvertedIndex):
+    """An inverted index whose vocabulary and postings live in the mapped file."""
+
+    def __init__(self, vocabulary: _MappedStrings, offsets: memoryview, postings: memoryview):
+        super().__init__()
+        self.vocabulary = vocabulary
+        self._offsets = offsets
+        self._postings = postings
+
+    def lookup(self, term: str) -> Optional[memoryview]:
+        i = bisect_left(self.vocabulary, term)
+        if i < len(self.vocabulary) and self.vocabulary[i] == term:
+            return self._postings[self._offsets[i] : self._offsets[i + 1]]
+        return None
+
+    def expand_prefix(self, prefix: str) -> list[memoryview]:
+        start = bisect_left(self.vocabulary, prefix)
+        end = bisect_left(self.vocabulary, prefix + "\x7f", start)
+        return [self._postings[self._offsets[i] : self._offsets[i + 1]] for i in range(start, end)]
+
+
+def open_catalog_store(path: str) -> ProductCatalog:
+    """Memory-map a catalog store read-only.
+
+    Nothing is parsed or copied: columns, indexes and matcher arrays are
+    views of the mapping, so every worker process opening the same file
+    shares its pages through the OS page cache.
+    """
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mapping[: len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a product catalog store")
+    header_size = int.from_bytes(mapping[len(MAGIC) : len(MAGIC) + 8], "little")
+    header = json.loads(mapping[len(MAGIC) + 8 : len(MAGIC) + 8 + header_size])
+    buffer = memoryview(mapping)
+
+    def view(name: str) -> memoryview:
+        offset, size, typecode = header["sections"][name]
+        return buffer[offset : offset + size].cast(typecode)
+
+    def array(name: str) -> np.ndarray:
+        offset, size, typecode = header["sections"][name]
+        dtype = _NUMPY_TYPES[typecode]
+        return np.frombuffer(mapping, dtype=dtype, count=size // np.dtype(dtype).itemsize, offset=offset)
+
+    products = _MappedProducts(
+        {
+            f: view(f"col.{f}") if f in NUMERIC_FIELDS
+            else _MappedStrings(view(f"col.{f}.offsets"), view(f"col.{f}.arena"))
+            for f in FIELDS
+        },
+        header["count"],
+    )
+    indexes = [
+        _MappedIndex(
+            _MappedStrings(view(f"{name}.vocab.offsets"), view(f"{name}.vocab.arena")),
+            view(f"{name}.postings.offsets"),
+            view(f"{name}.postings"),
+        )
+        for name in ("title", "all")
+    ]
+    matcher_arrays = None
+    if "matcher.indptr" in header["sections"]:
+        matcher_arrays = {name: array(f"matcher.{name}") for name in MATCHER_ARRAYS}
+    catalog = ProductCatalog.from_index(
+        products, indexes[0], indexes[1], header["version"], matcher_arrays
+    )
+    logger.info(
+        f"Mapped {len(catalog)} products from {path} "
+        f"({os.path.getsize(path) / 1e6:.1f} MB) in {(time.perf_counter() - start) * 1000:.1f} ms"
+    )
+    return catalog
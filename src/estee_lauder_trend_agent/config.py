@@ -56,20 +56,75 @@ class ResearchConfiguration:
     Attributes:
         critic_model (str): Model for evaluation tasks.
         worker_model (str): Model for working/generation tasks.
-        max_search_iterations (int): Maximum search iterations allowed.
+        max_search_iterations (int): Search budget of a run: the research
+            model is asked to stay within it and is not called again once it
+            is used up; the report is still composed from the findings
+            gathered. 0 disables the search budget.
+        run_token_budget (int): Maximum total tokens (input, output and
+            thinking) per run. 0 disables the token budget.
+        compact_citations (bool): Give the composer short `[src-N]` citation
+            markers and a source table instead of full markdown links; the
+            links are expanded into the report after generation.
+        stream_citations (bool): In streaming runs, replace the research
+            agent's partial text with markdown that already carries citation
+            links as grounding supports arrive.
+        citation_tail_chars (int): Characters of streamed research text held
+            back for citations that may still arrive.
         current_date (str): Current date in ISO format.
         use_vertex_ai (bool): Whether to use Vertex AI authentication.
         google_api_key (Optional[str]): Google API key for non-Vertex AI mode.
         project_id (str): Google Cloud project ID.
+        trace_export_path (Optional[str]): File that per-run spans are appended
+            to as OTLP/JSON lines. Tracing is disabled when unset.
+        trace_exporter (str): Span exporter, "file" or "otlp".
+        trace_sample_rate (float): Fraction of agent runs that are traced.
+        cassette_dir (Optional[str]): Directory that every run's model
+            responses are recorded to as replayable cassettes. Recording is
+            disabled when unset.
+        gemini_concurrency (int): Initial limit on concurrent Gemini calls
+            in this process; adapted at runtime (AIMD) between
+            gemini_min_concurrency and gemini_max_concurrency.
+        gemini_min_concurrency (int): Lowest adaptive concurrency limit.
+        gemini_max_concurrency (int): Highest adaptive concurrency limit.
+        gemini_latency_spike_factor (float): A call slower than this multiple
+            of the smoothed latency of similar calls lowers the limit like a
+            429 does. 0 disables latency spikes.
+        gemini_max_retries (int): Retries of a Gemini call answered with 429
+            or 503 before any output arrived.
+        max_concurrent_runs (int): Agent runs executing at once in this
+            process; further runs wait in a FIFO queue.
+        max_queued_runs (int): Agent runs waiting for a slot before new
+            runs are rejected with 503.
+        coalesce_runs (bool): Let concurrent runs of the same query in fresh
+            sessions share one execution.
+        latency_profile (str): Latency profile of runs that do not pick one
+            ("fast", "balanced" or "deep"); see latency_profiles.py.
     """
 
     critic_model: str = "gemini-2.5-pro"
     worker_model: str = "gemini-2.5-flash"
-    max_search_iterations: int = 5
+    max_search_iterations: int = int(os.getenv("MAX_SEARCH_ITERATIONS", "0"))
+    run_token_budget: int = int(os.getenv("RUN_TOKEN_BUDGET", "0"))
+    compact_citations: bool = os.getenv("COMPACT_CITATIONS", "False").lower() == "true"
+    stream_citations: bool = os.getenv("STREAM_CITATIONS", "True").lower() == "true"
+    citation_tail_chars: int = int(os.getenv("CITATION_TAIL_CHARS", "600"))
     current_date: str = datetime.now().strftime("%Y-%m-%d")
     use_vertex_ai: bool = USE_VERTEX_AI
     google_api_key: Optional[str] = GOOGLE_API_KEY
     project_id: str = str(project_id) if project_id else "unknown"
+    trace_export_path: Optional[str] = os.getenv("TRACE_EXPORT_PATH")
+    trace_exporter: str = os.getenv("TRACE_EXPORTER", "file").lower()
+    trace_sample_rate: float = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+    cassette_dir: Optional[str] = os.getenv("AGENT_CASSETTE_DIR")
+    gemini_concurrency: int = int(os.getenv("GEMINI_CONCURRENCY", "8"))
+    gemini_min_concurrency: int = int(os.getenv("GEMINI_MIN_CONCURRENCY", "1"))
+    gemini_max_concurrency: int = int(os.getenv("GEMINI_MAX_CONCURRENCY", "64"))
+    gemini_latency_spike_factor: float = float(os.getenv("GEMINI_LATENCY_SPIKE_FACTOR", "3.0"))
+    gemini_max_retries: int = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+    max_concurrent_runs: int = int(os.getenv("MAX_CONCURRENT_RUNS", "4"))
+    max_queued_runs: int = int(os.getenv("MAX_QUEUED_RUNS", "20"))
+    coalesce_runs: bool = os.getenv("COALESCE_RUNS", "True").lower() == "true"
+    latency_profile: str = os.getenv("LATENCY_PROFILE", "deep").lower()
 
     def __post_init__(self):
         """Validate configuration after initialization."""
@@ -77,6 +132,18 @@ class ResearchConfiguration:
             raise ValueError(
                 "Google API key is required when not using Vertex AI authentication"
             )
+        if not 0.0 <= self.trace_sample_rate <= 1.0:
+            raise ValueError("TRACE_SAMPLE_RATE must be between 0.0 and 1.0")
+        if not 1 <= self.gemini_min_concurrency <= self.gemini_max_concurrency:
+            raise ValueError(
+                "GEMINI_MIN_CONCURRENCY must be at least 1 and at most GEMINI_MAX_CONCURRENCY"
+            )
+        if not self.gemini_min_concurrency <= self.gemini_concurrency <= self.gemini_max_concurrency:
+            raise ValueError(
+                "GEMINI_CONCURRENCY must be between GEMINI_MIN_CONCURRENCY and GEMINI_MAX_CONCURRENCY"
+            )
+        if self.max_concurrent_runs < 1 or self.max_queued_runs < 0:
+            raise ValueError("MAX_CONCURRENT_RUNS must be at least 1 and MAX_QUEUED_RUNS at least 0")
 
 
 config = ResearchConfiguration()
@@ -97,8 +164,27 @@ def print_config_summary():
     print(f"🏢 Project ID: {config.project_id}")
     print(f"🤖 Critic Model: {config.critic_model}")
     print(f"⚙️  Worker Model: {config.worker_model}")
-    print(f"🔄 Max Search Iterations: {config.max_search_iterations}")
+    print(f"🔄 Max Search Iterations: {config.max_search_iterations or 'unlimited'}")
+    print(f"⏱️  Default Latency Profile: {config.latency_profile}")
+    print(f"🪙 Run Token Budget: {config.run_token_budget or 'unlimited'}")
+    print(f"🔗 Compact Citations: {config.compact_citations}")
+    print(
+        f"🚦 Gemini Concurrency: {config.gemini_concurrency} "
+        f"(adaptive {config.gemini_min_concurrency}-{config.gemini_max_concurrency})"
+    )
+    print(
+        f"🎟️  Agent Runs: {config.max_concurrent_runs} concurrent, "
+        f"{config.max_queued_runs} queued, coalescing {'on' if config.coalesce_runs else 'off'}"
+    )
     print(f"📅 Current Date: {config.current_date}")
+    if config.trace_export_path or config.trace_exporter == "otlp":
+        print(
+            f"🧭 Tracing: {config.trace_exporter} "
+            f"({config.trace_export_path or 'OTLP endpoint'}, "
+            f"sample rate {config.trace_sample_rate})"
+        )
+    if config.cassette_dir:
+        print(f"📼 Recording Cassettes To: {config.cassette_dir}")
     print("=" * 60 + "\n")
 
 
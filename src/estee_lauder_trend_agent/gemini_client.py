@@ -0,0 +1,282 @@
+import asyncio
+import contextlib
+import logging
+import random
+import time
+from collections import deque
+from functools import cached_property
+from typing import AsyncGenerator, AsyncIterator, Callable, Optional
+
+from google import genai
+from google.adk.models import Gemini, LlmRequest, LlmResponse
+from google.genai import errors as genai_errors
+
+from .config import config
+
+logger = logging.getLogger(__name__)
+
+# Gemini answers these when the project or model is overloaded
+OVERLOAD_STATUSES = (429, 503)
+
+
+# =============================================================================
+# ADAPTIVE CONCURRENCY LIMIT
+# =============================================================================
+
+
+class AimdLimiter:
+    """Concurrency limit adapted by additive increase, multiplicative decrease.
+
+    Every call that succeeds without a latency spike raises the limit by
+    ``1 / limit``, i.e. by one per limit's worth of calls. An overload
+    response, or a latency above ``latency_factor`` times the smoothed
+    latency of similar calls, multiplies it by ``backoff``. Only the first
+    overload among calls started under the same limit counts, so a burst
+    of 429s from calls already in flight halves the limit once rather than
+    collapsing it. Callers beyond the limit wait in FIFO order.
+
+    Args:
+        initial: Starting limit.
+        min_limit: The limit never drops below this.
+        max_limit: The limit never grows above this.
+        backoff: Factor applied to the limit on overload.
+        latency_factor: Latency spike threshold relative to the smoothed
+            latency of the same kind of call; 0 disables latency spikes.
+        warmup: Calls of a kind observed before their latency can spike.
+    """
+
+    def __init__(
+        self,
+        initial: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        backoff: float = 0.5,
+        latency_factor: float = 3.0,
+        warmup: int = 5,
+    ):
+        self.limit = float(max(min_limit, min(initial, max_limit)))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_factor = latency_factor
+        self.warmup = warmup
+        self.in_flight = 0
+        self.completed = 0
+        self.overloads = 0
+        self.latency_spikes = 0
+        self.decreases = 0
+        self._epoch = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        # Per kind of call: (smoothed latency, calls observed)
+        self._latency: dict[str, tuple[float, int]] = {}
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> int:
+        """Wait for a slot; returns the epoch to pass back to `release`."""
+        if not self._waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return self._epoch
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.cancelled():
+                self._waiters.remove(waiter)
+            else:
+                # Cancelled right after being handed a slot: give it back.
+                self.in_flight -= 1
+                self._wake()
+            raise
+        return self._epoch
+
+    def release(
+        self,
+        epoch: int,
+        latency: Optional[float] = None,
+        overloaded: bool = False,
+        kind: str = "",
+    ):
+        """Free a slot and adapt the limit.
+
+        Args:
+            epoch: What `acquire` returned for this call.
+            latency: Seconds the call took, for successful calls; None for
+                calls that failed or were abandoned (no adaptation).
+            overloaded: The call was answered with an overload status.
+            kind: Calls of the same kind share a latency baseline.
+        """
+        self.in_flight -= 1
+        if overloaded:
+            self.overloads += 1
+            self._decrease(epoch, "overload")
+        elif latency is not None:
+            self.completed += 1
+            if self._is_spike(kind, latency):
+                self.latency_spikes += 1
+                self._decrease(epoch, f"latency spike ({latency:.1f}s, {kind})")
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        self._wake()
+
+    def _is_spike(self, kind: str, latency: float) -> bool:
+        smoothed, count = self._latency.get(kind, (latency, 0))
+        spike = (
+            self.latency_factor > 0
+            and count >= self.warmup
+            and latency > self.latency_factor * smoothed
+        )
+        self._latency[kind] = (smoothed + 0.2 * (latency - smoothed), count + 1)
+        return spike
+
+    def _decrease(self, epoch: int, reason: str):
+        if epoch != self._epoch:
+            return
+        self._epoch += 1
+        self.decreases += 1
+        previous = self.limit
+        self.limit = max(float(self.min_limit), self.limit * self.backoff)
+        logger.warning(
+            f"Gemini concurrency limit {previous:.1f} -> {self.limit:.1f} after {reason}; "
+            f"{self.in_flight} in flight, {self.queued} queued"
+        )
+
+    def _wake(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "completed": self.completed,
+            "overloads": self.overloads,
+            "latency_spikes": self.latency_spikes,
+            "decreases": self.decreases,
+        }
+
+
+# =============================================================================
+# SHARED CLIENT
+# =============================================================================
+
+
+class GeminiClient:
+    """One google-genai client and concurrency limit for the whole process.
+
+    Calls go through `stream`, which holds a limiter slot for the whole call,
+    and retry overload responses (with jittered exponential backoff and a
+    fresh slot) as long as nothing has been yielded yet.
+
+    Args:
+        limiter: The concurrency limit shared by all calls.
+        max_retries: Retries of a call answered with an overload status.
+        retry_delay: Backoff before the first retry, in seconds.
+    """
+
+    def __init__(self, limiter: AimdLimiter, max_retries: int = 3, retry_delay: float = 1.0):
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.retries = 0
+
+    @cached_property
+    def client(self) -> genai.Client:
+        # Created on first use so the environment (API key or Vertex AI
+        # project, GOOGLE_GEMINI_BASE_URL) is settled by then.
+        return genai.Client()
+
+    async def stream(
+        self, call: Callable[[], AsyncIterator], kind: str = ""
+    ) -> AsyncGenerator:
+        """Yield from ``call()`` under the concurrency limit.
+
+        Latency is measured to the first item, which for streaming calls is
+        the time to first token.
+        """
+        for attempt in range(self.max_retries + 1):
+            epoch = await self.limiter.acquire()
+            start = time.perf_counter()
+            latency = None
+            completed = overloaded = False
+            try:
+                async with contextlib.aclosing(call()) as responses:
+                    async for response in responses:
+                        if latency is None:
+                            latency = time.perf_counter() - start
+                        yield response
+                completed = True
+                return
+            except genai_errors.APIError as e:
+                overloaded = e.code in OVERLOAD_STATUSES
+                if not overloaded or latency is not None or attempt == self.max_retries:
+                    raise
+            finally:
+                self.limiter.release(epoch, latency if completed else None, overloaded, kind)
+            self.retries += 1
+            delay = self.retry_delay * 2 ** attempt * random.uniform(0.5, 1.0)
+            logger.info(f"Gemini overloaded ({kind}); retry {attempt + 1} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def generate_content(
+        self, model: str, contents, config=None, client: Optional[genai.Client] = None
+    ):
+        """`client.aio.models.generate_content` under the concurrency limit.
+
+        ``client`` defaults to the shared client; pass another one to call
+        with different credentials while still sharing the limit.
+        """
+        client = client or self.client
+
+        async def call():
+            yield await client.aio.models.generate_content(
+                model=model, contents=contents, config=config
+            )
+
+        # Run the stream to its end so the call's latency feeds the limiter.
+        async for response in self.stream(call, kind=model):
+            result = response
+        return result
+
+    def snapshot(self) -> dict:
+        return {**self.limiter.snapshot(), "retries": self.retries}
+
+
+gemini_client = GeminiClient(
+    AimdLimiter(
+        initial=config.gemini_concurrency,
+        min_limit=config.gemini_min_concurrency,
+        max_limit=config.gemini_max_concurrency,
+        latency_factor=config.gemini_latency_spike_factor,
+    ),
+    max_retries=config.gemini_max_retries,
+)
+
+
+class SharedGemini(Gemini):
+    """ADK's Gemini model on the shared client and concurrency limit."""
+
+    @cached_property
+    def api_client(self) -> genai.Client:
+        return gemini_client.client
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        tools = "tools" if llm_request.config and llm_request.config.tools else "plain"
+        kind = f"{llm_request.model}/{'stream' if stream else 'unary'}/{tools}"
+        parent = super().generate_content_async
+        async with contextlib.aclosing(
+            gemini_client.stream(lambda: parent(llm_request, stream), kind)
+        ) as responses:
+            async for response in responses:
+                yield response
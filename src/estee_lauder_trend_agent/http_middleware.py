@@ -0,0 +1,246 @@
+import hashlib
+import logging
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# Media types worth compressing; images, archives and event streams are
+# sent as they are (already compressed, or must not be buffered).
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/x-ndjson",
+    "image/svg+xml",
+    "text/css",
+    "text/csv",
+    "text/html",
+    "text/javascript",
+    "text/markdown",
+    "text/plain",
+    "text/xml",
+)
+
+# Bodies at least this large (e.g. base64 images in JSON) are compressed at
+# the fastest level: the ratio barely improves with effort, the CPU cost does.
+LARGE_BODY_BYTES = 1 << 20
+
+
+def _media_type(headers: Headers) -> str:
+    return headers.get("content-type", "").split(";", 1)[0].strip().lower()
+
+
+def _is_compressible(media_type: str) -> bool:
+    return media_type in COMPRESSIBLE_TYPES or media_type.endswith("+json")
+
+
+def _accepts_gzip(scope: Scope) -> bool:
+    for coding in Headers(scope=scope).get("accept-encoding", "").lower().split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def _add_vary(headers: MutableHeaders, value: str):
+    vary = headers.get("vary")
+    if not vary:
+        headers["vary"] = value
+    elif value.lower() not in vary.lower():
+        headers["vary"] = f"{vary}, {value}"
+
+
+# =============================================================================
+# COMPRESSION
+# =============================================================================
+
+
+class CompressionMiddleware:
+    """Gzip-compresses text and JSON responses for clients that accept it.
+
+    A response is compressed when it is a full 200 response (never a range),
+    its media type is in ``COMPRESSIBLE_TYPES`` (or ``+json``), it is not
+    already encoded, and it is at least
+    ``minimum_size`` bytes; streamed bodies are compressed chunk by chunk.
+    Compressing changes the bytes, so a strong ``ETag`` is turned into the
+    equivalent weak one, which ``If-None-Match`` still matches.
+
+    Args:
+        app: The ASGI app to wrap.
+        minimum_size: Smaller bodies are sent uncompressed.
+        level: zlib level for ordinary bodies; bodies of
+            ``LARGE_BODY_BYTES`` and more use level 1.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, level: int = 6):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not _accepts_gzip(scope):
+            await self.app(scope, receive, send)
+            return
+        await _GzipResponder(self, send).run(scope, receive)
+
+
+class _GzipResponder:
+    """Per-request state of `CompressionMiddleware`."""
+
+    def __init__(self, middleware: CompressionMiddleware, send: Send):
+        self.middleware = middleware
+        self.send = send
+        self.start: Optional[Message] = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def run(self, scope: Scope, receive: Receive):
+        await self.middleware.app(scope, receive, self.on_send)
+
+    async def on_send(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.start is not None:
+            start, self.start = self.start, None
+            headers = MutableHeaders(raw=start["headers"])
+            # Only full 200 bodies: a 206 range refers to the identity encoding.
+            compressible = (
+                start["status"] == 200
+                and "content-range" not in headers
+                and _is_compressible(_media_type(headers))
+            )
+            if compressible:
+                _add_vary(headers, "Accept-Encoding")
+            if (
+                not compressible
+                or "content-encoding" in headers
+                or (not more_body and len(body) < self.middleware.minimum_size)
+            ):
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+            if not more_body:
+                level = 1 if len(body) >= LARGE_BODY_BYTES else self.middleware.level
+                compressed = _gzip(body, level)
+                if len(compressed) >= len(body):
+                    self.passthrough = True
+                    await self.send(start)
+                    await self.send(message)
+                    return
+                self._mark_encoded(headers)
+                headers["content-length"] = str(len(compressed))
+                await self.send(start)
+                await self.send({"type": "http.response.body", "body": compressed})
+                return
+            # Streamed body: compress as it goes, flushing after every chunk.
+            self.compressor = zlib.compressobj(self.middleware.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._mark_encoded(headers)
+            del headers["content-length"]
+            await self.send(start)
+
+        data = self.compressor.compress(body)
+        data += self.compressor.flush(zlib.Z_SYNC_FLUSH if more_body else zlib.Z_FINISH)
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    @staticmethod
+    def _mark_encoded(headers: MutableHeaders):
+        headers["content-encoding"] = "gzip"
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["etag"] = f"W/{etag}"
+
+
+def _gzip(body: bytes, level: int) -> bytes:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(body) + compressor.flush()
+
+
+# =============================================================================
+# CONDITIONAL GET
+# =============================================================================
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of ``etag`` with an ``If-None-Match`` header value."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+class ConditionalGetMiddleware:
+    """Adds strong ETags to GET responses and answers ``If-None-Match`` with 304.
+
+    Applies to successful GET responses of a compressible media type that
+    arrive as a single body and do not set their own ``ETag`` or
+    ``Cache-Control: no-store``. The ETag is a hash of the body, so it
+    changes exactly when the content does (a report's session state, a
+    catalog search, a trend cluster); responses without ``Cache-Control``
+    get ``no-cache`` so clients revalidate instead of refetching.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        start: Optional[Message] = None
+        passthrough = False
+
+        async def on_send(message: Message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            pending, start = start, None
+            headers = MutableHeaders(raw=pending["headers"])
+            if (
+                message.get("more_body", False)
+                or pending["status"] != 200
+                or "etag" in headers
+                or "no-store" in headers.get("cache-control", "")
+                or not _is_compressible(_media_type(headers))
+            ):
+                passthrough = True
+                await send(pending)
+                await send(message)
+                return
+
+            etag = '"' + hashlib.blake2b(message.get("body", b""), digest_size=16).hexdigest() + '"'
+            headers["etag"] = etag
+            if "cache-control" not in headers:
+                headers["cache-control"] = "no-cache"
+            if etag_matches(if_none_match, etag):
+                not_modified = MutableHeaders()
+                for name in ("etag", "cache-control", "vary"):
+                    if name in headers:
+                        not_modified[name] = headers[name]
+                # The full response would have been negotiated on Accept-Encoding.
+                _add_vary(not_modified, "Accept-Encoding")
+                await send({"type": "http.response.start", "status": 304, "headers": not_modified.raw})
+                await send({"type": "http.response.body", "body": b""})
+                return
+            await send(pending)
+            await send(message)
+
+        await self.app(scope, receive, on_send)
@@ -0,0 +1,147 @@
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types as genai_types
+
+from .config import config
+
+logger = logging.getLogger(__name__)
+
+# Session state key naming a run's profile. Clients pick one per request with
+# ``"stateDelta": {"latency_profile": "fast"}`` on /run and /run_sse.
+PROFILE_STATE_KEY = "latency_profile"
+
+
+@dataclass(frozen=True)
+class StageSettings:
+    """Model settings of one pipeline stage.
+
+    Attributes:
+        model: Gemini model the stage calls.
+        thinking_budget: Thinking tokens per call; 0 turns thinking off, -1
+            lets the model decide. None keeps the model's default.
+        temperature: Sampling temperature. None keeps the agent's.
+    """
+
+    model: str
+    thinking_budget: Optional[int] = None
+    temperature: Optional[float] = None
+
+
+@dataclass(frozen=True)
+class LatencyProfile:
+    """A named trade-off between research depth and run latency.
+
+    Attributes:
+        name: Name clients select the profile by.
+        description: One line for listings.
+        research: Settings of the search (research) stage.
+        composer: Settings of the structured output (composer) stage.
+        max_search_iterations: Search budget of a run under this profile,
+            enforced by the usage callbacks: the research request asks for at
+            most this many searches; a run exceeding it still composes its
+            report. None keeps MAX_SEARCH_ITERATIONS (0, unlimited, by default).
+    """
+
+    name: str
+    description: str
+    research: StageSettings
+    composer: StageSettings
+    max_search_iterations: Optional[int] = None
+
+    @property
+    def search_budget(self) -> int:
+        if self.max_search_iterations is None:
+            return config.max_search_iterations
+        return self.max_search_iterations
+
+    def summary(self) -> dict:
+        return {
+            "name": self.name,
+            "description": self.description,
+            "research": vars(self.research),
+            "composer": vars(self.composer),
+            "max_search_iterations": self.search_budget,
+        }
+
+
+# gemini-2.5-pro cannot turn thinking off (its minimum budget is 128), so
+# only the flash profiles set a budget of 0.
+LATENCY_PROFILES = {
+    profile.name: profile
+    for profile in (
+        LatencyProfile(
+            name="fast",
+            description="Flash without thinking and at most two searches, for interactive use.",
+            research=StageSettings(config.worker_model, thinking_budget=0, temperature=0.0),
+            composer=StageSettings(config.worker_model, thinking_budget=0, temperature=0.0),
+            max_search_iterations=2,
+        ),
+        LatencyProfile(
+            name="balanced",
+            description="Flash with a bounded thinking budget for research, no thinking to compose.",
+            research=StageSettings(config.worker_model, thinking_budget=2048, temperature=0.01),
+            composer=StageSettings(config.worker_model, thinking_budget=0, temperature=0.0),
+            max_search_iterations=4,
+        ),
+        LatencyProfile(
+            name="deep",
+            description="Pro with dynamic thinking for both stages (the original pipeline).",
+            research=StageSettings(config.critic_model, temperature=0.01),
+            composer=StageSettings(config.critic_model),
+        ),
+    )
+}
+
+if config.latency_profile not in LATENCY_PROFILES:
+    raise ValueError(
+        f"LATENCY_PROFILE must be one of {', '.join(LATENCY_PROFILES)}, "
+        f"not {config.latency_profile!r}"
+    )
+
+
+def profile_name(state) -> str:
+    """Name of the profile a session's runs use: its own choice or the default."""
+    name = state.get(PROFILE_STATE_KEY) or config.latency_profile
+    if not isinstance(name, str) or name not in LATENCY_PROFILES:
+        logger.warning(f"Unknown latency profile {name!r}; using {config.latency_profile!r}")
+        return config.latency_profile
+    return name
+
+
+def profile_for_state(state) -> LatencyProfile:
+    return LATENCY_PROFILES[profile_name(state)]
+
+
+def latency_profile_callback(stage: str):
+    """Returns a before-model callback applying the run's profile to ``stage``.
+
+    Register it first among an agent's before-model callbacks so tracing and
+    usage records see the model that is actually called.
+
+    Args:
+        stage: "research" or "composer".
+    """
+
+    def apply_latency_profile(
+        callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        settings: StageSettings = getattr(profile_for_state(callback_context.state), stage)
+        llm_request.model = settings.model
+        generate_config = llm_request.config
+        if settings.thinking_budget is not None:
+            # The planner's ThinkingConfig is shared by every request: copy it.
+            thinking = generate_config.thinking_config or genai_types.ThinkingConfig(
+                include_thoughts=False
+            )
+            generate_config.thinking_config = thinking.model_copy(
+                update={"thinking_budget": settings.thinking_budget}
+            )
+        if settings.temperature is not None:
+            generate_config.temperature = settings.temperature
+        return None
+
+    return apply_latency_profile
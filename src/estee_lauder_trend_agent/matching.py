@@ -0,0 +1,267 @@
+import logging
+import os
+import threading
+import time
+import zlib
+from typing import Any, Optional
+
+import numpy as np
+
+from .catalog import ProductCatalog, tokenize
+
+logger = logging.getLogger(__name__)
+
+# Hashed feature space for word unigrams and bigrams; collisions are rare
+# at this size for a product catalog's vocabulary.
+N_FEATURES = 1 << 20
+
+# How much each text field counts towards a product's or trend's vector.
+PRODUCT_FIELD_WEIGHTS = {
+    "name": 3.0,
+    "brand": 2.0,
+    "category": 1.0,
+    "description": 1.0,
+    "ingredients": 1.0,
+}
+TREND_FIELD_WEIGHTS = {
+    "name": 2.0,
+    "key_products": 2.0,
+    "techniques": 1.0,
+    "description": 1.0,
+}
+
+# A TrendItem, its model_dump() dict, or a free-text query
+TrendLike = Any
+
+
+# =============================================================================
+# FEATURES
+# =============================================================================
+
+
+class _FeatureHasher:
+    """Maps text to hashed unigram + bigram counts, memoizing token hashes."""
+
+    def __init__(self, n_features: int = N_FEATURES):
+        self.mask = n_features - 1
+        self._hashes: dict[str, int] = {}
+
+    def _hash(self, term: str) -> int:
+        feature = self._hashes.get(term)
+        if feature is None:
+            feature = self._hashes[term] = zlib.crc32(term.encode("utf-8")) & self.mask
+        return feature
+
+    def features(self, fields: list[tuple[str, float]]) -> dict[int, float]:
+        counts: dict[int, float] = {}
+        for text, weight in fields:
+            # Fold simple plurals so "peptides" matches "peptide".
+            tokens = [
+                t[:-1] if len(t) > 3 and t.endswith("s") and not t.endswith("ss") else t
+                for t in tokenize(text)
+            ]
+            terms = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            for term in terms:
+                feature = self._hash(term)
+                counts[feature] = counts.get(feature, 0.0) + weight
+        return counts
+
+
+def _trend_fields(trend: TrendLike) -> list[tuple[str, float]]:
+    """Weighted text fields of a TrendItem, a trend dict or a plain query string."""
+    if isinstance(trend, str):
+        return [(trend, 1.0)]
+    if not isinstance(trend, dict):
+        trend = trend.model_dump()
+    fields = []
+    for name, weight in TREND_FIELD_WEIGHTS.items():
+        value = trend.get(name)
+        values = value if isinstance(value, list) else [value]
+        fields.extend((str(v), weight) for v in values if v)
+    return fields
+
+
+# =============================================================================
+# MATCHER
+# =============================================================================
+
+
+class TrendProductMatcher:
+    """Scores trends against every catalog product with hashed TF-IDF vectors.
+
+    The catalog is vectorized once into a column-major sparse matrix
+    (feature -> products) with L2-normalized rows. Matching all trends of a
+    report is a single sparse matrix product done with NumPy: the catalog
+    columns of every (trend, feature) pair are gathered at once and summed
+    per (trend, product) with one ``bincount``, then ``argpartition`` picks
+    the top k products of every trend.
+    """
+
+    def __init__(
+        self,
+        catalog: ProductCatalog,
+        indptr: np.ndarray,
+        rows: np.ndarray,
+        values: np.ndarray,
+        idf: np.ndarray,
+    ):
+        self.catalog = catalog
+        self.indptr = indptr
+        self.rows = rows
+        self.values = values
+        self.idf = idf
+        self._hasher = _FeatureHasher(len(idf))
+
+    @classmethod
+    def build(cls, catalog: ProductCatalog, n_features: int = N_FEATURES) -> "TrendProductMatcher":
+        """Vectorize the catalog: sublinear TF, smoothed IDF, L2-normalized rows."""
+        start = time.perf_counter()
+        hasher = _FeatureHasher(n_features)
+        row_chunks, col_chunks, tf_chunks = [], [], []
+        for product_id, product in enumerate(catalog):
+            counts = hasher.features(
+                [(product.get(field), weight) for field, weight in PRODUCT_FIELD_WEIGHTS.items()]
+            )
+            row_chunks.append(np.full(len(counts), product_id, dtype=np.int32))
+            col_chunks.append(np.fromiter(counts.keys(), dtype=np.int32, count=len(counts)))
+            tf_chunks.append(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+        rows = np.concatenate(row_chunks) if row_chunks else np.zeros(0, np.int32)
+        cols = np.concatenate(col_chunks) if col_chunks else np.zeros(0, np.int32)
+        tf = np.concatenate(tf_chunks) if tf_chunks else np.zeros(0, np.float32)
+
+        df = np.bincount(cols, minlength=n_features)
+        idf = (np.log((1 + len(catalog)) / (1 + df)) + 1).astype(np.float32)
+        values = (1 + np.log(tf)) * idf[cols]
+        norms = np.sqrt(np.bincount(rows, weights=values * values, minlength=len(catalog)))
+        values = (values / np.maximum(norms[rows], 1e-12)).astype(np.float32)
+
+        order = np.argsort(cols, kind="stable")
+        indptr = np.zeros(n_features + 1, dtype=np.int64)
+        np.cumsum(df, out=indptr[1:])
+        matcher = cls(catalog, indptr, rows[order], values[order], idf)
+        logger.info(
+            f"Built trend matcher for {len(catalog)} products "
+            f"({len(values)} weights) in {time.perf_counter() - start:.1f}s"
+        )
+        return matcher
+
+    # -------------------------------------------------------------------------
+    # Caching
+    # -------------------------------------------------------------------------
+
+    def save(self, path: str):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, indptr=self.indptr, rows=self.rows, values=self.values, idf=self.idf)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, catalog: ProductCatalog, path: str) -> "TrendProductMatcher":
+        with np.load(path) as data:
+            return cls(catalog, data["indptr"], data["rows"], data["values"], data["idf"])
+
+    # -------------------------------------------------------------------------
+    # Scoring
+    # -------------------------------------------------------------------------
+
+    def _query_matrix(self, trends: list[TrendLike]):
+        """COO (trend, feature, weight) triples of the L2-normalized trend vectors."""
+        trend_ids, features, weights = [], [], []
+        for trend_id, trend in enumerate(trends):
+            counts = self._hasher.features(_trend_fields(trend))
+            if not counts:
+                continue
+            cols = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+            tf = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+            w = (1 + np.log(tf)) * self.idf[cols]
+            trend_ids.append(np.full(len(cols), trend_id, dtype=np.int64))
+            features.append(cols)
+            weights.append(w / max(float(np.sqrt((w * w).sum())), 1e-12))
+        if not features:
+            empty = np.zeros(0, np.int64)
+            return empty, empty, np.zeros(0, np.float32)
+        return np.concatenate(trend_ids), np.concatenate(features), np.concatenate(weights)
+
+    def scores(self, trends: list[TrendLike]) -> np.ndarray:
+        """Cosine similarity of every trend to every product, shape (trends, products)."""
+        n_products = len(self.catalog)
+        trend_ids, features, weights = self._query_matrix(trends)
+        starts, ends = self.indptr[features], self.indptr[features + 1]
+        lengths = ends - starts
+        total = int(lengths.sum())
+        if total == 0 or n_products == 0:
+            return np.zeros((len(trends), n_products), dtype=np.float32)
+        # Positions of every catalog entry in the gathered columns, in one go.
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+        pair = np.repeat(np.arange(len(features)), lengths)
+        keys = trend_ids[pair] * n_products + self.rows[offsets]
+        flat = np.bincount(
+            keys, weights=weights[pair] * self.values[offsets], minlength=len(trends) * n_products
+        )
+        return flat.reshape(len(trends), n_products).astype(np.float32)
+
+    def top_k(self, trends: list[TrendLike], k: int = 5) -> list[list[tuple[int, float]]]:
+        """``(product_id, score)`` of the best ``k`` products per trend, best first."""
+        if not trends:
+            return []
+        scores = self.scores(trends)
+        k = min(k, scores.shape[1])
+        if k <= 0:
+            return [[] for _ in trends]
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        return [
+            [(int(p), float(s)) for p, s in zip(ids, row_scores) if s > 0]
+            for ids, row_scores in zip(top, top_scores)
+        ]
+
+    def match(self, trends: list[TrendLike], k: int = 5) -> list[list[dict]]:
+        """The best ``k`` catalog products per trend, each with a ``match_score``."""
+        return [
+            [
+                {**self.catalog.products[product_id], "match_score": round(score, 4)}
+                for product_id, score in matches
+            ]
+            for matches in self.top_k(trends, k)
+        ]
+
+
+# =============================================================================
+# PER-CATALOG CACHE
+# =============================================================================
+
+_matchers: dict[str, TrendProductMatcher] = {}
+_matchers_lock = threading.Lock()
+
+
+def get_trend_matcher(
+    catalog: ProductCatalog, cache_dir: Optional[str] = None
+) -> TrendProductMatcher:
+    """The matcher for ``catalog``, built once per catalog version.
+
+    Matchers are kept in memory per version and, with ``cache_dir``, saved as
+    ``trend_matcher-<version>.npz`` so a restart with the same catalog file
+    skips vectorization. A catalog store built with its matcher needs neither.
+    """
+    version = catalog.version
+    with _matchers_lock:
+        matcher = _matchers.get(version)
+        if matcher is not None:
+            return matcher
+        path = os.path.join(cache_dir, f"trend_matcher-{version}.npz") if cache_dir else None
+        if catalog.matcher_arrays is not None:
+            # Prebuilt into a catalog store: use the mapped arrays as they are.
+            matcher = TrendProductMatcher(catalog, **catalog.matcher_arrays)
+        elif path and os.path.exists(path):
+            matcher = TrendProductMatcher.load(catalog, path)
+            logger.info(f"Loaded trend matcher for catalog {version} from {path}")
+        else:
+            matcher = TrendProductMatcher.build(catalog)
+            if path:
+                os.makedirs(cache_dir, exist_ok=True)
+                matcher.save(path)
+        _matchers.clear()
+        _matchers[version] = matcher
+        return matcher
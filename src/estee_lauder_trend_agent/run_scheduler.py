@@ -0,0 +1,466 @@
+import asyncio
+import contextlib
+import contextvars
+import hashlib
+import json
+import logging
+import math
+import time
+from collections import deque
+from typing import AsyncGenerator, Callable, Optional
+
+from google.adk.agents import SequentialAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.agents.run_config import StreamingMode
+from google.adk.events import Event, EventActions
+from pydantic import Field
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import config
+from .latency_profiles import LATENCY_PROFILES, PROFILE_STATE_KEY, profile_name
+
+logger = logging.getLogger(__name__)
+
+# Set by RunAdmissionMiddleware for /run_sse requests: only streamed runs
+# report their queue position (partial events would clutter /run's list).
+_queue_updates = contextvars.ContextVar("queue_updates", default=False)
+# Set by RunAdmissionMiddleware to the latency profile in a request's
+# stateDelta: ADK's /run endpoint does not apply stateDelta itself.
+_requested_profile = contextvars.ContextVar("requested_profile", default=None)
+
+
+class RunRejected(Exception):
+    """The run queue is full."""
+
+
+def run_key(text: str, profile: str) -> str:
+    """Runs of the same (whitespace- and case-normalized) query and latency profile share a key."""
+    normalized = f"{profile}\n{' '.join(text.split()).casefold()}"
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+# =============================================================================
+# RUN SCHEDULER
+# =============================================================================
+
+
+class _Ticket:
+    """A queued run: `admitted` once it holds a slot, `moved` on every queue change."""
+
+    def __init__(self):
+        self.admitted = False
+        self.moved = asyncio.Event()
+
+
+class _SharedRun:
+    """Events of a run in progress, replayed to coalesced identical runs."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.events: list[Event] = []
+        self.followers = 0
+        self.done = False
+        self.error: Optional[str] = None
+        # The leading run stopped early because its client went away
+        self.abandoned = False
+        self._changed = asyncio.Event()
+
+    def publish(self, event: Event):
+        self.events.append(event)
+        self._notify()
+
+    def finish(self, error: Optional[str] = None, abandoned: bool = False):
+        self.done = True
+        self.error = error
+        self.abandoned = abandoned
+        self._notify()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def follow(self) -> AsyncGenerator[Event, None]:
+        """Every event published so far, then new ones until the run ends."""
+        position = 0
+        while True:
+            while position < len(self.events):
+                position += 1
+                yield self.events[position - 1]
+            if self.done:
+                return
+            await self._changed.wait()
+
+
+class RunScheduler:
+    """Admission control for agent runs: a slot limit, a FIFO queue, coalescing.
+
+    At most ``max_running`` runs execute at once; up to ``max_queued`` more
+    wait in arrival order, and further runs are rejected. A run whose query
+    matches one already queued or running (in a fresh session) does not
+    take a place at all: it follows that run and receives copies of its
+    events.
+
+    Args:
+        max_running: Runs executing at once.
+        max_queued: Runs waiting for a slot before new ones are rejected.
+        coalesce: Let identical concurrent runs share one execution.
+    """
+
+    def __init__(self, max_running: int = 4, max_queued: int = 20, coalesce: bool = True):
+        self.max_running = max_running
+        self.max_queued = max_queued
+        self.coalesce = coalesce
+        self.running = 0
+        self.started = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self._queue: deque[_Ticket] = deque()
+        self._shared: dict[str, _SharedRun] = {}
+        # Smoothed run duration, for Retry-After
+        self._run_seconds = 60.0
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    def admits(self, key: Optional[str] = None) -> bool:
+        """Whether a new run (of query ``key``) would be started, queued or coalesced."""
+        return (
+            (self.coalesce and key in self._shared)
+            or self.running < self.max_running
+            or len(self._queue) < self.max_queued
+        )
+
+    def retry_after(self) -> int:
+        """Seconds until a queue place is likely to free up."""
+        return max(1, math.ceil(self._run_seconds / self.max_running))
+
+    def shared_run(self, key: Optional[str]) -> Optional[_SharedRun]:
+        return self._shared.get(key) if self.coalesce and key else None
+
+    def start_shared(self, key: Optional[str]) -> Optional[_SharedRun]:
+        if not self.coalesce or not key:
+            return None
+        shared = self._shared[key] = _SharedRun(key)
+        return shared
+
+    def end_shared(
+        self, shared: Optional[_SharedRun], error: Optional[str] = None, abandoned: bool = False
+    ):
+        if shared is None:
+            return
+        if self._shared.get(shared.key) is shared:
+            del self._shared[shared.key]
+        shared.finish(error, abandoned)
+
+    async def turns(self) -> AsyncGenerator[int, None]:
+        """Queue positions (1 = next) until a slot is free.
+
+        When the generator finishes, the caller holds a slot and must
+        `release` it. Raises `RunRejected` when the queue is full.
+        """
+        if not self._queue and self.running < self.max_running:
+            self.running += 1
+            return
+        if len(self._queue) >= self.max_queued:
+            self.rejected += 1
+            raise RunRejected(
+                f"{self.running} agent runs in progress and {len(self._queue)} queued; "
+                f"retry in {self.retry_after()}s"
+            )
+        ticket = _Ticket()
+        self._queue.append(ticket)
+        try:
+            reported = None
+            while not ticket.admitted:
+                position = self._queue.index(ticket) + 1
+                if position != reported:
+                    reported = position
+                    yield position
+                    continue
+                ticket.moved.clear()
+                await ticket.moved.wait()
+        except BaseException:
+            # Cancelled or closed while queued
+            if ticket.admitted:
+                self.release()
+            else:
+                self._queue.remove(ticket)
+                self._notify_queue()
+            raise
+
+    def release(self, run_seconds: Optional[float] = None):
+        """Free a slot, handing it to the first queued run."""
+        if run_seconds is not None:
+            self._run_seconds += 0.2 * (run_seconds - self._run_seconds)
+        self.running -= 1
+        if self._queue and self.running < self.max_running:
+            ticket = self._queue.popleft()
+            self.running += 1
+            ticket.admitted = True
+            ticket.moved.set()
+            self._notify_queue()
+
+    def _notify_queue(self):
+        for ticket in self._queue:
+            ticket.moved.set()
+
+    def snapshot(self) -> dict:
+        return {
+            "running": self.running,
+            "queued": len(self._queue),
+            "max_running": self.max_running,
+            "max_queued": self.max_queued,
+            "shared_runs": len(self._shared),
+            "followers": sum(shared.followers for shared in self._shared.values()),
+            "started": self.started,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "avg_run_seconds": round(self._run_seconds, 1),
+        }
+
+
+run_scheduler = RunScheduler(
+    max_running=config.max_concurrent_runs,
+    max_queued=config.max_queued_runs,
+    coalesce=config.coalesce_runs,
+)
+
+
+# =============================================================================
+# SCHEDULED ROOT AGENT
+# =============================================================================
+
+
+def _user_text(ctx: InvocationContext) -> str:
+    parts = ctx.user_content.parts if ctx.user_content else None
+    return "".join(part.text or "" for part in parts or [])
+
+
+class ScheduledSequentialAgent(SequentialAgent):
+    """A `SequentialAgent` whose runs go through `run_scheduler`.
+
+    Runs wait for a slot in FIFO order; streamed runs report their queue
+    position as partial events with ``customMetadata.run_queue``. A run in
+    a fresh session whose query matches a queued or running one replays
+    that run's events into its own session instead of executing: partial
+    events as they come, the others (which the session stores) once the
+    run has finished. If that run is abandoned (its client went away), the
+    follower drops what it held back and runs itself.
+    Runs of different latency profiles never share an execution.
+    """
+
+    run_aborted_callbacks: list[Callable[[str, str], None]] = Field(default_factory=list)
+    """Called with the invocation id and a reason when a run ends without
+    finishing (an error, a cancellation or a lost client), to drop per-run
+    state that the after-agent callbacks would otherwise have cleaned up."""
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        try:
+            async with contextlib.aclosing(self._run_scheduled(ctx)) as events:
+                async for event in events:
+                    yield event
+        except BaseException as e:
+            if isinstance(e, (asyncio.CancelledError, GeneratorExit)):
+                reason = "run was cancelled"
+            else:
+                reason = f"run failed: {type(e).__name__}: {e}"
+            for callback in self.run_aborted_callbacks:
+                try:
+                    callback(ctx.invocation_id, reason)
+                except Exception:
+                    logger.exception(f"Run-aborted callback {callback.__name__} failed")
+            raise
+
+    async def _run_scheduled(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        requested = _requested_profile.get()
+        if requested and ctx.session.state.get(PROFILE_STATE_KEY) != requested:
+            yield Event(
+                author=self.name,
+                invocation_id=ctx.invocation_id,
+                branch=ctx.branch,
+                actions=EventActions(state_delta={PROFILE_STATE_KEY: requested}),
+            )
+        fresh = all(event.invocation_id == ctx.invocation_id for event in ctx.session.events)
+        key = run_key(_user_text(ctx), profile_name(ctx.session.state)) if fresh else None
+        while shared := run_scheduler.shared_run(key):
+            async for event in self._follow(ctx, shared):
+                yield event
+            if shared.error:
+                raise RuntimeError(f"Coalesced agent run failed: {shared.error}")
+            if not shared.abandoned:
+                return
+            # The followed run was abandoned: take over, or follow whoever did.
+        async for event in self._lead(ctx, key):
+            yield event
+
+    async def _follow(self, ctx: InvocationContext, shared: _SharedRun) -> AsyncGenerator[Event, None]:
+        run_scheduler.coalesced += 1
+        shared.followers += 1
+        logger.info(f"Run {ctx.invocation_id} follows an identical run ({shared.followers} followers)")
+        held: list[Event] = []
+        try:
+            async for event in shared.follow():
+                if not _wanted(ctx, event):
+                    continue
+                event = event.model_copy(
+                    update={"id": Event.new_id(), "invocation_id": ctx.invocation_id}, deep=True
+                )
+                if event.partial:
+                    yield event
+                else:
+                    # Kept back until the run completes, so an abandoned run
+                    # leaves nothing in this session before the takeover.
+                    held.append(event)
+        finally:
+            shared.followers -= 1
+        if not shared.error and not shared.abandoned:
+            for event in held:
+                yield event
+
+    async def _lead(self, ctx: InvocationContext, key: Optional[str]) -> AsyncGenerator[Event, None]:
+        shared = run_scheduler.start_shared(key)
+        admitted = False
+        abandoned = True
+        error = None
+        try:
+            async with contextlib.aclosing(run_scheduler.turns()) as turns:
+                async for position in turns:
+                    event = self._queue_event(ctx, position)
+                    if shared:
+                        shared.publish(event)
+                    if _queue_updates.get():
+                        yield event
+            admitted = True
+            run_scheduler.started += 1
+            start = time.monotonic()
+            event = self._queue_event(ctx, 0)
+            if shared:
+                shared.publish(event)
+            if _queue_updates.get():
+                yield event
+            async for event in super()._run_async_impl(ctx):
+                if shared:
+                    shared.publish(event)
+                yield event
+            abandoned = False
+        except Exception as e:
+            abandoned = False
+            error = str(e)
+            raise
+        finally:
+            if admitted:
+                run_scheduler.release(None if abandoned or error else time.monotonic() - start)
+            run_scheduler.end_shared(shared, error, abandoned)
+
+    def _queue_event(self, ctx: InvocationContext, position: int) -> Event:
+        return Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            partial=True,
+            custom_metadata={
+                "run_queue": {
+                    "position": position,
+                    "queued": run_scheduler.queued,
+                    "running": run_scheduler.running,
+                }
+            },
+        )
+
+
+def _wanted(ctx: InvocationContext, event: Event) -> bool:
+    """Whether a follower passes on an event of the run it follows."""
+    if not event.partial:
+        return True
+    if event.custom_metadata and "run_queue" in event.custom_metadata:
+        return _queue_updates.get()
+    return ctx.run_config is not None and ctx.run_config.streaming_mode == StreamingMode.SSE
+
+
+# =============================================================================
+# HTTP ADMISSION
+# =============================================================================
+
+
+class RunAdmissionMiddleware:
+    """Answers ``POST /run`` and ``/run_sse`` with 503 while the run queue is full.
+
+    ADK starts the response before the agent runs, so a run the scheduler
+    rejects could only report an error inside a 200 stream; rejecting here
+    gives clients a plain 503 with ``Retry-After`` (and a 400 for an unknown
+    latency profile). Also marks ``/run_sse`` requests so their runs stream
+    queue positions.
+    """
+
+    def __init__(self, app: ASGIApp, scheduler: RunScheduler = run_scheduler):
+        self.app = app
+        self.scheduler = scheduler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] not in ("/run", "/run_sse")
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        messages: list[Message] = []
+        body = b""
+        while True:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request":
+                break
+            body += message.get("body", b"")
+            if not message.get("more_body", False):
+                break
+
+        key, profile = _parse_run_request(body)
+        if profile is not None and (not isinstance(profile, str) or profile not in LATENCY_PROFILES):
+            response = JSONResponse(
+                {
+                    "detail": f"Unknown latency profile {profile!r}; "
+                    f"choose one of {', '.join(LATENCY_PROFILES)}"
+                },
+                status_code=400,
+            )
+            await response(scope, receive, send)
+            return
+        if not self.scheduler.admits(key):
+            self.scheduler.rejected += 1
+            response = JSONResponse(
+                {"detail": "Too many agent runs in progress; retry later"},
+                status_code=503,
+                headers={"Retry-After": str(self.scheduler.retry_after())},
+            )
+            await response(scope, receive, send)
+            return
+
+        pending = iter(messages)
+
+        async def replay() -> Message:
+            return next(pending, None) or await receive()
+
+        token = _queue_updates.set(scope["path"] == "/run_sse")
+        profile_token = _requested_profile.set(profile)
+        try:
+            await self.app(scope, replay, send)
+        finally:
+            _requested_profile.reset(profile_token)
+            _queue_updates.reset(token)
+
+
+def _parse_run_request(body: bytes) -> tuple[Optional[str], Optional[str]]:
+    """The run key and the latency profile asked for (if any) of a run request."""
+    try:
+        request = json.loads(body)
+        message = request.get("newMessage") or request.get("new_message") or {}
+        state_delta = request.get("stateDelta") or request.get("state_delta") or {}
+        profile = state_delta.get(PROFILE_STATE_KEY)
+        text = "".join(part.get("text") or "" for part in message.get("parts") or [])
+        return run_key(text, profile or config.latency_profile), profile
+    except (ValueError, AttributeError, TypeError):
+        return None, None
@@ -0,0 +1,157 @@
+import contextlib
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import AsyncGenerator, Iterator, Optional
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+
+logger = logging.getLogger(__name__)
+
+
+def request_key(llm_request: LlmRequest) -> str:
+    """Requests with the same model, contents and generation config share a key."""
+    document = {
+        "model": llm_request.model,
+        "contents": [
+            content.model_dump(mode="json", exclude_none=True)
+            for content in llm_request.contents
+        ],
+        "config": llm_request.config.model_dump(
+            mode="json", exclude_none=True, exclude={"http_options", "labels"}
+        ),
+    }
+    return hashlib.sha256(json.dumps(document, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+# =============================================================================
+# CACHE FILES
+# =============================================================================
+
+
+class SearchCache:
+    """Complete grounded model responses on local disk, one file per request.
+
+    ``google_search`` runs inside the model call, so the unit worth caching
+    is the whole grounded response: its text, grounding chunks and supports.
+    Entries live in ``root/<key[:2]>/<key>.json.gz`` and expire after
+    ``max_age`` seconds, so reports of a later week search again.
+    """
+
+    def __init__(self, root: str, max_age: float = 24 * 3600):
+        self.root = root
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.json.gz")
+
+    def get(self, key: str) -> Optional[list[LlmResponse]]:
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age:
+                return None
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                document = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return [LlmResponse.model_validate(response) for response in document["responses"]]
+
+    def put(self, key: str, responses: list[LlmResponse]):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        document = {
+            "responses": [
+                response.model_dump(mode="json", exclude_none=True, by_alias=True)
+                for response in responses
+            ]
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as f:
+            json.dump(document, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    def snapshot(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+# =============================================================================
+# CACHING MODEL
+# =============================================================================
+
+
+class CachedSearchLlm(BaseLlm):
+    """Serves repeated grounded requests from a `SearchCache`.
+
+    Misses go to ``inner`` and are stored once they complete without an
+    error. Hits replay the complete (non-partial) responses without their
+    usage metadata, so token accounting only counts tokens actually spent;
+    the grounding metadata, and with it the search count, is kept.
+    """
+
+    inner: BaseLlm
+    cache: SearchCache
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        key = request_key(llm_request)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.cache.hits += 1
+            logger.info(f"Search cache hit for {llm_request.model} ({key[:12]})")
+            for response in cached:
+                yield response.model_copy(update={"usage_metadata": None})
+            return
+
+        self.cache.misses += 1
+        complete: list[LlmResponse] = []
+        failed = False
+        async with contextlib.aclosing(
+            self.inner.generate_content_async(llm_request, stream)
+        ) as responses:
+            async for response in responses:
+                if response.error_code:
+                    failed = True
+                elif not response.partial:
+                    complete.append(response)
+                yield response
+        if complete and not failed:
+            self.cache.put(key, complete)
+
+
+def _search_agents(agent: BaseAgent) -> Iterator[LlmAgent]:
+    if isinstance(agent, LlmAgent) and any(
+        getattr(tool, "name", "") == "google_search" for tool in agent.tools
+    ):
+        yield agent
+    for sub_agent in agent.sub_agents:
+        yield from _search_agents(sub_agent)
+
+
+@contextlib.contextmanager
+def cached_search(agent: BaseAgent, cache: SearchCache):
+    """Temporarily routes the searching agents of ``agent``'s tree through ``cache``.
+
+    Args:
+        agent: The root of the agent tree, e.g. ``root_agent``.
+        cache: Where grounded responses are looked up and stored.
+    """
+    originals: dict[str, object] = {}
+    try:
+        for search_agent in _search_agents(agent):
+            originals[search_agent.name] = search_agent.model
+            inner = search_agent.canonical_model
+            search_agent.model = CachedSearchLlm(model=inner.model, inner=inner, cache=cache)
+        yield agent
+    finally:
+        for search_agent in _search_agents(agent):
+            if search_agent.name in originals:
+                search_agent.model = originals[search_agent.name]
@@ -0,0 +1,451 @@
+import atexit
+import functools
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional, Sequence
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.tools import BaseTool, ToolContext
+from opentelemetry import trace
+from opentelemetry.context import Context
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    SpanExporter,
+    SpanExportResult,
+)
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from opentelemetry.trace import Span, SpanKind, Status, StatusCode
+
+from .config import config
+
+SERVICE_NAME = "estee_lauder_trend_agent"
+
+
+# =============================================================================
+# OTLP JSON EXPORT
+# =============================================================================
+
+
+def _otlp_value(value: Any) -> dict:
+    """Encode a span attribute value as an OTLP JSON ``AnyValue``."""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(v) for v in value]}}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes) -> list[dict]:
+    return [
+        {"key": key, "value": _otlp_value(value)}
+        for key, value in (attributes or {}).items()
+    ]
+
+
+def _otlp_span(span: ReadableSpan) -> dict:
+    context = span.get_span_context()
+    encoded = {
+        "traceId": format(context.trace_id, "032x"),
+        "spanId": format(context.span_id, "016x"),
+        "name": span.name,
+        # OTLP enums are offset by one from the SDK's SpanKind values.
+        "kind": span.kind.value + 1,
+        "startTimeUnixNano": str(span.start_time),
+        "endTimeUnixNano": str(span.end_time),
+        "attributes": _otlp_attributes(span.attributes),
+        "status": {"code": span.status.status_code.value},
+    }
+    if span.parent is not None:
+        encoded["parentSpanId"] = format(span.parent.span_id, "016x")
+    if span.status.description:
+        encoded["status"]["message"] = span.status.description
+    if span.events:
+        encoded["events"] = [
+            {
+                "name": event.name,
+                "timeUnixNano": str(event.timestamp),
+                "attributes": _otlp_attributes(event.attributes),
+            }
+            for event in span.events
+        ]
+    return encoded
+
+
+class OtlpJsonFileSpanExporter(SpanExporter):
+    """Appends finished spans to a file as OTLP/JSON lines.
+
+    Each export batch is written as a single ``ExportTraceServiceRequest``
+    JSON object per line, the same layout the OpenTelemetry Collector's
+    ``file`` exporter produces, so the output can be replayed into any OTLP
+    backend (Jaeger, Tempo, Cloud Trace) or inspected with ``jq``.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        by_scope: dict[tuple, dict] = {}
+        resource_attributes = None
+        for span in spans:
+            resource_attributes = span.resource.attributes
+            scope = span.instrumentation_scope
+            key = (scope.name, scope.version) if scope else (SERVICE_NAME, None)
+            scope_spans = by_scope.setdefault(
+                key, {"scope": {"name": key[0]}, "spans": []}
+            )
+            scope_spans["spans"].append(_otlp_span(span))
+
+        payload = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": _otlp_attributes(resource_attributes)
+                    },
+                    "scopeSpans": list(by_scope.values()),
+                }
+            ]
+        }
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(payload, separators=(",", ":")) + "\n")
+        except OSError as e:
+            logging.error(f"Failed to write trace spans to {self.path}: {e}")
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+
+# =============================================================================
+# TRACER SETUP
+# =============================================================================
+
+_tracer: Optional[trace.Tracer] = None
+_provider: Optional[TracerProvider] = None
+_tracer_configured = False
+_tracer_lock = threading.Lock()
+
+
+def _build_exporter() -> Optional[SpanExporter]:
+    """Create the span exporter selected by the research configuration."""
+    if config.trace_exporter == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+                OTLPSpanExporter,
+            )
+        except ImportError:
+            logging.warning(
+                "TRACE_EXPORTER=otlp requires opentelemetry-exporter-otlp-proto-http; "
+                "tracing is disabled"
+            )
+            return None
+        # Endpoint and headers come from the standard OTEL_EXPORTER_OTLP_* vars.
+        return OTLPSpanExporter()
+    if config.trace_export_path:
+        return OtlpJsonFileSpanExporter(config.trace_export_path)
+    return None
+
+
+def get_tracer() -> Optional[trace.Tracer]:
+    """Return the agent-run tracer, or None when tracing is not configured.
+
+    The tracer uses its own ``TracerProvider`` instead of the global one so
+    that the spans ADK emits internally are not mixed into our run timelines.
+    Sampling is decided once per run (the root span) and inherited by every
+    child span, so a trace is always either complete or absent.
+    """
+    global _tracer, _provider, _tracer_configured
+    if _tracer_configured:
+        return _tracer
+    with _tracer_lock:
+        if not _tracer_configured:
+            exporter = _build_exporter()
+            if exporter is not None:
+                _provider = TracerProvider(
+                    resource=Resource.create({"service.name": SERVICE_NAME}),
+                    sampler=ParentBased(TraceIdRatioBased(config.trace_sample_rate)),
+                )
+                _provider.add_span_processor(BatchSpanProcessor(exporter))
+                atexit.register(_provider.shutdown)
+                _tracer = _provider.get_tracer(__name__)
+            _tracer_configured = True
+    return _tracer
+
+
+# =============================================================================
+# PER-RUN SPAN BOOKKEEPING
+# =============================================================================
+
+
+@dataclass
+class _RunSpans:
+    """Open spans belonging to a single invocation (one agent run)."""
+
+    agent_spans: dict[str, Span] = field(default_factory=dict)
+    agent_stack: list[str] = field(default_factory=list)
+    model_spans: dict[str, Span] = field(default_factory=dict)
+    tool_spans: dict[str, Span] = field(default_factory=dict)
+    output_ready_ns: dict[str, int] = field(default_factory=dict)
+
+
+_runs: dict[str, _RunSpans] = {}
+
+
+def _parent_context(run: _RunSpans, agent_name: Optional[str] = None):
+    name = agent_name if agent_name in run.agent_spans else None
+    if name is None and run.agent_stack:
+        name = run.agent_stack[-1]
+    if name is None:
+        # An empty context, not the current one: ADK makes its own
+        # always-sampled span current, which would otherwise become the
+        # root's parent and override TRACE_SAMPLE_RATE.
+        return Context()
+    return trace.set_span_in_context(run.agent_spans[name])
+
+
+def _end_span(span: Span, error: Optional[str] = None) -> None:
+    if error:
+        span.set_status(Status(StatusCode.ERROR, error))
+    span.end()
+
+
+def trace_before_agent(callback_context: CallbackContext) -> None:
+    """Opens a span for the agent that is about to run.
+
+    The first agent of an invocation (the ``SequentialAgent`` root) opens the
+    trace root span; sub-agents are nested under the agent that invoked them.
+    """
+    tracer = get_tracer()
+    if tracer is None:
+        return None
+    run = _runs.setdefault(callback_context.invocation_id, _RunSpans())
+    agent_name = callback_context.agent_name
+    span = tracer.start_span(
+        f"invoke_agent {agent_name}",
+        context=_parent_context(run),
+        kind=SpanKind.INTERNAL,
+        attributes={
+            "gen_ai.operation.name": "invoke_agent",
+            "gen_ai.agent.name": agent_name,
+            "adk.invocation_id": callback_context.invocation_id,
+            "adk.session_id": callback_context._invocation_context.session.id,
+        },
+    )
+    run.agent_spans[agent_name] = span
+    run.agent_stack.append(agent_name)
+    return None
+
+
+def trace_after_agent(callback_context: CallbackContext) -> None:
+    """Closes the agent span, and the run's trace once the root agent ends."""
+    run = _runs.get(callback_context.invocation_id)
+    if run is None:
+        return None
+    agent_name = callback_context.agent_name
+    tracer = get_tracer()
+
+    # ADK validates `output_schema` responses between the final model
+    # response and the after-agent callbacks; record that as its own span.
+    ready_ns = run.output_ready_ns.pop(agent_name, None)
+    if ready_ns is not None and tracer is not None:
+        parse_span = tracer.start_span(
+            f"parse_output {agent_name}",
+            context=_parent_context(run, agent_name),
+            start_time=ready_ns,
+            attributes={"gen_ai.agent.name": agent_name},
+        )
+        parse_span.end()
+
+    # Agents skipped by a callback (e.g. an exhausted budget) never reach
+    # their after-agent callbacks, so unwind everything nested in this agent.
+    while agent_name in run.agent_stack:
+        name = run.agent_stack.pop()
+        if span := run.model_spans.pop(name, None):
+            _end_span(span, "model call did not complete")
+        if span := run.agent_spans.pop(name, None):
+            _end_span(span, None if name == agent_name else "agent did not complete")
+
+    if not run.agent_stack:
+        for span in run.tool_spans.values():
+            _end_span(span, "tool call did not complete")
+        _runs.pop(callback_context.invocation_id, None)
+    return None
+
+
+def end_run_spans(invocation_id: str, reason: str) -> None:
+    """Ends the spans still open for a run that stopped without finishing.
+
+    A run that raises, is cancelled or loses its SSE client never reaches the
+    after-agent callbacks that close its spans and forget the run; without
+    this, its spans would never be exported and its entry would stay forever.
+    """
+    run = _runs.pop(invocation_id, None)
+    if run is None:
+        return None
+    for span in [*run.tool_spans.values(), *run.model_spans.values()]:
+        _end_span(span, reason)
+    for name in reversed(run.agent_stack):
+        if span := run.agent_spans.pop(name, None):
+            _end_span(span, reason)
+    return None
+
+
+def trace_before_model(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> None:
+    """Opens a span for a model call made by the current agent."""
+    run = _runs.get(callback_context.invocation_id)
+    tracer = get_tracer()
+    if run is None or tracer is None:
+        return None
+    agent_name = callback_context.agent_name
+    run.model_spans[agent_name] = tracer.start_span(
+        f"call_llm {llm_request.model}",
+        context=_parent_context(run, agent_name),
+        kind=SpanKind.CLIENT,
+        attributes={
+            "gen_ai.operation.name": "call_llm",
+            "gen_ai.request.model": llm_request.model or "",
+            "gen_ai.agent.name": agent_name,
+            "gen_ai.request.content_count": len(llm_request.contents),
+        },
+    )
+    return None
+
+
+def trace_after_model(
+    callback_context: CallbackContext, llm_response: LlmResponse
+) -> None:
+    """Closes the model span once the complete (non-partial) response arrives.
+
+    ``google_search`` is a built-in Gemini tool executed server-side inside the
+    model call, so ADK never invokes tool callbacks for it. Each query listed in
+    the response's grounding metadata is recorded as a child ``google_search``
+    span covering the model call it was issued from.
+    """
+    if llm_response.partial:
+        return None
+    run = _runs.get(callback_context.invocation_id)
+    tracer = get_tracer()
+    if run is None or tracer is None:
+        return None
+    agent_name = callback_context.agent_name
+    span = run.model_spans.pop(agent_name, None)
+    if span is None:
+        return None
+
+    grounding = llm_response.grounding_metadata
+    if grounding:
+        span.set_attribute(
+            "gen_ai.grounding.chunk_count", len(grounding.grounding_chunks or [])
+        )
+        span.set_attribute(
+            "gen_ai.grounding.support_count", len(grounding.grounding_supports or [])
+        )
+        for query in grounding.web_search_queries or []:
+            search_span = tracer.start_span(
+                "execute_tool google_search",
+                context=trace.set_span_in_context(span),
+                start_time=span.start_time,
+                attributes={
+                    "gen_ai.operation.name": "execute_tool",
+                    "gen_ai.tool.name": "google_search",
+                    "gen_ai.tool.server_side": True,
+                    "google_search.query": query,
+                },
+            )
+            search_span.end()
+
+    if usage := llm_response.usage_metadata:
+        span.set_attribute("gen_ai.usage.input_tokens", usage.prompt_token_count or 0)
+        span.set_attribute(
+            "gen_ai.usage.output_tokens", usage.candidates_token_count or 0
+        )
+        span.set_attribute(
+            "gen_ai.usage.thinking_tokens", usage.thoughts_token_count or 0
+        )
+    if llm_response.finish_reason:
+        span.set_attribute(
+            "gen_ai.response.finish_reasons", [str(llm_response.finish_reason.value)]
+        )
+    _end_span(span, llm_response.error_message or llm_response.error_code)
+
+    agent = callback_context._invocation_context.agent
+    if getattr(agent, "output_schema", None) is not None:
+        run.output_ready_ns[agent_name] = time.time_ns()
+    return None
+
+
+def trace_before_tool(
+    tool: BaseTool, args: dict[str, Any], tool_context: ToolContext
+) -> None:
+    """Opens a span for a client-side (function) tool call."""
+    run = _runs.get(tool_context.invocation_id)
+    tracer = get_tracer()
+    if run is None or tracer is None:
+        return None
+    run.tool_spans[tool_context.function_call_id] = tracer.start_span(
+        f"execute_tool {tool.name}",
+        context=_parent_context(run, tool_context.agent_name),
+        attributes={
+            "gen_ai.operation.name": "execute_tool",
+            "gen_ai.tool.name": tool.name,
+            "gen_ai.tool.call.id": tool_context.function_call_id or "",
+        },
+    )
+    return None
+
+
+def trace_after_tool(
+    tool: BaseTool, args: dict[str, Any], tool_context: ToolContext, tool_response: dict
+) -> None:
+    """Closes the span opened by `trace_before_tool`."""
+    run = _runs.get(tool_context.invocation_id)
+    if run is None:
+        return None
+    if span := run.tool_spans.pop(tool_context.function_call_id, None):
+        error = tool_response.get("error") if isinstance(tool_response, dict) else None
+        _end_span(span, str(error) if error else None)
+    return None
+
+
+def traced_after_agent(callback: Callable) -> Callable:
+    """Wraps an after-agent callback so it runs in its own child span.
+
+    ADK stops at the first after-agent callback that returns content, so the
+    wrapper also closes the agent span itself once ``callback`` has returned.
+    Use it in place of listing `trace_after_agent` next to such a callback.
+    """
+
+    @functools.wraps(callback)
+    def wrapper(callback_context: CallbackContext):
+        run = _runs.get(callback_context.invocation_id)
+        tracer = get_tracer()
+        if run is None or tracer is None:
+            return callback(callback_context)
+        span = tracer.start_span(
+            callback.__name__,
+            context=_parent_context(run, callback_context.agent_name),
+        )
+        try:
+            return callback(callback_context)
+        except Exception as e:
+            span.set_status(Status(StatusCode.ERROR, str(e)))
+            raise
+        finally:
+            span.end()
+            trace_after_agent(callback_context)
+
+    return wrapper
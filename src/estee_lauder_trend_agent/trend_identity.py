@@ -0,0 +1,307 @@
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Optional
+
+import numpy as np
+
+from .catalog import tokenize
+
+logger = logging.getLogger(__name__)
+
+# 64 bands of 2 rows: pairs with Jaccard similarity 0.3 share a band with
+# >99% probability, unrelated trends (similarity ~0.02) with ~2.5%.
+NUM_PERM = 128
+BANDS = 64
+# Estimated Jaccard similarity from which a new item joins a trend; reworded
+# snapshots of one trend score 0.35-0.6, different trends below 0.1.
+SIMILARITY_THRESHOLD = 0.25
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = 0xFFFFFFFF
+_GOLDEN = 0x9E3779B97F4A7C15
+
+# A TrendItem or its model_dump() dict
+TrendLike = Any
+
+
+# =============================================================================
+# MINHASH
+# =============================================================================
+
+
+def _stem(token: str) -> str:
+    """Crude suffix folding so "layered", "layering" and "layers" shingle alike."""
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        token = token[:-1]
+    for suffix in ("ing", "ed", "y"):
+        if len(token) > 5 and token.endswith(suffix):
+            return token[: -len(suffix)]
+    return token
+
+
+def trend_shingles(trend: TrendLike) -> set[str]:
+    """Character trigrams of the name plus the words of name, description and techniques.
+
+    Name trigrams make "Glass Skin 2.0" and "Glass-Skin Glow" overlap even
+    where their words differ; word bigrams are left out because reworded
+    descriptions rarely keep them.
+    """
+    if not isinstance(trend, dict):
+        trend = trend.model_dump()
+    name_tokens = [_stem(t) for t in tokenize(trend.get("name"))]
+    squashed = "".join(name_tokens)
+    shingles = {f"n:{squashed[i:i + 3]}" for i in range(max(1, len(squashed) - 2))}
+    shingles.discard("n:")
+    shingles.update(f"w:{t}" for t in name_tokens)
+    for text in [trend.get("description")] + list(trend.get("techniques") or []):
+        shingles.update(f"w:{_stem(t)}" for t in tokenize(text))
+    return shingles
+
+
+class MinHasher:
+    """MinHash signatures from ``NUM_PERM`` universal hash permutations of crc32."""
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self._a = rng.randint(1, _MAX_HASH, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, _MAX_HASH, size=num_perm, dtype=np.uint64)
+
+    def signature(self, shingles: set[str]) -> np.ndarray:
+        if not shingles:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles)
+        )
+        permuted = (hashes[:, None] * self._a + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+# =============================================================================
+# TREND IDENTITY INDEX
+# =============================================================================
+
+
+class TrendIdentityIndex:
+    """Assigns stable trend ids to trend items across report snapshots.
+
+    Every item is MinHash-signed and its signature split into ``BANDS``
+    bands; items sharing a band land in the same LSH bucket. Each bucket
+    keeps the latest item of every trend that hashed to it, so a lookup
+    touches ``BANDS`` buckets and compares against the handful of trends
+    found there, however many items are stored. The best trend with
+    estimated similarity of at least ``threshold`` gives the new item its
+    id; otherwise the item starts a new trend, named after the item's
+    SQLite row id so that processes sharing a database never reuse an id.
+    Items without any words (no shingles) have nothing to compare and
+    always start a new trend.
+
+    With ``path`` items are stored in SQLite and the buckets are rebuilt
+    from the stored signatures on startup; otherwise they live in memory.
+    Items other processes add to the same file are seen after a restart.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        num_perm: int = NUM_PERM,
+        bands: int = BANDS,
+        threshold: float = SIMILARITY_THRESHOLD,
+    ):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.path = path
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self._hasher = MinHasher(num_perm)
+        self._lock = threading.Lock()
+        # Per band: band hash -> {trend id: row of the trend's latest item}
+        self._buckets: list[dict[int, dict[str, int]]] = [{} for _ in range(bands)]
+        self._band_mix = np.array(
+            [pow(_GOLDEN, j, 1 << 64) for j in range(self.rows)], dtype=np.uint64
+        )
+        # Signatures of every item in load order; grown by doubling
+        self._signatures = np.zeros((1024, num_perm), dtype=np.uint32)
+        self._count = 0
+        self._trend_ids: list[str] = []
+        self._names: list[str] = []
+        self._members: dict[str, list[int]] = {}
+        self._db = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS trend_items (
+                item_id INTEGER PRIMARY KEY,
+                trend_id TEXT NOT NULL,
+                name TEXT NOT NULL,
+                category TEXT,
+                report_id TEXT,
+                seen_at REAL NOT NULL,
+                signature BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS trend_items_trend ON trend_items (trend_id, item_id);
+            """
+        )
+        self._db.commit()
+        self._load()
+
+    def _load(self):
+        start = time.perf_counter()
+        rows = self._db.execute(
+            "SELECT trend_id, name, signature FROM trend_items ORDER BY item_id"
+        ).fetchall()
+        if not rows:
+            return
+        signatures = np.frombuffer(b"".join(row[2] for row in rows), dtype=np.uint32)
+        self._store([row[0] for row in rows], [row[1] for row in rows], signatures.reshape(len(rows), -1))
+        if self._count:
+            logger.info(
+                f"Loaded {self._count} trend items in {len(self._members)} trends "
+                f"from {self.path} in {(time.perf_counter() - start) * 1000:.0f} ms"
+            )
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def trend_count(self) -> int:
+        return len(self._members)
+
+    def _band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        """One 64-bit hash per band, shape (items, bands)."""
+        blocks = signatures.reshape(len(signatures), self.bands, self.rows).astype(np.uint64)
+        return (blocks * self._band_mix).sum(axis=2)
+
+    def _store(self, trend_ids: list[str], names: list[str], signatures: np.ndarray):
+        """Append items (rows continue from ``len(self)``) and bucket them per band.
+
+        In memory items are addressed by row, not by their SQLite item id,
+        which has gaps where other processes added items.
+        """
+        first, count = self._count, len(signatures)
+        while first + count > len(self._signatures):
+            self._signatures = np.concatenate([self._signatures, np.zeros_like(self._signatures)])
+        self._signatures[first : first + count] = signatures
+        self._count += count
+        for row, (trend_id, name) in enumerate(zip(trend_ids, names), first):
+            self._trend_ids.append(trend_id)
+            self._names.append(name)
+            self._members.setdefault(trend_id, []).append(row)
+        keys = self._band_keys(signatures)
+        for band, buckets in enumerate(self._buckets):
+            for row, (trend_id, key) in enumerate(zip(trend_ids, keys[:, band].tolist()), first):
+                bucket = buckets.get(key)
+                if bucket is None:
+                    bucket = buckets[key] = {}
+                bucket[trend_id] = row
+
+    def _nearest(self, signature: np.ndarray) -> tuple[Optional[str], float]:
+        candidates = []
+        for buckets, key in zip(self._buckets, self._band_keys(signature[None, :])[0].tolist()):
+            bucket = buckets.get(key)
+            if bucket:
+                candidates.extend(bucket.values())
+        if not candidates:
+            return None, 0.0
+        # One vectorized comparison against all candidate signatures
+        candidates = np.unique(np.array(candidates, dtype=np.int64))
+        matches = np.count_nonzero(self._signatures[candidates] == signature, axis=1)
+        best = int(matches.argmax())
+        similarity = float(matches[best]) / len(signature)
+        if similarity < self.threshold:
+            return None, similarity
+        return self._trend_ids[candidates[best]], similarity
+
+    # -------------------------------------------------------------------------
+    # Public API
+    # -------------------------------------------------------------------------
+
+    def lookup(self, trend: TrendLike) -> dict:
+        """The trend ``trend`` belongs to, without recording it."""
+        shingles = trend_shingles(trend)
+        if not shingles:
+            return self._describe(None, 0.0)
+        signature = self._hasher.signature(shingles)
+        with self._lock:
+            trend_id, similarity = self._nearest(signature)
+            return self._describe(trend_id, similarity)
+
+    def assign(
+        self,
+        trends: list[TrendLike],
+        categories: Optional[list[str]] = None,
+        report_id: Optional[str] = None,
+    ) -> list[dict]:
+        """Record ``trends`` and return the trend each one was assigned to.
+
+        Items of the same batch can join each other's trends, so a report
+        listing one trend twice counts it once.
+        """
+        categories = categories or [None] * len(trends)
+        shingle_sets = [trend_shingles(t) for t in trends]
+        signatures = [self._hasher.signature(shingles) for shingles in shingle_sets]
+        results = []
+        with self._lock:
+            now = time.time()
+            for trend, category, shingles, signature in zip(trends, categories, shingle_sets, signatures):
+                name = trend["name"] if isinstance(trend, dict) else trend.name
+                # An empty signature would match every other empty one at 1.0.
+                trend_id, similarity = self._nearest(signature) if shingles else (None, 0.0)
+                is_new = trend_id is None
+                cursor = self._db.execute(
+                    "INSERT INTO trend_items (trend_id, name, category, report_id, seen_at, signature) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (trend_id or "", name, category, report_id, now, signature.tobytes()),
+                )
+                if is_new:
+                    # SQLite's row id is unique across processes sharing the file.
+                    trend_id = f"trend-{cursor.lastrowid:06d}"
+                    similarity = 1.0
+                    self._db.execute(
+                        "UPDATE trend_items SET trend_id = ? WHERE item_id = ?",
+                        (trend_id, cursor.lastrowid),
+                    )
+                self._store([trend_id], [name], signature[None, :])
+                results.append({**self._describe(trend_id, similarity), "is_new": is_new})
+            self._db.commit()
+        return results
+
+    def _describe(self, trend_id: Optional[str], similarity: float) -> dict:
+        if trend_id is None:
+            return {"trend_id": None, "canonical_name": None, "similarity": round(similarity, 3), "occurrences": 0}
+        members = self._members[trend_id]
+        return {
+            "trend_id": trend_id,
+            "canonical_name": self._names[members[0]],
+            "similarity": round(similarity, 3),
+            "occurrences": len(members),
+        }
+
+    def cluster(self, trend_id: str) -> Optional[dict]:
+        """Every recorded item of a trend, oldest first."""
+        with self._lock:
+            if trend_id not in self._members:
+                return None
+            rows = self._db.execute(
+                "SELECT name, category, report_id, seen_at FROM trend_items "
+                "WHERE trend_id = ? ORDER BY item_id",
+                (trend_id,),
+            ).fetchall()
+        return {
+            "trend_id": trend_id,
+            "canonical_name": rows[0][0],
+            "occurrences": len(rows),
+            "names": sorted({name for name, _, _, _ in rows}),
+            "items": [
+                {"name": name, "category": category, "report_id": report_id, "seen_at": seen_at}
+                for name, category, report_id, seen_at in rows
+            ],
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,427 @@
+import logging
+import re
+import threading
+from typing import Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types as genai_types
+
+from .config import config
+from .latency_profiles import LATENCY_PROFILES, profile_name
+
+USAGE_STATE_KEY = "token_usage"
+
+# Rough characters-per-token ratio used to apportion the measured prompt
+# token count across prompt sections; Gemini averages ~4 for English text.
+CHARS_PER_TOKEN = 4
+
+_HEADING_RE = re.compile(r"^\s*\*\*(?P<title>[^*\n]+?):?\*\*:?\s*$", re.MULTILINE)
+_PLACEHOLDER_RE = re.compile(r"{+([^{}]*)}+")
+
+# Grounded query counts seen in partial chunks, keyed by invocation id and
+# then agent name. A streamed call's final aggregated response carries no
+# grounding metadata, so its searches are only visible on the chunks.
+_streamed_searches: dict[str, dict[str, int]] = {}
+
+
+# =============================================================================
+# PROCESS-WIDE METRICS
+# =============================================================================
+
+
+class UsageMetrics:
+    """Thread-safe, process-wide token counters aggregated per stage (agent)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: dict[str, dict[str, int]] = {}
+        self._budget_stops = 0
+
+    def record(self, stage: str, usage: dict[str, int]) -> None:
+        with self._lock:
+            totals = self._stages.setdefault(stage, _empty_usage())
+            for key, value in usage.items():
+                totals[key] += value
+
+    def record_budget_stop(self) -> None:
+        with self._lock:
+            self._budget_stops += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "stages": {stage: dict(t) for stage, t in self._stages.items()},
+                "budget_stops": self._budget_stops,
+            }
+
+
+usage_metrics = UsageMetrics()
+
+
+def _empty_usage() -> dict[str, int]:
+    return {
+        "calls": 0,
+        "input_tokens": 0,
+        "cached_input_tokens": 0,
+        "output_tokens": 0,
+        "thinking_tokens": 0,
+        "total_tokens": 0,
+        "search_queries": 0,
+    }
+
+
+def usage_from_metadata(
+    usage_metadata: Optional[genai_types.GenerateContentResponseUsageMetadata],
+) -> dict[str, int]:
+    """Normalizes Gemini usage metadata into the counters kept per stage."""
+    usage = _empty_usage()
+    usage["calls"] = 1
+    if usage_metadata:
+        usage["input_tokens"] = usage_metadata.prompt_token_count or 0
+        usage["cached_input_tokens"] = usage_metadata.cached_content_token_count or 0
+        usage["output_tokens"] = usage_metadata.candidates_token_count or 0
+        usage["thinking_tokens"] = usage_metadata.thoughts_token_count or 0
+        usage["total_tokens"] = usage_metadata.total_token_count or 0
+    return usage
+
+
+# =============================================================================
+# PROMPT SIZE BREAKDOWN
+# =============================================================================
+
+
+def measure_prompt_sections(
+    llm_request: LlmRequest, callback_context: CallbackContext
+) -> dict[str, int]:
+    """Measures the size (in characters) of each section of a model request.
+
+    The system instruction is split on its ``**Heading:**`` lines, and session
+    state injected through ``{key}`` placeholders is reported separately as
+    ``state:<key>`` so that large injected values (such as the cited research
+    findings handed to the composer) show up as their own line.
+
+    Args:
+        llm_request: The fully preprocessed request about to be sent.
+        callback_context: The callback context of the calling agent.
+
+    Returns:
+        Mapping of section name to character count.
+    """
+    sections: dict[str, int] = {}
+    system_instruction = llm_request.config.system_instruction or ""
+    if not isinstance(system_instruction, str):
+        system_instruction = str(system_instruction)
+
+    agent = callback_context._invocation_context.agent
+    template = getattr(agent, "instruction", "")
+    if isinstance(template, str):
+        for key in set(_PLACEHOLDER_RE.findall(template)):
+            value = callback_context.state.get(key.strip().removesuffix("?"))
+            if value is None:
+                continue
+            value = str(value)
+            if value and value in system_instruction:
+                sections[f"state:{key}"] = len(value)
+                system_instruction = system_instruction.replace(value, "", 1)
+
+    headings = list(_HEADING_RE.finditer(system_instruction))
+    preamble_end = headings[0].start() if headings else len(system_instruction)
+    sections["instruction:preamble"] = len(system_instruction[:preamble_end].strip())
+    for i, heading in enumerate(headings):
+        end = (
+            headings[i + 1].start() if i + 1 < len(headings) else len(system_instruction)
+        )
+        name = f"instruction:{heading.group('title').strip()}"
+        sections[name] = sections.get(name, 0) + len(
+            system_instruction[heading.start() : end].strip()
+        )
+
+    for content in llm_request.contents:
+        name = f"contents:{content.role or 'user'}"
+        size = sum(len(part.text or "") for part in content.parts or [])
+        sections[name] = sections.get(name, 0) + size
+
+    if llm_request.config.tools:
+        sections["tools"] = sum(
+            len(tool.model_dump_json(exclude_none=True))
+            for tool in llm_request.config.tools
+            if hasattr(tool, "model_dump_json")
+        )
+    if llm_request.config.response_schema is not None:
+        schema = llm_request.config.response_schema
+        if hasattr(schema, "model_json_schema"):
+            sections["response_schema"] = len(str(schema.model_json_schema()))
+        else:
+            sections["response_schema"] = len(str(schema))
+
+    return {name: size for name, size in sections.items() if size}
+
+
+# =============================================================================
+# BUDGETS
+# =============================================================================
+
+
+def _run_usage(callback_context: CallbackContext) -> dict:
+    """Returns the usage record of the current run, starting a new one if needed.
+
+    Session state outlives a single run, so the record is tagged with the
+    invocation id and reset when a new invocation starts in the same session.
+    It also names the run's latency profile, whose search budget applies.
+    """
+    run_usage = callback_context.state.get(USAGE_STATE_KEY)
+    if not run_usage or run_usage.get("invocation_id") != callback_context.invocation_id:
+        run_usage = {
+            "invocation_id": callback_context.invocation_id,
+            "latency_profile": profile_name(callback_context.state),
+            "stages": {},
+            "total": _empty_usage(),
+            "prompt_breakdown": {},
+            "budget_exceeded": None,
+        }
+    return run_usage
+
+
+def _search_budget(run_usage: dict) -> int:
+    profile = LATENCY_PROFILES.get(run_usage.get("latency_profile"))
+    return profile.search_budget if profile else config.max_search_iterations
+
+
+def _budget_exceeded_reason(run_usage: dict, searches: bool) -> Optional[str]:
+    """Why the next step must not run, if it must not.
+
+    Args:
+        run_usage: The usage record of the run.
+        searches: Whether the next step searches. Only searching steps are
+            stopped by the search budget; the composer still writes the
+            report from the findings already gathered.
+    """
+    used_tokens = run_usage["total"]["total_tokens"]
+    if config.run_token_budget and used_tokens >= config.run_token_budget:
+        return (
+            f"token budget exhausted ({used_tokens} of "
+            f"{config.run_token_budget} tokens used)"
+        )
+    used_searches = run_usage["total"]["search_queries"]
+    search_budget = _search_budget(run_usage)
+    if searches and search_budget and used_searches >= search_budget:
+        return (
+            f"search budget exhausted ({used_searches} of "
+            f"{search_budget} searches used)"
+        )
+    return None
+
+
+def _record_budget_stop(callback_context: CallbackContext, run_usage: dict, reason: str):
+    logging.warning(f"Stopping {callback_context.agent_name}: {reason}")
+    if not run_usage["budget_exceeded"]:
+        run_usage["budget_exceeded"] = reason
+        usage_metrics.record_budget_stop()
+    callback_context.state[USAGE_STATE_KEY] = run_usage
+
+
+def _uses_search(agent) -> bool:
+    return any(
+        getattr(tool, "name", "") == "google_search"
+        for tool in getattr(agent, "tools", [])
+    )
+
+
+def _stop_message(reason: str) -> str:
+    return f"Run stopped early: {reason}."
+
+
+def enforce_budget_before_agent(
+    callback_context: CallbackContext,
+) -> Optional[genai_types.Content]:
+    """Skips an agent (and so ends the run) once a budget of the run is spent.
+
+    The token budget skips any agent; the search budget only skips agents
+    that search. A single grounded call can run more searches than it was
+    asked to; the overrun is logged and the composer still runs, so the run
+    returns a report built from the findings already gathered.
+
+    Args:
+        callback_context: The callback context of the agent about to run.
+
+    Returns:
+        A short explanation that replaces the agent's output when the budget
+        is exhausted, otherwise None.
+    """
+    run_usage = _run_usage(callback_context)
+    agent = callback_context._invocation_context.agent
+    searches = _uses_search(agent)
+    reason = _budget_exceeded_reason(run_usage, searches=searches)
+    if not reason:
+        used_searches = run_usage["total"]["search_queries"]
+        search_budget = _search_budget(run_usage)
+        if not searches and search_budget and used_searches > search_budget:
+            logging.warning(
+                f"Search budget overrun ({used_searches} of {search_budget} searches "
+                f"used); {callback_context.agent_name} uses the findings gathered"
+            )
+        return None
+    _record_budget_stop(callback_context, run_usage, reason)
+    return genai_types.Content(
+        role="model", parts=[genai_types.Part(text=_stop_message(reason))]
+    )
+
+
+def enforce_budget_before_model(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> Optional[LlmResponse]:
+    """Records the prompt breakdown and short-circuits calls over budget.
+
+    ``google_search`` runs server-side within a single model call, so the
+    search budget cannot interrupt a call in flight. A searching agent's
+    request instead asks the model to stay within the searches left in the
+    search budget of the run's latency profile (``max_search_iterations``
+    unless the profile sets its own), and its next model call is stopped
+    once the budget is used up.
+
+    Agents with an ``output_schema`` are never short-circuited here because
+    a plain-text stop message would fail schema validation; the before-agent
+    check covers them.
+
+    Args:
+        callback_context: The callback context of the calling agent.
+        llm_request: The request about to be sent to the model.
+
+    Returns:
+        A stop message that replaces the model response when a budget is
+        exhausted, otherwise None.
+    """
+    agent = callback_context._invocation_context.agent
+    run_usage = _run_usage(callback_context)
+    run_usage["prompt_breakdown"][callback_context.agent_name] = (
+        measure_prompt_sections(llm_request, callback_context)
+    )
+    callback_context.state[USAGE_STATE_KEY] = run_usage
+
+    if getattr(agent, "output_schema", None) is not None:
+        return None
+    searches = _uses_search(agent)
+    reason = _budget_exceeded_reason(run_usage, searches=searches)
+    if not reason:
+        search_budget = _search_budget(run_usage)
+        if searches and search_budget:
+            remaining = search_budget - run_usage["total"]["search_queries"]
+            llm_request.append_instructions([
+                f"Run at most {remaining} Google Search "
+                f"{'query' if remaining == 1 else 'queries'} for this request."
+            ])
+        return None
+    _record_budget_stop(callback_context, run_usage, reason)
+    return LlmResponse(
+        content=genai_types.Content(
+            role="model", parts=[genai_types.Part(text=_stop_message(reason))]
+        )
+    )
+
+
+# =============================================================================
+# USAGE ACCOUNTING
+# =============================================================================
+
+
+def record_usage_callback(
+    callback_context: CallbackContext, llm_response: LlmResponse
+) -> None:
+    """Accumulates token usage of each complete model response per stage.
+
+    Usage of the current run is kept in session state under ``token_usage``
+    (``stages`` per agent plus a run ``total``) and added to the process-wide
+    `usage_metrics`. Searches of a streamed call are counted from the last
+    partial chunk that carries grounding metadata.
+
+    Args:
+        callback_context: The callback context of the calling agent.
+        llm_response: The model response.
+    """
+    stage = callback_context.agent_name
+    grounding = llm_response.grounding_metadata
+    if llm_response.partial:
+        if grounding and grounding.web_search_queries:
+            _streamed_searches.setdefault(callback_context.invocation_id, {})[stage] = len(
+                grounding.web_search_queries
+            )
+        return None
+
+    streamed = _streamed_searches.get(callback_context.invocation_id, {})
+    streamed_searches = streamed.pop(stage, 0)
+    if not streamed:
+        _streamed_searches.pop(callback_context.invocation_id, None)
+    usage = usage_from_metadata(llm_response.usage_metadata)
+    if grounding:
+        usage["search_queries"] = len(grounding.web_search_queries or [])
+    else:
+        usage["search_queries"] = streamed_searches
+
+    run_usage = _run_usage(callback_context)
+    stage_usage = run_usage["stages"].setdefault(stage, _empty_usage())
+    for name, value in usage.items():
+        stage_usage[name] += value
+        run_usage["total"][name] += value
+    callback_context.state[USAGE_STATE_KEY] = run_usage
+    usage_metrics.record(stage, usage)
+
+    logging.info(
+        f"Token usage for {stage}: input={usage['input_tokens']} "
+        f"output={usage['output_tokens']} thinking={usage['thinking_tokens']} "
+        f"searches={usage['search_queries']}"
+    )
+    return None
+
+
+def discard_streamed_searches(invocation_id: str, reason: str) -> None:
+    """Forgets the search counts of a run that stopped mid-stream."""
+    _streamed_searches.pop(invocation_id, None)
+    return None
+
+
+def format_usage_report(state) -> str:
+    """Formats the per-stage token usage and prompt breakdown of a run.
+
+    Prompt sections are measured in characters and apportioned to the stage's
+    measured input tokens, so the token column shows which sections dominate
+    the input size.
+
+    Args:
+        state: The session state of a finished (or stopped) run.
+
+    Returns:
+        A plain-text report.
+    """
+    run_usage = state.get(USAGE_STATE_KEY) or {}
+    stages = run_usage.get("stages", {})
+    lines = ["Token usage by stage", "=" * 60]
+    if profile := run_usage.get("latency_profile"):
+        lines.append(f"Latency profile: {profile}")
+    for stage, usage in [*stages.items(), ("total", run_usage.get("total"))]:
+        if not usage:
+            continue
+        lines.append(
+            f"{stage}: calls={usage['calls']} input={usage['input_tokens']} "
+            f"(cached {usage['cached_input_tokens']}) "
+            f"output={usage['output_tokens']} thinking={usage['thinking_tokens']} "
+            f"searches={usage['search_queries']}"
+        )
+    if reason := run_usage.get("budget_exceeded"):
+        lines.append(f"Stopped early: {reason}")
+
+    for stage, sections in run_usage.get("prompt_breakdown", {}).items():
+        total_chars = sum(sections.values()) or 1
+        input_tokens = stages.get(stage, {}).get("input_tokens", 0)
+        calls = stages.get(stage, {}).get("calls", 0) or 1
+        per_call_tokens = input_tokens / calls
+        lines += ["", f"Prompt sections for {stage} (last call)", "-" * 60]
+        for name, chars in sorted(sections.items(), key=lambda x: -x[1]):
+            share = chars / total_chars
+            tokens = (
+                round(share * per_call_tokens)
+                if per_call_tokens
+                else chars // CHARS_PER_TOKEN
+            )
+            lines.append(f"{share:6.1%}  ~{tokens:>7} tokens  {name}")
+    return "\n".join(lines)
@@ -0,0 +1,33 @@
+import os
+import time
+
+from estee_lauder_trend_agent.blob_store import BlobStore
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 32
+
+
+def test_blob_written_by_another_store_is_served(tmp_path):
+    writer = BlobStore(str(tmp_path))
+    reader = BlobStore(str(tmp_path))
+    blob_id = writer.put(PNG)
+
+    path = reader.get_path(blob_id)
+    assert path is not None
+    with open(path, "rb") as f:
+        assert f.read() == PNG
+
+
+def test_blob_from_another_store_expires_by_mtime(tmp_path):
+    writer = BlobStore(str(tmp_path))
+    reader = BlobStore(str(tmp_path), max_age=60)
+    blob_id = writer.put(PNG)
+    stale = time.time() - 120
+    os.utime(writer.get_path(blob_id), (stale, stale))
+
+    assert reader.get_path(blob_id) is None
+
+
+def test_unknown_blob_is_not_served(tmp_path):
+    store = BlobStore(str(tmp_path))
+
+    assert store.get_path("0" * 64 + ".png") is None
@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+
+import pytest
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from estee_lauder_trend_agent import tracing
+from estee_lauder_trend_agent.config import config
+
+
+@pytest.fixture
+def exporter(monkeypatch):
+    exporter = InMemorySpanExporter()
+    monkeypatch.setattr(tracing, "_build_exporter", lambda: exporter)
+    monkeypatch.setattr(tracing, "_tracer", None)
+    monkeypatch.setattr(tracing, "_provider", None)
+    monkeypatch.setattr(tracing, "_tracer_configured", False)
+    return exporter
+
+
+def _callback_context(invocation_id: str, agent_name: str):
+    return SimpleNamespace(
+        invocation_id=invocation_id,
+        agent_name=agent_name,
+        _invocation_context=SimpleNamespace(session=SimpleNamespace(id="session")),
+    )
+
+
+def _run(invocation_id: str):
+    root = _callback_context(invocation_id, "root_agent")
+    research = _callback_context(invocation_id, "research_agent")
+    tracing.trace_before_agent(root)
+    tracing.trace_before_agent(research)
+    tracing.trace_after_agent(research)
+    tracing.trace_after_agent(root)
+
+
+def _run_inside_foreign_span(invocation_id: str):
+    # Stands in for the always-sampled span ADK makes current around a run.
+    foreign = TracerProvider().get_tracer("adk")
+    with foreign.start_as_current_span("agent_run"):
+        _run(invocation_id)
+    return foreign
+
+
+def test_sample_rate_zero_ignores_sampled_foreign_parent(exporter, monkeypatch):
+    monkeypatch.setattr(config, "trace_sample_rate", 0.0)
+    for i in range(20):
+        _run_inside_foreign_span(f"run-{i}")
+    tracing._provider.force_flush()
+    assert exporter.get_finished_spans() == ()
+    assert tracing._runs == {}
+
+
+def test_root_span_starts_its_own_trace(exporter, monkeypatch):
+    monkeypatch.setattr(config, "trace_sample_rate", 1.0)
+    _run_inside_foreign_span("run")
+    tracing._provider.force_flush()
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    root = spans["invoke_agent root_agent"]
+    research = spans["invoke_agent research_agent"]
+    assert root.parent is None
+    assert research.parent.span_id == root.context.span_id
+    assert research.context.trace_id == root.context.trace_id